@@ -0,0 +1,71 @@
+export class VoiceService {
+    /**
+     * Голосовой запрос целиком на сервере: распознавание, ответ модели и синтез речи.
+     * Команды браузера сервер определяет сам и не обращается к модели:
+     * они возвращаются в result.command ({ scenario, text }) для выполнения здесь.
+     */
+    static async turn(audioBlob, { onTranscript, onReply } = {}) {
+        const { authToken } = await chrome.storage.local.get('authToken');
+        if (!authToken) {
+            throw new Error('Необходима авторизация');
+        }
+
+        const formData = new FormData();
+        formData.append('file', audioBlob, 'audio.wav');
+        formData.append('speaker', 'baya');
+
+        const response = await fetch('http://localhost:8000/api/voice/turn', {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${authToken}` },
+            body: formData
+        });
+
+        if (!response.ok) throw new Error(`Voice Error: ${response.status}`);
+
+        const result = {};
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+
+            for (const line of lines.filter(Boolean)) {
+                const event = JSON.parse(line);
+
+                if (event.type === 'transcript') {
+                    result.transcript = event.text;
+                    if (onTranscript) onTranscript(event.text);
+                } else if (event.type === 'command') {
+                    result.command = { scenario: event.scenario, text: event.text };
+                } else if (event.type === 'reply') {
+                    result.reply = event.text;
+                    if (onReply) onReply(event.text);
+                } else if (event.type === 'audio') {
+                    result.playback = this.#play(event.audio_data);
+                } else if (event.type === 'error') {
+                    result.error = event.detail;
+                } else if (event.type === 'done') {
+                    result.balance = event.balance;
+                }
+            }
+        }
+
+        if (result.playback) await result.playback;
+        return result;
+    }
+
+    static #play(base64Audio) {
+        const bytes = Uint8Array.from(atob(base64Audio), c => c.charCodeAt(0));
+        const audio = new Audio(URL.createObjectURL(new Blob([bytes], { type: 'audio/wav' })));
+        return new Promise((resolve) => {
+            audio.onended = resolve;
+            audio.play();
+        });
+    }
+}
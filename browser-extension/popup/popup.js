@@ -2,6 +2,7 @@ import { STTService } from './core/services/stt-service.js';
 import { TTSService } from './core/services/tts-service.js';
 import { CommandRouter } from './core/command-router.js';
 import { AudioRecorder } from './core/services/recorder.js';
+import { VoiceService } from './core/services/voice-service.js';
 
 document.addEventListener('DOMContentLoaded', () => {
   const recorder = new AudioRecorder();
@@ -16,14 +17,32 @@ document.addEventListener('DOMContentLoaded', () => {
         startBtn.classList.remove('recording');
         statusEl.textContent = 'Обработка...';
         
-        const commandText = await STTService.transcribe(audioBlob);
-        const { scenario, data } = await CommandRouter.handle(commandText);
-        
-        if (scenario !== "Общение с ИИ") {
-          await TTSService.speak(`Выполняю: ${scenario}`);
+        const { authToken } = await chrome.storage.local.get('authToken');
+        if (authToken) {
+          // Распознавание, ответ и озвучка за один запрос; команды браузера
+          // сервер распознает сам, без запроса к модели, и они выполняются локально
+          const turn = await VoiceService.turn(audioBlob, {
+            onTranscript: (text) => { statusEl.textContent = text; }
+          });
+
+          if (turn.command) {
+            const { scenario } = await CommandRouter.handle(turn.command.text);
+            await TTSService.speak(`Выполняю: ${scenario}`);
+            await updateBalance();
+          } else {
+            if (turn.error) throw new Error(turn.error);
+            document.getElementById('user-balance').textContent = turn.balance + ' ₮';
+          }
+        } else {
+          const commandText = await STTService.transcribe(audioBlob);
+          const { scenario, data } = await CommandRouter.handle(commandText);
+
+          if (scenario !== "Общение с ИИ") {
+            await TTSService.speak(`Выполняю: ${scenario}`);
+          }
+          // Обновляем баланс после выполнения сценария
+          await updateBalance();
         }
-        // Обновляем баланс после выполнения сценария
-        await updateBalance();
         statusEl.textContent = 'Нажмите и говорите';
       } else {
         // Начало записи
@@ -247,6 +266,14 @@ function initAuthForms() {
 
   // Выход
   document.getElementById('logout-btn').addEventListener('click', async () => {
+    const { authToken } = await chrome.storage.local.get('authToken');
+    if (authToken) {
+      // Отзываем токен на сервере; локальный выход выполняется в любом случае
+      fetch('http://localhost:8000/api/logout', {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${authToken}` }
+      }).catch(() => {});
+    }
     await chrome.storage.local.remove('authToken');
     showUnauthenticatedUI();
   });
@@ -0,0 +1,26 @@
+import os
+
+
+CPU_COUNT = int(os.getenv("CPU_THREADS", os.cpu_count() or 1))
+
+# По умолчанию ядра делятся между тремя моделями поровну
+_DEFAULT_INTRA_OP = max(1, CPU_COUNT // 3)
+
+# Потоки PyTorch и число параллельных воркеров для каждой модели
+MODEL_THREADS = {
+    "whisper": {
+        "intra_op": int(os.getenv("WHISPER_INTRA_OP_THREADS", _DEFAULT_INTRA_OP)),
+        "inter_op": int(os.getenv("WHISPER_INTER_OP_THREADS", "1")),
+        "workers": int(os.getenv("WHISPER_WORKERS", "1")),
+    },
+    "qwen": {
+        "intra_op": int(os.getenv("QWEN_INTRA_OP_THREADS", _DEFAULT_INTRA_OP)),
+        "inter_op": int(os.getenv("QWEN_INTER_OP_THREADS", "1")),
+        "workers": int(os.getenv("QWEN_WORKERS", "1")),
+    },
+    "silero": {
+        "intra_op": int(os.getenv("SILERO_INTRA_OP_THREADS", _DEFAULT_INTRA_OP)),
+        "inter_op": int(os.getenv("SILERO_INTER_OP_THREADS", "1")),
+        "workers": int(os.getenv("SILERO_WORKERS", "1")),
+    },
+}
@@ -1,10 +1,132 @@
-from infrastructure.db.db_connection import get_db_session, get_redis_client
+from infrastructure.db.credit_ledger import CREDIT_LEDGER, credit_ledger
+from infrastructure.db.db_connection import get_async_db_session, get_async_redis_client, get_db_session, get_redis_client
 from infrastructure.db.models import UserCredits, CreditTransaction
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
-from sqlalchemy import func, desc
+from infrastructure.db.pagination import after_cursor
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy import Integer, cast, func, desc, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 
+def debit_statement(user_id: int, amount: int):
+    """Списание одним UPDATE: баланс проверяется и уменьшается атомарно.
+
+    Возвращает новый баланс или ничего, если средств недостаточно.
+    """
+    return update(UserCredits)\
+        .where(UserCredits.user_id == user_id, UserCredits.balance >= amount)\
+        .values(balance=UserCredits.balance - amount)\
+        .returning(UserCredits.balance)\
+        .execution_options(synchronize_session=False)
+
+def credit_statement(user_id: int, amount: int):
+    """Начисление одним UPSERT: строка баланса создается или увеличивается атомарно.
+
+    Возвращает новый баланс.
+    """
+    statement = pg_insert(UserCredits).values(user_id=user_id, balance=amount)
+    return statement.on_conflict_do_update(
+        index_elements=[UserCredits.user_id],
+        set_={"balance": UserCredits.balance + statement.excluded.balance, "updated_at": datetime.utcnow()}
+    ).returning(UserCredits.balance)
+
+def debit_result(transaction: CreditTransaction, balance: int) -> Dict[str, Any]:
+    return {
+        "id": transaction.id,
+        "user_id": transaction.user_id,
+        "amount": transaction.amount,
+        "transaction_type": transaction.transaction_type,
+        "scenario_type": transaction.scenario_type,
+        "description": transaction.description,
+        "created_at": transaction.created_at.isoformat(),
+        "balance": balance
+    }
+
+
+def transaction_history_statement(user_id: int, limit: int, offset: int, cursor: Optional[str] = None):
+    """Страница операций с балансом после каждой из них.
+
+    Баланс хранится в balance_after при записи операции, поэтому страница
+    читается по индексу (user_id, created_at) без просмотра всей истории.
+    """
+    query = select(CreditTransaction).where(CreditTransaction.user_id == user_id)
+    keyset = after_cursor(CreditTransaction.created_at, CreditTransaction.id, cursor)
+    if keyset is not None:
+        query = query.where(keyset)
+
+    return query\
+        .order_by(desc(CreditTransaction.created_at), desc(CreditTransaction.id))\
+        .offset(offset)\
+        .limit(limit)
+
+def transaction_entry(transaction: CreditTransaction) -> Dict[str, Any]:
+    return {
+        "id": transaction.id,
+        "user_id": transaction.user_id,
+        "amount": transaction.amount,
+        "transaction_type": transaction.transaction_type,
+        "scenario_type": transaction.scenario_type,
+        "description": transaction.description,
+        "created_at": transaction.created_at.isoformat(),
+        "balance": transaction.balance_after
+    }
+
+# Период статистики: длина интервала, число интервалов, формат подписи
+PERIODS = {
+    "day": (timedelta(hours=1), 24, "%H:00"),
+    "week": (timedelta(days=1), 7, "%Y-%m-%d"),
+    "month": (timedelta(days=1), 30, "%Y-%m-%d"),
+    "year": (timedelta(days=30), 12, "%Y-%m"),
+}
+
+def period_intervals(period: str, now: datetime) -> Tuple[datetime, timedelta, int, str]:
+    """Начало первого интервала, длина и число интервалов, заканчивающихся в now"""
+    step, count, period_format = PERIODS.get(period, PERIODS["year"])
+    return now - step * count, step, count, period_format
+
+def period_stats_statement(user_id: int, start: datetime, step: timedelta, count: int):
+    """Расход по сценариям во всех интервалах периода одним запросом.
+
+    Номер интервала вычисляется из created_at, поэтому вместо запроса
+    на каждый интервал достаточно одного GROUP BY (интервал, сценарий).
+    """
+    offset = func.extract('epoch', CreditTransaction.created_at) - start.replace(tzinfo=timezone.utc).timestamp()
+    usage = select(
+        cast(func.least(func.floor(offset / step.total_seconds()), count - 1), Integer).label('bucket'),
+        CreditTransaction.scenario_type,
+        CreditTransaction.amount
+    ).where(
+        CreditTransaction.user_id == user_id,
+        CreditTransaction.transaction_type == 'scenario_usage',
+        CreditTransaction.created_at.between(start, start + step * count)
+    ).subquery()
+
+    return select(
+        usage.c.bucket,
+        usage.c.scenario_type,
+        func.sum(usage.c.amount).label('total_usage'),
+        func.count().label('usage_count')
+    ).group_by(usage.c.bucket, usage.c.scenario_type)\
+        .order_by(usage.c.bucket, usage.c.scenario_type)
+
+def period_stats_result(rows, start: datetime, step: timedelta, count: int, period_format: str) -> List[dict]:
+    stats = [{
+        "period": (start + step * i).strftime(period_format),
+        "total_spent": 0,
+        "scenario_breakdown": []
+    } for i in range(count)]
+
+    for row in rows:
+        interval = stats[row.bucket]
+        interval["total_spent"] += abs(row.total_usage)
+        interval["scenario_breakdown"].append({
+            "scenario_type": row.scenario_type,
+            "total_usage": abs(row.total_usage),
+            "credit_cost": abs(row.total_usage),
+            "usage_count": row.usage_count
+        })
+    return stats
+
 class CreditRepositoryImpl:
     def __init__(self):
         self.redis_client = get_redis_client()
@@ -32,30 +154,22 @@ class CreditRepositoryImpl:
         """Add credits to user's balance"""
         with get_db_session() as session:
             try:
-                user_credits = session.query(UserCredits).filter(
-                    UserCredits.user_id == user_id
-                ).first()
-                
-                if not user_credits:
-                    user_credits = UserCredits(user_id=user_id, balance=amount)
-                else:
-                    user_credits.balance += amount
-                    
-                session.add(user_credits)
+                balance = session.execute(credit_statement(user_id, amount)).scalar_one()
                 
                 transaction = CreditTransaction(
                     user_id=user_id,
                     amount=amount,
                     transaction_type=transaction_type,
-                    description=description
+                    description=description,
+                    balance_after=balance
                 )
                 session.add(transaction)
                 session.commit()
                 
                 cache_key = f"credits:{user_id}"
-                self.redis_client.setex(cache_key, 300, str(user_credits.balance))
+                self.redis_client.setex(cache_key, 300, str(balance))
                 
-                return True, user_credits.balance
+                return True, balance
                 
             except Exception as e:
                 session.rollback()
@@ -63,70 +177,52 @@ class CreditRepositoryImpl:
     
     def spend_credits(self, user_id, amount, scenario_type=None, description=None):
         """Списание кредитов с баланса пользователя"""
+        try:
+            result = self.deduct_credits(user_id, amount, 'scenario_usage', scenario_type, description)
+        except ValueError:
+            return False, "Insufficient credits"
+        return True, result["balance"]
+
+    def deduct_credits(
+        self,
+        user_id: int,
+        amount: int,
+        transaction_type: str,
+        scenario_type: Optional[str] = None,
+        description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Атомарное списание: UPDATE с проверкой баланса и запись в журнал в одной транзакции"""
         with get_db_session() as session:
-            # Получаем текущий баланс
-            current_balance = self.get_user_balance(user_id)
-            
-            # Проверяем достаточность средств
-            if current_balance < amount:
-                return False, "Insufficient credits"
-            
-            # Получаем запись о кредитах пользователя
-            user_credits = session.query(UserCredits).filter(
-                UserCredits.user_id == user_id
-            ).first()
-            
-            if not user_credits:
-                user_credits = UserCredits(user_id=user_id, balance=0)
-                session.add(user_credits)
-            
-            # Создаем запись о транзакции
+            balance = session.execute(debit_statement(user_id, amount)).scalar()
+            if balance is None:
+                raise ValueError("Insufficient credit balance")
+
             transaction = CreditTransaction(
                 user_id=user_id,
                 amount=-amount,  # Отрицательное значение для списания
-                transaction_type='scenario_usage',
+                transaction_type=transaction_type,
                 scenario_type=scenario_type,
-                description=description
+                description=description,
+                balance_after=balance
             )
-            
-            # Обновляем баланс
-            user_credits.balance -= amount
-            session.add(user_credits)
-            session.commit()
-            
-            # Инвалидируем кэш
-            cache_key = f"credits:{user_id}"
-            self.redis_client.delete(cache_key)
-            
-            # Получаем обновленный баланс
-            total_balance = self.get_user_balance(user_id)
-            
-            return True, total_balance
+            session.add(transaction)
+            session.flush()
+            result = debit_result(transaction, balance)
+
+        self.redis_client.setex(f"credits:{user_id}", 300, str(balance))
+        return result
     
     def get_transaction_history(
         self,
         user_id: int,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Get user's transaction history"""
         with get_db_session() as session:
-            transactions = session.query(CreditTransaction)\
-                .filter(CreditTransaction.user_id == user_id)\
-                .order_by(desc(CreditTransaction.created_at))\
-                .offset(offset)\
-                .limit(limit)\
-                .all()
-            
-            return [{
-                "id": t.id,
-                "user_id": t.user_id,
-                "amount": t.amount,
-                "transaction_type": t.transaction_type,
-                "scenario_type": t.scenario_type,
-                "description": t.description,
-                "created_at": t.created_at.isoformat()
-            } for t in transactions]
+            transactions = session.scalars(transaction_history_statement(user_id, limit, offset, cursor)).all()
+            return [transaction_entry(t) for t in transactions]
 
     def get_scenario_usage_stats(
         self,
@@ -158,58 +254,10 @@ class CreditRepositoryImpl:
             return list(usage_by_type.values())
 
     def get_period_stats(self, user_id: int, period: str) -> List[dict]:
+        start, step, count, period_format = period_intervals(period, datetime.utcnow())
         with get_db_session() as session:
-            now = datetime.utcnow()
-            
-            if period == "day":
-                intervals = [(now - timedelta(hours=i), now - timedelta(hours=i-1)) 
-                           for i in range(24, 0, -1)]
-                period_format = "%H:00"
-            elif period == "week":
-                intervals = [(now - timedelta(days=i), now - timedelta(days=i-1)) 
-                           for i in range(7, 0, -1)]
-                period_format = "%Y-%m-%d"
-            elif period == "month":
-                intervals = [(now - timedelta(days=i), now - timedelta(days=i-1)) 
-                           for i in range(30, 0, -1)]
-                period_format = "%Y-%m-%d"
-            else:  # year
-                intervals = [(now - timedelta(days=i*30), now - timedelta(days=(i-1)*30)) 
-                           for i in range(12, 0, -1)]
-                period_format = "%Y-%m"
-
-            stats = []
-            for start, end in intervals:
-                period_stats = session.query(
-                    func.sum(CreditTransaction.amount).label('total_spent')
-                ).filter(
-                    CreditTransaction.user_id == user_id,
-                    CreditTransaction.transaction_type == 'scenario_usage',
-                    CreditTransaction.created_at.between(start, end)
-                ).scalar() or 0
-
-                scenario_stats = session.query(
-                    CreditTransaction.scenario_type,
-                    func.sum(CreditTransaction.amount).label('total_usage'),
-                    func.count(CreditTransaction.id).label('usage_count')
-                ).filter(
-                    CreditTransaction.user_id == user_id,
-                    CreditTransaction.transaction_type == 'scenario_usage',
-                    CreditTransaction.created_at.between(start, end)
-                ).group_by(CreditTransaction.scenario_type).all()
-
-                stats.append({
-                    "period": start.strftime(period_format),
-                    "total_spent": abs(period_stats),
-                    "scenario_breakdown": [{
-                        "scenario_type": stat.scenario_type,
-                        "total_usage": abs(stat.total_usage),
-                        "credit_cost": abs(stat.total_usage),
-                        "usage_count": stat.usage_count
-                    } for stat in scenario_stats]
-                })
-
-            return stats 
+            rows = session.execute(period_stats_statement(user_id, start, step, count)).all()
+        return period_stats_result(rows, start, step, count, period_format)
 
     def create_transaction(
         self,
@@ -219,41 +267,26 @@ class CreditRepositoryImpl:
         description: Optional[str] = None
     ) -> Dict[str, Any]:
         """Создание новой транзакции по кредитам"""
+        if amount < 0:
+            return self.deduct_credits(user_id, -amount, transaction_type, description=description)
+
         with get_db_session() as session:
-            # Получаем текущий баланс
-            current_balance = self.get_user_balance(user_id)
-            
-            # Проверяем достаточность средств при списании
-            if amount < 0 and current_balance + amount < 0:
-                raise ValueError("Insufficient credit balance")
-            
+            # Обновляем баланс пользователя и получаем новый
+            new_balance = session.execute(credit_statement(user_id, amount)).scalar_one()
+
             # Создаем запись о транзакции
             transaction = CreditTransaction(
                 user_id=user_id,
                 amount=amount,
                 transaction_type=transaction_type,
                 description=description,
-                created_at=datetime.now()
+                created_at=datetime.utcnow(),
+                balance_after=new_balance
             )
             session.add(transaction)
-            
-            # Обновляем баланс пользователя
-            user_credits = session.query(UserCredits).filter(
-                UserCredits.user_id == user_id
-            ).first()
-            
-            if not user_credits:
-                user_credits = UserCredits(user_id=user_id, balance=amount)
-            else:
-                user_credits.balance += amount
-                
-            session.add(user_credits)
             session.commit()
             session.refresh(transaction)
             
-            # Получаем новый баланс
-            new_balance = user_credits.balance
-            
             # Обновляем кэш в Redis
             cache_key = f"credits:{user_id}"
             self.redis_client.setex(cache_key, 300, str(new_balance))
@@ -266,4 +299,183 @@ class CreditRepositoryImpl:
                 "description": transaction.description,
                 "created_at": transaction.created_at.isoformat(),
                 "balance": new_balance
-            } 
\ No newline at end of file
+            } 
+
+class AsyncCreditRepositoryImpl:
+    """Асинхронная версия CreditRepositoryImpl для обработчиков FastAPI.
+
+    При CREDIT_LEDGER=redis баланс и операции ведутся в журнале Redis
+    (credit_ledger), в БД они попадают с задержкой фонового писателя.
+    """
+
+    def __init__(self, ledger=credit_ledger if CREDIT_LEDGER == "redis" else None):
+        self.redis_client = get_async_redis_client()
+        self.ledger = ledger
+
+    async def get_user_balance(self, user_id: int) -> int:
+        """Получение текущего баланса кредитов пользователя"""
+        if self.ledger:
+            return await self.ledger.balance(user_id)
+
+        cache_key = f"credits:{user_id}"
+        cached_balance = await self.redis_client.get(cache_key)
+
+        if cached_balance:
+            return int(cached_balance)
+
+        async with get_async_db_session() as session:
+            balance = await session.scalar(
+                select(UserCredits.balance).where(UserCredits.user_id == user_id).limit(1)
+            )
+
+        if balance is None:
+            return 0
+
+        await self.redis_client.setex(cache_key, 300, str(balance))
+        return balance
+
+    async def add_credits(self, user_id: int, amount: int, transaction_type: str, description: Optional[str] = None) -> tuple[bool, int|str]:
+        """Add credits to user's balance"""
+        try:
+            if self.ledger:
+                result = await self.ledger.apply(user_id, amount, transaction_type, description=description)
+                return True, result["balance"]
+
+            async with get_async_db_session() as session:
+                balance = (await session.execute(credit_statement(user_id, amount))).scalar_one()
+                session.add(CreditTransaction(
+                    user_id=user_id,
+                    amount=amount,
+                    transaction_type=transaction_type,
+                    description=description,
+                    balance_after=balance
+                ))
+        except Exception as e:
+            return False, str(e)
+
+        await self.redis_client.setex(f"credits:{user_id}", 300, str(balance))
+        return True, balance
+
+    async def spend_credits(self, user_id, amount, scenario_type=None, description=None):
+        """Списание кредитов с баланса пользователя"""
+        try:
+            result = await self.deduct_credits(user_id, amount, 'scenario_usage', scenario_type, description)
+        except ValueError:
+            return False, "Insufficient credits"
+        return True, result["balance"]
+
+    async def deduct_credits(
+        self,
+        user_id: int,
+        amount: int,
+        transaction_type: str,
+        scenario_type: Optional[str] = None,
+        description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Атомарное списание: UPDATE с проверкой баланса и запись в журнал в одной транзакции"""
+        if self.ledger:
+            return await self.ledger.apply(user_id, -amount, transaction_type, scenario_type, description)
+
+        async with get_async_db_session() as session:
+            balance = (await session.execute(debit_statement(user_id, amount))).scalar()
+            if balance is None:
+                raise ValueError("Insufficient credit balance")
+
+            transaction = CreditTransaction(
+                user_id=user_id,
+                amount=-amount,  # Отрицательное значение для списания
+                transaction_type=transaction_type,
+                scenario_type=scenario_type,
+                description=description,
+                balance_after=balance
+            )
+            session.add(transaction)
+            await session.flush()
+            result = debit_result(transaction, balance)
+
+        await self.redis_client.setex(f"credits:{user_id}", 300, str(balance))
+        return result
+
+    async def get_transaction_history(
+        self,
+        user_id: int,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get user's transaction history"""
+        async with get_async_db_session() as session:
+            transactions = (await session.scalars(transaction_history_statement(user_id, limit, offset, cursor))).all()
+            return [transaction_entry(t) for t in transactions]
+
+    async def get_scenario_usage_stats(
+        self,
+        user_id: int,
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get usage statistics for different scenarios"""
+        scenario = func.coalesce(CreditTransaction.scenario_type, CreditTransaction.transaction_type)
+        async with get_async_db_session() as session:
+            rows = (await session.execute(
+                select(
+                    scenario.label('scenario_type'),
+                    func.sum(CreditTransaction.amount).label('total_usage'),
+                    func.count(CreditTransaction.id).label('usage_count')
+                ).where(
+                    CreditTransaction.user_id == user_id,
+                    CreditTransaction.created_at >= start_date,
+                    CreditTransaction.created_at <= end_date,
+                    CreditTransaction.amount < 0
+                ).group_by(scenario)
+            )).all()
+
+        return [{
+            "scenario_type": row.scenario_type,
+            "total_usage": abs(row.total_usage),
+            "usage_count": row.usage_count
+        } for row in rows]
+
+    async def get_period_stats(self, user_id: int, period: str) -> List[dict]:
+        start, step, count, period_format = period_intervals(period, datetime.utcnow())
+        async with get_async_db_session() as session:
+            rows = (await session.execute(period_stats_statement(user_id, start, step, count))).all()
+        return period_stats_result(rows, start, step, count, period_format)
+
+    async def create_transaction(
+        self,
+        user_id: int,
+        amount: int,
+        transaction_type: str,
+        description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Создание новой транзакции по кредитам"""
+        if amount < 0:
+            return await self.deduct_credits(user_id, -amount, transaction_type, description=description)
+        if self.ledger:
+            return await self.ledger.apply(user_id, amount, transaction_type, description=description)
+
+        async with get_async_db_session() as session:
+            new_balance = (await session.execute(credit_statement(user_id, amount))).scalar_one()
+            transaction = CreditTransaction(
+                user_id=user_id,
+                amount=amount,
+                transaction_type=transaction_type,
+                description=description,
+                created_at=datetime.utcnow(),
+                balance_after=new_balance
+            )
+            session.add(transaction)
+            await session.flush()
+
+        await self.redis_client.setex(f"credits:{user_id}", 300, str(new_balance))
+
+        return {
+            "id": transaction.id,
+            "user_id": transaction.user_id,
+            "amount": transaction.amount,
+            "transaction_type": transaction.transaction_type,
+            "description": transaction.description,
+            "created_at": transaction.created_at.isoformat(),
+            "balance": new_balance
+        }
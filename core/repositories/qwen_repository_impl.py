@@ -1,7 +1,9 @@
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from infrastructure.db.db_connection import get_db_session
+from infrastructure.db.db_connection import get_async_db_session, get_db_session
 from infrastructure.db.models import QwenHistory
+from infrastructure.db.pagination import after_cursor
+from sqlalchemy import select
 
 
 class QwenRepositoryImpl:
@@ -21,7 +23,7 @@ class QwenRepositoryImpl:
                 prompt=prompt,
                 response=response,
                 tokens_used=len(response.split()),
-                created_at=datetime.now()
+                created_at=datetime.utcnow()
             )
             session.add(history)
             session.commit()
@@ -33,13 +35,17 @@ class QwenRepositoryImpl:
         self,
         user_id: int,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Get chat history for a user"""
+        """Get chat history for a user, newest first, after the cursor if given"""
+        keyset = after_cursor(QwenHistory.created_at, QwenHistory.id, cursor)
         with get_db_session() as session:
-            history = session.query(QwenHistory)\
-                .filter(QwenHistory.user_id == user_id)\
-                .order_by(QwenHistory.created_at.desc())\
+            query = session.query(QwenHistory).filter(QwenHistory.user_id == user_id)
+            if keyset is not None:
+                query = query.filter(keyset)
+            history = query\
+                .order_by(QwenHistory.created_at.desc(), QwenHistory.id.desc())\
                 .offset(offset)\
                 .limit(limit)\
                 .all()
@@ -53,4 +59,61 @@ class QwenRepositoryImpl:
                     "created_at": h.created_at.isoformat()
                 }
                 for h in history
-            ] 
\ No newline at end of file
+            ]
+
+
+class AsyncQwenRepositoryImpl:
+    """Асинхронная версия QwenRepositoryImpl для обработчиков FastAPI"""
+
+    async def process_request(
+        self,
+        user_id: int,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> str:
+        """Process a Qwen chat request"""
+        response = f"Mock response for prompt: {prompt}"
+
+        async with get_async_db_session() as session:
+            session.add(QwenHistory(
+                user_id=user_id,
+                prompt=prompt,
+                response=response,
+                tokens_used=len(response.split()),
+                created_at=datetime.utcnow()
+            ))
+
+        return response
+
+    async def get_history(
+        self,
+        user_id: int,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get chat history for a user, newest first, after the cursor if given"""
+        keyset = after_cursor(QwenHistory.created_at, QwenHistory.id, cursor)
+        query = select(QwenHistory).where(QwenHistory.user_id == user_id)
+        if keyset is not None:
+            query = query.where(keyset)
+
+        async with get_async_db_session() as session:
+            history = (await session.scalars(
+                query
+                .order_by(QwenHistory.created_at.desc(), QwenHistory.id.desc())
+                .offset(offset)
+                .limit(limit)
+            )).all()
+
+            return [
+                {
+                    "id": h.id,
+                    "prompt": h.prompt,
+                    "response": h.response,
+                    "tokens_used": h.tokens_used,
+                    "created_at": h.created_at.isoformat()
+                }
+                for h in history
+            ]
@@ -1,8 +1,97 @@
-from infrastructure.db.db_connection import get_db_session
-from infrastructure.db.models import RequestHistory as RequestHistoryModel, CreditTransaction
+from infrastructure.db.analytics_rollup import rolled_up_until
+from infrastructure.db.db_connection import get_async_db_session, get_db_session
+from infrastructure.db.pagination import after_cursor
+from infrastructure.db.models import (
+    RequestHistory as RequestHistoryModel, CreditTransaction, DailyCreditStats, DailyRequestStats, QwenHistory
+)
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from sqlalchemy import func
+from sqlalchemy import BigInteger, cast, func, select, union_all
+from sqlalchemy.orm import selectinload
+
+
+def sum_as_int(column):
+    # SUM по bigint в PostgreSQL возвращает numeric
+    return cast(func.sum(column), BigInteger)
+
+def usage_statistics_statement(user_id: int):
+    """Запросы по типам: дневные сводки до границы и исходные записи после нее"""
+    until = rolled_up_until()
+    usage = union_all(
+        select(
+            DailyRequestStats.request_type,
+            DailyRequestStats.total,
+            DailyRequestStats.successful,
+            DailyRequestStats.processing_time_sum,
+            DailyRequestStats.processing_time_count
+        ).where(DailyRequestStats.user_id == user_id, DailyRequestStats.day < until),
+        select(
+            RequestHistoryModel.request_type,
+            func.count(RequestHistoryModel.id),
+            func.count(RequestHistoryModel.id).filter(RequestHistoryModel.status == "success"),
+            func.coalesce(func.sum(RequestHistoryModel.processing_time), 0),
+            func.count(RequestHistoryModel.processing_time)
+        ).where(RequestHistoryModel.user_id == user_id, RequestHistoryModel.created_at >= until)
+         .group_by(RequestHistoryModel.request_type)
+    ).subquery()
+
+    return select(
+        usage.c.request_type,
+        sum_as_int(usage.c.total).label("total"),
+        sum_as_int(usage.c.successful).label("successful"),
+        sum_as_int(usage.c.processing_time_sum).label("processing_time_sum"),
+        sum_as_int(usage.c.processing_time_count).label("processing_time_count")
+    ).group_by(usage.c.request_type)
+
+def usage_statistics(rows) -> Dict[str, Any]:
+    total_requests = sum(row.total for row in rows)
+    success_count = sum(row.successful for row in rows)
+    timed = sum(row.processing_time_count for row in rows)
+    return {
+        "total_requests": total_requests,
+        "successful_requests": success_count,
+        "failed_requests": total_requests - success_count,
+        "success_rate": (success_count / total_requests * 100) if total_requests > 0 else 0,
+        "average_processing_time": sum(row.processing_time_sum for row in rows) / timed if timed else 0,
+        "requests_by_type": {row.request_type: row.total for row in rows}
+    }
+
+def credit_statistics_statement(user_id: int):
+    """Операции по типам: дневные сводки до границы и исходные записи после нее"""
+    until = rolled_up_until()
+    credits = union_all(
+        select(
+            DailyCreditStats.transaction_type,
+            DailyCreditStats.transactions,
+            DailyCreditStats.earned,
+            DailyCreditStats.spent
+        ).where(DailyCreditStats.user_id == user_id, DailyCreditStats.day < until),
+        select(
+            CreditTransaction.transaction_type,
+            func.count(CreditTransaction.id),
+            func.coalesce(func.sum(CreditTransaction.amount).filter(CreditTransaction.amount > 0), 0),
+            func.coalesce(func.sum(CreditTransaction.amount).filter(CreditTransaction.amount < 0), 0)
+        ).where(CreditTransaction.user_id == user_id, CreditTransaction.created_at >= until)
+         .group_by(CreditTransaction.transaction_type)
+    ).subquery()
+
+    return select(
+        credits.c.transaction_type,
+        sum_as_int(credits.c.transactions).label("transactions"),
+        sum_as_int(credits.c.earned).label("earned"),
+        sum_as_int(credits.c.spent).label("spent")
+    ).group_by(credits.c.transaction_type)
+
+def credit_statistics(rows) -> Dict[str, Any]:
+    earned = sum(row.earned for row in rows)
+    spent = sum(row.spent for row in rows)
+    return {
+        "current_balance": earned + spent,
+        "total_earned": earned,
+        "total_spent": abs(spent),
+        "transactions_by_type": {row.transaction_type: row.transactions for row in rows}
+    }
+
 
 
 class RequestHistoryRepositoryImpl:
@@ -62,9 +151,10 @@ class RequestHistoryRepositoryImpl:
         request_type: Optional[str] = None,
         status: Optional[str] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Get user request history with optional filters"""
+        """Get user request history with optional filters, after the cursor if given"""
         with get_db_session() as session:
             query = session.query(RequestHistoryModel).filter(RequestHistoryModel.user_id == user_id)
             
@@ -76,8 +166,11 @@ class RequestHistoryRepositoryImpl:
                 query = query.filter(RequestHistoryModel.created_at >= start_date)
             if end_date:
                 query = query.filter(RequestHistoryModel.created_at <= end_date)
+            if cursor:
+                query = query.filter(after_cursor(RequestHistoryModel.created_at, RequestHistoryModel.id, cursor))
             
-            history = query.order_by(RequestHistoryModel.created_at.desc()).offset(offset).limit(limit).all()
+            history = query.order_by(RequestHistoryModel.created_at.desc(), RequestHistoryModel.id.desc())\
+                .offset(offset).limit(limit).all()
             
             return [
                 {
@@ -93,63 +186,12 @@ class RequestHistoryRepositoryImpl:
     def get_usage_statistics(self, user_id: int) -> Dict[str, Any]:
         """Get usage statistics for a user"""
         with get_db_session() as session:
-            total_requests = session.query(func.count(RequestHistoryModel.id))\
-                .filter(RequestHistoryModel.user_id == user_id).scalar()
-            
-            success_count = session.query(func.count(RequestHistoryModel.id))\
-                .filter(RequestHistoryModel.user_id == user_id, RequestHistoryModel.status == "success").scalar()
-            failed_count = total_requests - success_count
-            success_rate = (success_count / total_requests * 100) if total_requests > 0 else 0
-            
-            avg_processing_time = session.query(func.avg(RequestHistoryModel.processing_time))\
-                .filter(RequestHistoryModel.user_id == user_id).scalar() or 0
-            
-            requests_by_type = {}
-            type_counts = session.query(
-                RequestHistoryModel.request_type,
-                func.count(RequestHistoryModel.id)
-            ).filter(RequestHistoryModel.user_id == user_id)\
-             .group_by(RequestHistoryModel.request_type).all()
-            
-            for request_type, count in type_counts:
-                requests_by_type[request_type] = count
-            
-            return {
-                "total_requests": total_requests,
-                "successful_requests": success_count,
-                "failed_requests": failed_count,
-                "success_rate": success_rate,
-                "average_processing_time": avg_processing_time,
-                "requests_by_type": requests_by_type
-            }
+            return usage_statistics(session.execute(usage_statistics_statement(user_id)).all())
 
     def get_credit_statistics(self, user_id: int) -> Dict[str, Any]:
         """Get credit statistics for a user"""
         with get_db_session() as session:
-            current_balance = session.query(func.sum(CreditTransaction.amount))\
-                .filter(CreditTransaction.user_id == user_id).scalar() or 0
-            
-            earned = session.query(func.sum(CreditTransaction.amount))\
-                .filter(CreditTransaction.user_id == user_id, CreditTransaction.amount > 0).scalar() or 0
-            spent = abs(session.query(func.sum(CreditTransaction.amount))\
-                .filter(CreditTransaction.user_id == user_id, CreditTransaction.amount < 0).scalar() or 0)
-            
-            transactions_by_type = {}
-            type_counts = session.query(
-                CreditTransaction.transaction_type,
-                func.count(CreditTransaction.id)
-            ).filter(CreditTransaction.user_id == user_id)\
-             .group_by(CreditTransaction.transaction_type).all()
-            
-            for transaction_type, count in type_counts:
-                transactions_by_type[transaction_type] = count
-            
-            return {
-                "current_balance": current_balance,
-                "total_earned": earned,
-                "total_spent": spent,
-                "transactions_by_type": transactions_by_type
-            }
+            return credit_statistics(session.execute(credit_statistics_statement(user_id)).all())
     
     def get_request_details(self, request_id):
         """
@@ -179,4 +221,117 @@ class RequestHistoryRepositoryImpl:
                     "created_at": db_request.created_at.isoformat() if db_request.created_at else None
                 }
             
-            return None 
\ No newline at end of file
+            return None
+
+
+def history_entry(h: RequestHistoryModel) -> Dict[str, Any]:
+    """Запись истории вместе с диалогом Qwen, если он есть"""
+    return {
+        "id": h.id,
+        "request_type": h.request_type,
+        "request_data": h.request_data,
+        "status": h.status,
+        "error_message": h.error_message,
+        "processing_time": h.processing_time,
+        "created_at": h.created_at.isoformat(),
+        "qwen_history": {
+            "prompt": h.qwen_history.prompt,
+            "response": h.qwen_history.response,
+            "tokens_used": h.qwen_history.tokens_used
+        } if h.qwen_history else None
+    }
+
+
+class AsyncRequestHistoryRepositoryImpl:
+    """Асинхронная версия RequestHistoryRepositoryImpl для обработчиков FastAPI"""
+
+    async def create_request(
+        self,
+        user_id: int,
+        request_type: str,
+        request_data: Optional[str],
+        status: str,
+        error_message: Optional[str] = None,
+        processing_time: Optional[int] = None,
+        qwen: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Запись запроса в историю, для диалога с ИИ - вместе с записью Qwen в той же транзакции"""
+        async with get_async_db_session() as session:
+            request = RequestHistoryModel(
+                user_id=user_id,
+                request_type=request_type,
+                request_data=request_data,
+                status=status,
+                error_message=error_message,
+                processing_time=processing_time
+            )
+            qwen_history = None
+            if qwen:
+                qwen_history = QwenHistory(
+                    user_id=user_id,
+                    prompt=qwen["prompt"],
+                    response=qwen["response"],
+                    tokens_used=qwen["tokens_used"]
+                )
+            request.qwen_history = qwen_history
+            session.add(request)
+            await session.commit()
+            return history_entry(request)
+
+    async def get_user_history(
+        self,
+        user_id: int,
+        limit: int = 50,
+        offset: int = 0,
+        request_type: Optional[str] = None,
+        status: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        with_qwen: bool = False,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get user request history with optional filters, after the cursor if given"""
+        query = select(RequestHistoryModel).where(RequestHistoryModel.user_id == user_id)
+
+        if request_type:
+            query = query.where(RequestHistoryModel.request_type == request_type)
+        if status:
+            query = query.where(RequestHistoryModel.status == status)
+        if start_date:
+            query = query.where(RequestHistoryModel.created_at >= start_date)
+        if end_date:
+            query = query.where(RequestHistoryModel.created_at <= end_date)
+        if cursor:
+            query = query.where(after_cursor(RequestHistoryModel.created_at, RequestHistoryModel.id, cursor))
+        if with_qwen:
+            # Асинхронная сессия не подгружает связи лениво
+            query = query.options(selectinload(RequestHistoryModel.qwen_history))
+
+        query = query.order_by(RequestHistoryModel.created_at.desc(), RequestHistoryModel.id.desc())\
+            .offset(offset).limit(limit)
+
+        async with get_async_db_session() as session:
+            history = (await session.scalars(query)).all()
+
+            if with_qwen:
+                return [history_entry(h) for h in history]
+            return [
+                {
+                    "id": h.id,
+                    "request_type": h.request_type,
+                    "status": h.status,
+                    "processing_time": h.processing_time,
+                    "created_at": h.created_at.isoformat()
+                }
+                for h in history
+            ]
+
+    async def get_usage_statistics(self, user_id: int) -> Dict[str, Any]:
+        """Get usage statistics for a user"""
+        async with get_async_db_session() as session:
+            return usage_statistics((await session.execute(usage_statistics_statement(user_id))).all())
+
+    async def get_credit_statistics(self, user_id: int) -> Dict[str, Any]:
+        """Get credit statistics for a user"""
+        async with get_async_db_session() as session:
+            return credit_statistics((await session.execute(credit_statistics_statement(user_id))).all())
@@ -1,7 +1,8 @@
 from core.repositories.user_repository import UserRepository
 from core.entities.user import User
-from infrastructure.db.db_connection import get_db_session
+from infrastructure.db.db_connection import get_async_db_session, get_db_session
 from infrastructure.db.models import User as UserModel
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 
 
@@ -95,3 +96,80 @@ class UserRepositoryImpl(UserRepository):
                     user_role=db_user.user_role  
                 )
             return None
+
+
+def to_entity(db_user: UserModel) -> User:
+    """Преобразование модели БД в доменную сущность"""
+    return User(
+        id=db_user.id,
+        name=db_user.name,
+        email=db_user.email,
+        password_hash=db_user.password_hash,
+        user_role=db_user.user_role
+    )
+
+
+class AsyncUserRepositoryImpl(UserRepository):
+    """Асинхронная версия UserRepositoryImpl для обработчиков FastAPI"""
+
+    async def save(self, user):
+        """
+        Save a user to the database.
+
+        Args:
+            user: User entity to save
+
+        Returns:
+            User entity with the ID from the database
+        """
+        try:
+            async with get_async_db_session() as session:
+                if user.id:
+                    db_user = await session.get(UserModel, user.id)
+                    if not db_user:
+                        return None
+                    db_user.name = user.name
+                    db_user.email = user.email
+                    db_user.password_hash = user.password_hash
+                else:
+                    db_user = UserModel(
+                        name=user.name,
+                        email=user.email,
+                        password_hash=user.password_hash,
+                        user_role=user.user_role
+                    )
+                    session.add(db_user)
+
+                await session.commit()
+
+            return to_entity(db_user)
+        except IntegrityError:
+            return None
+
+    async def get_by_id(self, user_id):
+        """
+        Get a user by ID.
+
+        Args:
+            user_id: ID of the user to retrieve
+
+        Returns:
+            User entity or None if not found
+        """
+        async with get_async_db_session() as session:
+            db_user = await session.get(UserModel, user_id)
+            return to_entity(db_user) if db_user else None
+
+    async def get_by_email(self, email):
+        """
+        Get a user by email.
+
+        Args:
+            email: Email of the user to retrieve
+
+        Returns:
+            User entity or None if not found
+        """
+        async with get_async_db_session() as session:
+            db_user = await session.scalar(select(UserModel).where(UserModel.email == email).limit(1))
+            return to_entity(db_user) if db_user else None
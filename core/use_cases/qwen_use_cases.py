@@ -16,7 +16,8 @@ class QwenUseCase:
         self,
         input_data: LLMInput,
         max_length: Optional[int] = None,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
     ) -> LLMResult:
         try:
             logger.debug(
@@ -27,7 +28,8 @@ class QwenUseCase:
             response = await self.model.generate(
                 input_data=input_data,
                 max_length=max_length or 512,
-                temperature=temperature
+                temperature=temperature,
+                deadline=deadline
             )
             
             logger.debug(f"Received response: {response.text[:100]}...")
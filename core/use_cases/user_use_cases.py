@@ -2,8 +2,10 @@ from core.entities.user import User
 
 
 class UserUseCases:
-    def __init__(self, user_repository):
+    def __init__(self, user_repository, on_user_changed=None):
         self.user_repository = user_repository
+        # Callback with the id of an updated user (e.g. cache invalidation)
+        self.on_user_changed = on_user_changed
 
     def register_user(self, name: str, email: str):
         """
@@ -55,7 +57,10 @@ class UserUseCases:
         Returns:
             Updated user entity or None if update failed
         """
-        return self.user_repository.save(user)
+        updated_user = self.user_repository.save(user)
+        if updated_user and self.on_user_changed:
+            self.on_user_changed(updated_user.id)
+        return updated_user
     
     def get_user_preferences(self, user_id: int):
         """
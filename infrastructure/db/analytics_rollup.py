@@ -0,0 +1,127 @@
+"""Дневные сводки для статистики использования и кредитов.
+
+Фоновое задание переносит завершившиеся дни из request_history и
+credit_transactions в таблицы daily_request_stats и daily_credit_stats.
+Граница сводок (analytics_rollup_state.rolled_up_until) обновляется в той же
+транзакции, поэтому статистика всегда читается как сводки до границы плюс
+исходные записи после нее. День сворачивается спустя ANALYTICS_ROLLUP_GRACE
+секунд после окончания, чтобы успели записаться операции, отложенные
+журналом кредитов.
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from sqlalchemy import Date, cast, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from infrastructure.db.db_connection import get_async_db_session
+from infrastructure.db.models import (
+    AnalyticsRollupState, CreditTransaction, DailyCreditStats, DailyRequestStats, RequestHistory
+)
+
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ROLLUP_INTERVAL = float(os.getenv('ANALYTICS_ROLLUP_INTERVAL', '3600'))
+ANALYTICS_ROLLUP_GRACE = float(os.getenv('ANALYTICS_ROLLUP_GRACE', '300'))
+
+def rolled_up_until():
+    """Граница сводок как подзапрос: статистика и граница читаются одним запросом."""
+    return func.coalesce(
+        select(AnalyticsRollupState.rolled_up_until).where(AnalyticsRollupState.id == 1).scalar_subquery(),
+        date(1970, 1, 1)
+    )
+
+def request_rollup_statement(since: Optional[datetime], until: datetime):
+    day = cast(RequestHistory.created_at, Date)
+    window = [RequestHistory.created_at < until]
+    if since:
+        window.append(RequestHistory.created_at >= since)
+    return insert(DailyRequestStats).from_select(
+        ["user_id", "day", "request_type", "total", "successful", "processing_time_sum", "processing_time_count"],
+        select(
+            RequestHistory.user_id,
+            day,
+            RequestHistory.request_type,
+            func.count(RequestHistory.id),
+            func.count(RequestHistory.id).filter(RequestHistory.status == "success"),
+            func.coalesce(func.sum(RequestHistory.processing_time), 0),
+            func.count(RequestHistory.processing_time)
+        ).where(*window).group_by(RequestHistory.user_id, day, RequestHistory.request_type)
+    )
+
+def credit_rollup_statement(since: Optional[datetime], until: datetime):
+    day = cast(CreditTransaction.created_at, Date)
+    window = [CreditTransaction.created_at < until]
+    if since:
+        window.append(CreditTransaction.created_at >= since)
+    return insert(DailyCreditStats).from_select(
+        ["user_id", "day", "transaction_type", "transactions", "earned", "spent"],
+        select(
+            CreditTransaction.user_id,
+            day,
+            CreditTransaction.transaction_type,
+            func.count(CreditTransaction.id),
+            func.coalesce(func.sum(CreditTransaction.amount).filter(CreditTransaction.amount > 0), 0),
+            func.coalesce(func.sum(CreditTransaction.amount).filter(CreditTransaction.amount < 0), 0)
+        ).where(*window).group_by(CreditTransaction.user_id, day, CreditTransaction.transaction_type)
+    )
+
+class AnalyticsRollup:
+    """Периодическое сворачивание завершившихся дней в дневные сводки."""
+
+    def __init__(self, interval: float = ANALYTICS_ROLLUP_INTERVAL, grace: float = ANALYTICS_ROLLUP_GRACE):
+        self.interval = interval
+        self.grace = grace
+        self._task: Optional[asyncio.Task] = None
+
+    async def compact(self, now: Optional[datetime] = None) -> Optional[date]:
+        """Сворачивание дней от прошлой границы до текущей, возвращает новую границу.
+
+        Строка состояния блокируется на время транзакции, поэтому задания
+        нескольких процессов API не сворачивают один день дважды.
+        """
+        until = ((now or datetime.utcnow()) - timedelta(seconds=self.grace)).date()
+        async with get_async_db_session() as session:
+            await session.execute(
+                pg_insert(AnalyticsRollupState).values(id=1, rolled_up_until=None).on_conflict_do_nothing()
+            )
+            state = await session.scalar(
+                select(AnalyticsRollupState).where(AnalyticsRollupState.id == 1).with_for_update()
+            )
+            since = state.rolled_up_until
+            if since is not None and since >= until:
+                return since
+
+            since_at = datetime.combine(since, time.min) if since else None
+            until_at = datetime.combine(until, time.min)
+            await session.execute(request_rollup_statement(since_at, until_at))
+            await session.execute(credit_rollup_statement(since_at, until_at))
+            state.rolled_up_until = until
+
+        logger.info(f"Analytics rolled up until {until}")
+        return until
+
+    def start(self) -> None:
+        """Запуск периодического сворачивания (без ожидания)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.compact()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Analytics rollup failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+analytics_rollup = AnalyticsRollup()
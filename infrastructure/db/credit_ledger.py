@@ -0,0 +1,363 @@
+"""Журнал кредитов в Redis с отложенной записью в PostgreSQL.
+
+Баланс пользователя хранится в ключе ledger:balance:<user_id>, проверка и
+изменение баланса выполняются одним Lua-скриптом вместе с записью операции
+в поток ledger:transactions. Фоновый писатель пачками переносит операции
+из потока в credit_transactions и обновляет user_credits, PostgreSQL
+остается долговременной копией. Идентификаторы операций заранее выделяются
+блоками из последовательности credit_transactions, поэтому не пересекаются
+с записями, сделанными напрямую в БД.
+
+Пока журнал включен, баланс должен меняться только через него
+(AsyncCreditRepositoryImpl). Прямые изменения в БД, например через
+синхронный CreditRepositoryImpl, Redis не видит; reconcile при запуске
+исправляет такие балансы, если с момента чтения из БД по пользователю не
+было новых операций.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from infrastructure.db.db_connection import get_async_db_session
+from infrastructure.db.models import CreditLedgerState, CreditTransaction, UserCredits
+
+
+logger = logging.getLogger(__name__)
+
+CREDIT_LEDGER = os.getenv('CREDIT_LEDGER', 'redis')  # redis - журнал в Redis, db - запись сразу в PostgreSQL
+LEDGER_BATCH_SIZE = int(os.getenv('LEDGER_BATCH_SIZE', '500'))
+LEDGER_FLUSH_INTERVAL = float(os.getenv('LEDGER_FLUSH_INTERVAL', '1'))
+LEDGER_ID_BLOCK = int(os.getenv('LEDGER_ID_BLOCK', '1000'))
+
+BALANCE_KEY = "ledger:balance:"
+IDS_KEY = "ledger:ids"
+STREAM_KEY = "ledger:transactions"
+WRITER_LOCK_KEY = "ledger:writer"
+VERSIONS_KEY = "ledger:versions"  # Число операций по каждому пользователю
+
+# Коды результата APPLY_SCRIPT
+APPLIED = 0
+INSUFFICIENT = -1
+NOT_LOADED = -2
+NO_IDS = -3
+
+APPLY_SCRIPT = """
+local balance = redis.call('GET', KEYS[1])
+if not balance then return {-2} end
+local delta = tonumber(ARGV[1])
+if delta < 0 and tonumber(balance) + delta < 0 then return {-1} end
+local id = redis.call('LPOP', KEYS[2])
+if not id then return {-3} end
+local new_balance = redis.call('INCRBY', KEYS[1], delta)
+redis.call('HINCRBY', KEYS[4], ARGV[2], 1)
+redis.call('XADD', KEYS[3], '*',
+    'id', id, 'user_id', ARGV[2], 'amount', delta, 'transaction_type', ARGV[3],
+    'scenario_type', ARGV[4], 'description', ARGV[5], 'created_at', ARGV[6],
+    'balance', new_balance)
+return {0, new_balance, tonumber(id)}
+"""
+
+# Захват или продление блокировки писателя владельцем
+LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then return 1 end
+return 0
+"""
+
+# Версии балансов перед чтением из БД; nil, если в потоке есть неперенесенные операции
+SNAPSHOT_SCRIPT = """
+if redis.call('XLEN', KEYS[1]) > 0 then return nil end
+local versions = redis.call('HMGET', KEYS[2], unpack(ARGV))
+for i = 1, #ARGV do versions[i] = versions[i] or '' end
+return versions
+"""
+
+# Замена балансов значениями из БД для пользователей, чья версия не изменилась
+# после снимка (ARGV - тройки user_id, версия, баланс); возвращает {замены, пропуски}
+RESTORE_SCRIPT = """
+local restored, skipped = 0, 0
+for i = 2, #KEYS do
+    local base = (i - 2) * 3
+    local version = redis.call('HGET', KEYS[1], ARGV[base + 1]) or ''
+    if version ~= ARGV[base + 2] then
+        skipped = skipped + 1
+    elseif redis.call('GET', KEYS[i]) ~= ARGV[base + 3] then
+        redis.call('SET', KEYS[i], ARGV[base + 3])
+        restored = restored + 1
+    end
+end
+return {restored, skipped}
+"""
+
+def stream_position(entry_id) -> Tuple[int, int]:
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode()
+    ms, seq = entry_id.split("-")
+    return int(ms), int(seq)
+
+def decode_fields(fields: Dict) -> Dict[str, str]:
+    return {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in fields.items()
+    }
+
+class CreditLedger:
+    """Баланс и операции по кредитам в Redis с отложенной записью в PostgreSQL."""
+
+    def __init__(
+        self,
+        client=None,
+        batch_size: int = LEDGER_BATCH_SIZE,
+        flush_interval: float = LEDGER_FLUSH_INTERVAL,
+        id_block: int = LEDGER_ID_BLOCK
+    ):
+        self._client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block = id_block
+        self._apply_script = None
+        self._lock_script = None
+        self._snapshot_script = None
+        self._restore_script = None
+        self._writer_id = uuid4().hex
+        self._writer: Optional[asyncio.Task] = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from infrastructure.db.db_connection import get_async_redis_client
+            self._client = get_async_redis_client()
+        return self._client
+
+    @property
+    def lock_ttl(self) -> int:
+        return max(10, int(self.flush_interval * 10))
+
+    async def balance(self, user_id: int) -> int:
+        """Текущий баланс пользователя (при первом обращении загружается из БД)."""
+        value = await self.client.get(f"{BALANCE_KEY}{user_id}")
+        if value is None:
+            await self._load(user_id)
+            value = await self.client.get(f"{BALANCE_KEY}{user_id}")
+        return int(value)
+
+    async def apply(
+        self,
+        user_id: int,
+        delta: int,
+        transaction_type: str,
+        scenario_type: Optional[str] = None,
+        description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Атомарное изменение баланса и запись операции; при нехватке средств - ValueError."""
+        if self._apply_script is None:
+            self._apply_script = self.client.register_script(APPLY_SCRIPT)
+
+        created_at = datetime.utcnow()
+        for _ in range(3):
+            result = await self._apply_script(
+                keys=[f"{BALANCE_KEY}{user_id}", IDS_KEY, STREAM_KEY, VERSIONS_KEY],
+                args=[delta, user_id, transaction_type, scenario_type or "", description or "", created_at.isoformat()]
+            )
+            code = result[0]
+            if code == APPLIED:
+                return {
+                    "id": result[2],
+                    "user_id": user_id,
+                    "amount": delta,
+                    "transaction_type": transaction_type,
+                    "scenario_type": scenario_type,
+                    "description": description,
+                    "created_at": created_at.isoformat(),
+                    "balance": result[1]
+                }
+            if code == INSUFFICIENT:
+                raise ValueError("Insufficient credit balance")
+            if code == NOT_LOADED:
+                await self._load(user_id)
+            elif code == NO_IDS:
+                await self._allocate_ids()
+        raise RuntimeError(f"Credit ledger could not apply transaction for user {user_id}")
+
+    async def _load(self, user_id: int) -> None:
+        """Загрузка баланса из БД, если его еще нет в Redis."""
+        async with get_async_db_session() as session:
+            balance = await session.scalar(
+                select(UserCredits.balance).where(UserCredits.user_id == user_id).limit(1)
+            )
+        await self.client.set(f"{BALANCE_KEY}{user_id}", balance or 0, nx=True)
+
+    async def _allocate_ids(self) -> None:
+        """Выделение блока идентификаторов операций из последовательности БД."""
+        async with get_async_db_session() as session:
+            ids = (await session.scalars(
+                text("SELECT nextval(pg_get_serial_sequence('credit_transactions', 'id')) FROM generate_series(1, :n)"),
+                {"n": self.id_block}
+            )).all()
+        await self.client.rpush(IDS_KEY, *ids)
+
+    async def _acquire_writer_lock(self) -> bool:
+        if self._lock_script is None:
+            self._lock_script = self.client.register_script(LOCK_SCRIPT)
+        return bool(await self._lock_script(keys=[WRITER_LOCK_KEY], args=[self._writer_id, self.lock_ttl]))
+
+    async def _locked_state(self, session) -> CreditLedgerState:
+        """Строка состояния писателя, заблокированная до конца транзакции.
+
+        Позиция читается из БД при каждом переносе: другой процесс мог
+        записать пачку и завершиться до удаления ее из потока.
+        """
+        await session.execute(
+            pg_insert(CreditLedgerState).values(id=1, last_stream_id="0-0").on_conflict_do_nothing()
+        )
+        return await session.scalar(
+            select(CreditLedgerState).where(CreditLedgerState.id == 1).with_for_update()
+        )
+
+    async def flush(self) -> int:
+        """Перенос пачки операций из Redis в БД, возвращает число прочитанных записей.
+
+        Номер последней перенесенной записи сохраняется в той же транзакции,
+        поэтому записи, перенесенные до сбоя, но не удаленные из потока,
+        повторно не вставляются.
+        """
+        entries = await self.client.xrange(STREAM_KEY, count=self.batch_size)
+        if not entries:
+            return 0
+
+        async with get_async_db_session() as session:
+            state = await self._locked_state(session)
+            flushed = stream_position(state.last_stream_id)
+            transactions: List[Dict[str, str]] = [
+                decode_fields(fields) for entry_id, fields in entries
+                if stream_position(entry_id) > flushed
+            ]
+            balances: Dict[int, int] = {}
+            for t in transactions:
+                session.add(CreditTransaction(
+                    id=int(t["id"]),
+                    user_id=int(t["user_id"]),
+                    amount=int(t["amount"]),
+                    transaction_type=t["transaction_type"],
+                    scenario_type=t["scenario_type"] or None,
+                    description=t["description"] or None,
+                    created_at=datetime.fromisoformat(t["created_at"]),
+                    balance_after=int(t["balance"])
+                ))
+                # Операции идут по порядку, последняя содержит итоговый баланс
+                balances[int(t["user_id"])] = int(t["balance"])
+
+            for user_id, balance in balances.items():
+                updated = await session.execute(
+                    update(UserCredits).where(UserCredits.user_id == user_id).values(balance=balance)
+                )
+                if updated.rowcount == 0:
+                    session.add(UserCredits(user_id=user_id, balance=balance))
+
+            last_id = entries[-1][0]
+            last_id = last_id.decode() if isinstance(last_id, bytes) else last_id
+            if stream_position(last_id) > flushed:
+                state.last_stream_id = last_id
+
+        await self.client.xdel(STREAM_KEY, *[entry_id for entry_id, _ in entries])
+        return len(entries)
+
+    async def drain(self) -> bool:
+        """Перенос всех накопленных операций, пока процесс держит блокировку писателя.
+
+        Блокировка продлевается перед каждой пачкой, чтобы при длинной очереди
+        она не истекла и второй писатель не переносил те же записи.
+        Возвращает False, если блокировка у другого процесса.
+        """
+        while True:
+            if not await self._acquire_writer_lock():
+                return False
+            if await self.flush() < self.batch_size:
+                return True
+
+    async def reconcile(self) -> None:
+        """Восстановление Redis по БД при запуске.
+
+        Сначала переносятся операции, оставшиеся в потоке. Затем для каждой
+        пачки пользователей снимаются версии их балансов и только после этого
+        читаются балансы из user_credits. Если при снимке поток был пуст, БД
+        содержит все операции до снимка, и расходящиеся балансы в Redis
+        (например, после прямой записи в БД или потери данных) заменяются
+        значениями из БД - но только у пользователей, по которым после снимка
+        не было операций: их баланс в Redis новее прочитанного. Если поток
+        не пуст, загружаются только отсутствующие в Redis балансы.
+        """
+        await self.drain()
+        if self._snapshot_script is None:
+            self._snapshot_script = self.client.register_script(SNAPSHOT_SCRIPT)
+            self._restore_script = self.client.register_script(RESTORE_SCRIPT)
+
+        async with get_async_db_session() as session:
+            user_ids = (await session.scalars(select(UserCredits.user_id).order_by(UserCredits.user_id))).all()
+
+        loaded = restored = skipped = 0
+        for start in range(0, len(user_ids), self.batch_size):
+            batch_ids = user_ids[start:start + self.batch_size]
+            versions = await self._snapshot_script(keys=[STREAM_KEY, VERSIONS_KEY], args=batch_ids)
+            async with get_async_db_session() as session:
+                batch = (await session.execute(
+                    select(UserCredits.user_id, UserCredits.balance).where(UserCredits.user_id.in_(batch_ids))
+                )).all()
+
+            if versions is not None:
+                expected = dict(zip(batch_ids, versions))
+                args = []
+                for user_id, balance in batch:
+                    args += [user_id, expected[user_id], str(balance)]
+                batch_restored, batch_skipped = await self._restore_script(
+                    keys=[VERSIONS_KEY] + [f"{BALANCE_KEY}{user_id}" for user_id, _ in batch],
+                    args=args
+                )
+                restored += batch_restored
+                skipped += batch_skipped
+                continue
+            async with self.client.pipeline(transaction=False) as pipe:
+                for user_id, balance in batch:
+                    pipe.set(f"{BALANCE_KEY}{user_id}", balance, nx=True)
+                created = sum(1 for ok in await pipe.execute() if ok)
+            loaded += created
+            skipped += len(batch) - created
+        logger.info(
+            f"Credit ledger reconciled: {restored} balances restored and {loaded} loaded from the database, "
+            f"{skipped} left as in Redis because transactions were applied or pending"
+        )
+
+    def start(self) -> None:
+        """Запуск фонового писателя (в каждом процессе, пишет тот, кто держит блокировку)."""
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Credit ledger flush failed: {e}")
+            await asyncio.sleep(self.flush_interval)
+
+    async def close(self) -> None:
+        """Остановка писателя с переносом оставшихся операций."""
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+            try:
+                if await self.drain():
+                    await self.client.delete(WRITER_LOCK_KEY)
+            except Exception as e:
+                logger.error(f"Final credit ledger flush failed: {e}")
+
+credit_ledger = CreditLedger()
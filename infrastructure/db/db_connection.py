@@ -1,9 +1,11 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import redis
-from contextlib import contextmanager
+import redis.asyncio
+from contextlib import asynccontextmanager, contextmanager
 import pandas as pd
 
 
@@ -12,6 +14,8 @@ POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'postgres')
 POSTGRES_HOST = os.getenv('POSTGRES_HOST', 'localhost')
 POSTGRES_PORT = os.getenv('POSTGRES_PORT', '5433')
 POSTGRES_DB = os.getenv('POSTGRES_DB', 'pg_db')
+POSTGRES_POOL_SIZE = os.getenv('POSTGRES_POOL_SIZE', '10')
+POSTGRES_MAX_OVERFLOW = os.getenv('POSTGRES_MAX_OVERFLOW', '20')
 
 REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
 REDIS_PORT = os.getenv('REDIS_PORT', '6379')
@@ -23,6 +27,19 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок для обработчиков FastAPI: запросы к БД не блокируют цикл событий
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    pool_size=int(POSTGRES_POOL_SIZE),
+    max_overflow=int(POSTGRES_MAX_OVERFLOW),
+    pool_pre_ping=True
+)
+
+# expire_on_commit=False: после commit атрибуты читаются без повторного запроса
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 redis_client = redis.Redis(
@@ -32,6 +49,13 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
+# Клиент для asyncio-кода, значения - двоичные данные
+async_redis_client = redis.asyncio.Redis(
+    host=REDIS_HOST,
+    port=int(REDIS_PORT),
+    db=int(REDIS_DB)
+)
+
 @contextmanager
 def get_db_session():
     """Provide a transactional scope around a series of operations."""
@@ -45,10 +69,27 @@ def get_db_session():
     finally:
         session.close()
 
+@asynccontextmanager
+async def get_async_db_session():
+    """Provide an async transactional scope around a series of operations."""
+    session = AsyncSessionLocal()
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
 def get_redis_client():
     """Get Redis client for caching and metrics storage."""
     return redis_client
 
+def get_async_redis_client():
+    """Get asyncio Redis client for binary payloads and pub/sub."""
+    return async_redis_client
+
 def get_data_from_db():
     user = 'postgres' 
     password = 'postgres'  
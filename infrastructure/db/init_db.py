@@ -3,16 +3,21 @@ import sys
 import time
 from sqlalchemy.exc import OperationalError
 from infrastructure.db.db_connection import engine, Base
+from infrastructure.db.migrate import migrate
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 def init_db():
-    """Initialize the database by creating all tables."""
+    """Initialize the database by creating all tables and applying migrations."""
     print("Creating database tables...")
     try:
         # Create all tables
         Base.metadata.create_all(bind=engine)
+        # create_all не меняет существующие таблицы: индексы и ограничения - в миграциях
+        applied = migrate()
+        if applied:
+            print(f"Applied migrations: {', '.join(map(str, applied))}")
         print("Database tables created successfully!")
     except Exception as e:
         print(f"Error creating database tables: {e}")
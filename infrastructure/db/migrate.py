@@ -0,0 +1,71 @@
+"""Миграции схемы БД.
+
+create_all создает только отсутствующие таблицы, поэтому изменения
+существующих таблиц (индексы, ограничения) оформляются миграциями:
+модули infrastructure/db/migrations/mNNNN_<название>.py с функцией
+upgrade(conn). Примененные версии записываются в schema_migrations,
+каждая миграция выполняется в своей транзакции. Процессы, запускаемые
+одновременно, ждут друг друга на advisory-блокировке PostgreSQL.
+"""
+import importlib
+import logging
+import re
+from pathlib import Path
+from typing import List, Tuple
+from sqlalchemy import text
+from infrastructure.db.db_connection import engine
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATION_NAME = re.compile(r"^m(\d{4})_\w+\.py$")
+MIGRATION_LOCK = 7316001  # Ключ advisory-блокировки на время миграций
+
+def discover() -> List[Tuple[int, str]]:
+    """Версии и имена модулей миграций по возрастанию версии."""
+    migrations = []
+    for path in MIGRATIONS_DIR.glob("m*.py"):
+        match = MIGRATION_NAME.match(path.name)
+        if match:
+            migrations.append((int(match.group(1)), path.stem))
+    migrations.sort()
+
+    versions = [version for version, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return migrations
+
+def migrate(bind=engine) -> List[int]:
+    """Применение еще не примененных миграций, возвращает их версии."""
+    applied_now = []
+    with bind.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK})
+        conn.commit()
+        try:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version INTEGER PRIMARY KEY, "
+                "name VARCHAR(255) NOT NULL, "
+                "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+            ))
+            applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+            conn.commit()
+
+            for version, name in discover():
+                if version in applied:
+                    continue
+                module = importlib.import_module(f"infrastructure.db.migrations.{name}")
+                with conn.begin():
+                    module.upgrade(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                        {"version": version, "name": name}
+                    )
+                logger.info(f"Applied migration {name}")
+                applied_now.append(version)
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK})
+            conn.commit()
+    return applied_now
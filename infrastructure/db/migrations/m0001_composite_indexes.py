@@ -0,0 +1,26 @@
+"""Составные индексы (user_id, created_at DESC) и уникальный user_credits.user_id."""
+from sqlalchemy import text
+
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_request_history_user_id_created_at ON request_history (user_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_credit_transactions_user_id_created_at ON credit_transactions (user_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_credit_transactions_user_type_created ON credit_transactions (user_id, transaction_type, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_qwen_history_user_id_created_at ON qwen_history (user_id, created_at DESC)",
+    # Из повторных строк баланса остается последняя измененная
+    """
+    DELETE FROM user_credits
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, row_number() OVER (PARTITION BY user_id ORDER BY updated_at DESC, id DESC) AS position
+            FROM user_credits
+        ) ranked
+        WHERE position > 1
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_credits_user_id ON user_credits (user_id)",
+]
+
+def upgrade(conn) -> None:
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
@@ -0,0 +1,24 @@
+"""Баланс после операции в credit_transactions.balance_after.
+
+Для существующих операций он заполняется один раз накопленной суммой
+операций пользователя в порядке (created_at, id).
+"""
+from sqlalchemy import text
+
+
+STATEMENTS = [
+    "ALTER TABLE credit_transactions ADD COLUMN IF NOT EXISTS balance_after INTEGER",
+    """
+    UPDATE credit_transactions
+    SET balance_after = running.balance
+    FROM (
+        SELECT id, sum(amount) OVER (PARTITION BY user_id ORDER BY created_at, id) AS balance
+        FROM credit_transactions
+    ) running
+    WHERE credit_transactions.id = running.id AND credit_transactions.balance_after IS NULL
+    """,
+]
+
+def upgrade(conn) -> None:
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
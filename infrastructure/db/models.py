@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
+from datetime import datetime
 from .db_connection import Base
 
 
@@ -11,8 +11,8 @@ class User(Base):
     name = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)  
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_role = Column(String(20), nullable=False, default="user")
     
     request_history = relationship("RequestHistory", back_populates="user")
@@ -28,19 +28,28 @@ class RequestHistory(Base):
     status = Column(String(20), nullable=False)  # e.g., "success", "error"
     error_message = Column(Text, nullable=True)
     processing_time = Column(Integer, nullable=True)  # in milliseconds
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="request_history") 
     qwen_history = relationship("QwenHistory", back_populates="request", uselist=False)
 
+    __table_args__ = (
+        # History pages and statistics: one user's requests by time
+        Index('ix_request_history_user_id_created_at', user_id, created_at.desc()),
+    )
+
 class UserCredits(Base):
     __tablename__ = 'user_credits'
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     balance = Column(Integer, nullable=False, default=100)
-    created_at = Column(DateTime, nullable=False, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime, nullable=False, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('uq_user_credits_user_id', user_id, unique=True),
+    )
 
 class CreditTransaction(Base):
     __tablename__ = 'credit_transactions'
@@ -51,7 +60,47 @@ class CreditTransaction(Base):
     transaction_type = Column(String(50), nullable=False)  # 'initial', 'scenario_usage', 'manual'
     scenario_type = Column(String(50), nullable=True)  # For scenario usage tracking
     description = Column(String(255), nullable=True)
-    created_at = Column(DateTime, nullable=False, default=datetime.now(timezone.utc)) 
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow) 
+    balance_after = Column(Integer, nullable=True)  # User balance right after this transaction
+
+    __table_args__ = (
+        # Usage statistics filter by user and type over a created_at range
+        Index('ix_credit_transactions_user_type_created', 'user_id', 'transaction_type', 'created_at'),
+        Index('ix_credit_transactions_user_id_created_at', user_id, created_at.desc()),
+    )
+
+class CreditLedgerState(Base):
+    __tablename__ = 'credit_ledger_state'
+
+    id = Column(Integer, primary_key=True)
+    last_stream_id = Column(String(50), nullable=False)  # Last Redis stream entry written to credit_transactions
+
+class DailyRequestStats(Base):
+    __tablename__ = 'daily_request_stats'
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    request_type = Column(String(50), primary_key=True)
+    total = Column(Integer, nullable=False)
+    successful = Column(Integer, nullable=False)
+    processing_time_sum = Column(Integer, nullable=False)
+    processing_time_count = Column(Integer, nullable=False)  # Requests with a recorded processing time
+
+class DailyCreditStats(Base):
+    __tablename__ = 'daily_credit_stats'
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    transaction_type = Column(String(50), primary_key=True)
+    transactions = Column(Integer, nullable=False)
+    earned = Column(Integer, nullable=False)  # Sum of positive amounts
+    spent = Column(Integer, nullable=False)  # Sum of negative amounts
+
+class AnalyticsRollupState(Base):
+    __tablename__ = 'analytics_rollup_state'
+
+    id = Column(Integer, primary_key=True)
+    rolled_up_until = Column(Date, nullable=True)  # Daily stats cover every day before this date
 
 class QwenHistory(Base):
     __tablename__ = "qwen_history"
@@ -62,7 +111,11 @@ class QwenHistory(Base):
     prompt = Column(Text, nullable=False)
     response = Column(Text, nullable=False)
     tokens_used = Column(Integer, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="qwen_history")
-    request = relationship("RequestHistory", back_populates="qwen_history")
\ No newline at end of file
+    request = relationship("RequestHistory", back_populates="qwen_history")
+
+    __table_args__ = (
+        Index('ix_qwen_history_user_id_created_at', user_id, created_at.desc()),
+    )
\ No newline at end of file
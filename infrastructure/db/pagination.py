@@ -0,0 +1,40 @@
+"""Постраничная выборка истории по курсору (keyset pagination).
+
+Страницы упорядочены по (created_at, id) по убыванию. Курсор - непрозрачная
+строка с ключом последней записи страницы; следующая страница начинается
+строго после него, поэтому запрос не пропускает предыдущие строки, как
+OFFSET, и новые записи не сдвигают страницы.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import tuple_
+
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(created_at: str, id: int) -> str:
+    payload = json.dumps([created_at, id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Ключ (created_at, id) из курсора; ValueError, если курсор поврежден."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def after_cursor(created_at_column, id_column, cursor: Optional[str]):
+    """Условие для строк после курсора (или None без курсора)."""
+    if not cursor:
+        return None
+    return tuple_(created_at_column, id_column) < tuple_(*decode_cursor(cursor))
+
+def next_cursor(items: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Курсор следующей страницы, если текущая заполнена полностью."""
+    if not items or len(items) < limit:
+        return None
+    return encode_cursor(items[-1]["created_at"], items[-1]["id"])
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from .config import rabbitmq_settings
+
+
+logger = logging.getLogger(__name__)
+
+class Overloaded(Exception):
+    """Запрос отклонен до публикации: ответ не успеет прийти до срока."""
+
+    def __init__(self, queue_name: str, status_code: int, retry_after: int, predicted_wait: Optional[float]):
+        self.queue_name = queue_name
+        self.status_code = status_code  # 429 - очередь перегружена, 503 - нет воркеров
+        self.retry_after = retry_after  # Секунды до повторной попытки
+        self.predicted_wait = predicted_wait
+        super().__init__(f"Queue {queue_name} overloaded, retry after {retry_after} s")
+
+
+class QueueLoad:
+    """Наблюдаемая нагрузка одной очереди."""
+
+    def __init__(self):
+        self.depth = 0  # Готовые к доставке сообщения по данным брокера
+        self.consumers = 0
+        self.refreshed_at = 0.0
+        self.known = False  # Данные брокера получены хотя бы раз
+        self.in_flight = 0  # Запросы этого процесса, ожидающие ответа
+        self.in_flight_ewma = 0.0
+        self.service_time_ewma: Optional[float] = None  # Время обработки одного сообщения воркером
+
+
+class AdmissionController:
+    """Контроль допуска запросов по глубине очереди.
+
+    Глубина очереди и число потребителей берутся из пассивного объявления
+    очереди (не чаще раза в DEPTH_REFRESH_INTERVAL секунд). Время обработки
+    одного сообщения оценивается из задержки RPC: запрос, опубликованный за
+    depth сообщениями при consumers воркерах, ждет примерно
+    (depth / consumers + 1) * service_time.
+    """
+
+    def __init__(
+        self,
+        queue_stats: Callable[[str], Awaitable[Tuple[int, int]]],
+        alpha: float = rabbitmq_settings.ADMISSION_EWMA_ALPHA,
+        refresh_interval: float = rabbitmq_settings.ADMISSION_DEPTH_REFRESH_INTERVAL,
+        enabled: bool = rabbitmq_settings.ADMISSION_ENABLED
+    ):
+        self.queue_stats = queue_stats  # queue_name -> (message_count, consumer_count)
+        self.alpha = alpha
+        self.refresh_interval = refresh_interval
+        self.enabled = enabled
+        self._loads: Dict[str, QueueLoad] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, queue_name: str) -> QueueLoad:
+        with self._lock:
+            return self._loads.setdefault(queue_name, QueueLoad())
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return self.alpha * sample + (1 - self.alpha) * current
+
+    async def _refresh(self, queue_name: str, load: QueueLoad) -> None:
+        if time.monotonic() - load.refreshed_at < self.refresh_interval:
+            return
+        try:
+            load.depth, load.consumers = await self.queue_stats(queue_name)
+            load.known = True
+        except Exception as e:
+            # Без данных брокера запросы допускаются по последней известной нагрузке
+            logger.warning(f"Could not refresh depth of {queue_name}: {e}")
+        load.refreshed_at = time.monotonic()
+
+    def predicted_wait(self, load: QueueLoad) -> Optional[float]:
+        """Ожидаемое время до ответа для нового запроса, None - нет данных."""
+        if load.service_time_ewma is None or load.consumers == 0:
+            return None
+        # Между обновлениями глубины растущее число ожидающих запросов
+        # этого процесса показывает очередь точнее устаревшего значения
+        backlog = max(load.depth, load.in_flight - load.consumers)
+        return (backlog / load.consumers + 1) * load.service_time_ewma
+
+    async def check(self, queue_name: str, timeout: float) -> None:
+        """Отклонение запроса, если ответ не успеет прийти за timeout секунд."""
+        if not self.enabled:
+            return
+
+        load = self._load(queue_name)
+        await self._refresh(queue_name, load)
+
+        if load.known and load.consumers == 0:
+            raise Overloaded(queue_name, 503, math.ceil(self.refresh_interval) or 1, None)
+
+        wait = self.predicted_wait(load)
+        if wait is not None and wait > timeout:
+            raise Overloaded(queue_name, 429, max(1, math.ceil(wait - timeout)), wait)
+
+    @asynccontextmanager
+    async def admit(self, queue_name: str, timeout: float):
+        """Допуск запроса и учет его задержки для оценки времени обработки."""
+        await self.check(queue_name, timeout)
+
+        load = self._load(queue_name)
+        position = max(load.depth, load.in_flight - load.consumers)
+        consumers = max(load.consumers, 1)
+        load.in_flight += 1
+        load.in_flight_ewma = self._ewma(load.in_flight_ewma, load.in_flight)
+        started = time.monotonic()
+
+        def observe() -> None:
+            latency = time.monotonic() - started
+            load.service_time_ewma = self._ewma(load.service_time_ewma, latency / (position / consumers + 1))
+
+        try:
+            yield
+        except asyncio.TimeoutError:
+            # Таймаут - нижняя оценка задержки, без нее оценка не растет при перегрузке
+            observe()
+            raise
+        else:
+            observe()
+        finally:
+            load.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Текущая нагрузка по очередям."""
+        with self._lock:
+            loads = dict(self._loads)
+        return {
+            name: {
+                "depth": load.depth,
+                "consumers": load.consumers,
+                "in_flight": load.in_flight,
+                "in_flight_ewma": round(load.in_flight_ewma, 3),
+                "service_time_ewma": load.service_time_ewma,
+                "predicted_wait": self.predicted_wait(load)
+            }
+            for name, load in loads.items()
+        }
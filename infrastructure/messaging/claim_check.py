@@ -0,0 +1,116 @@
+"""Хранение крупной полезной нагрузки вне брокера (claim-check).
+
+Тело сообщения больше CLAIM_CHECK_THRESHOLD байт кладется в хранилище,
+а в очередь уходит только ссылка в заголовке x-claim-check. Воркер читает
+полезную нагрузку по ссылке и удаляет ее после подтверждения сообщения.
+"""
+import mmap
+import os
+import time
+from typing import Optional, Union
+from uuid import uuid4
+from .config import rabbitmq_settings
+
+
+CLAIM_CHECK_HEADER = "x-claim-check"  # Ссылка на полезную нагрузку в хранилище
+KEY_PREFIX = "blob:"
+
+
+class ClaimNotFound(Exception):
+    """Полезная нагрузка удалена или истек ее TTL."""
+
+
+class RedisBlobStore:
+    """Полезная нагрузка в Redis с TTL."""
+
+    def __init__(self, client=None, ttl: int = rabbitmq_settings.CLAIM_CHECK_TTL):
+        if client is None:
+            from infrastructure.db.db_connection import get_async_redis_client
+            client = get_async_redis_client()
+        self.client = client
+        self.ttl = ttl
+
+    async def put(self, data: bytes) -> str:
+        key = f"{KEY_PREFIX}{uuid4().hex}"
+        await self.client.set(key, data, ex=self.ttl)
+        return key
+
+    async def get(self, key: str) -> bytes:
+        data = await self.client.get(key)
+        if data is None:
+            raise ClaimNotFound(key)
+        return data
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+
+class FileBlobStore:
+    """Полезная нагрузка в файлах общего каталога (tmpfs).
+
+    Чтение отображает файл в память и возвращает memoryview без копирования.
+    Удаление файла не мешает уже открытому отображению.
+    """
+
+    PURGE_INTERVAL = 60  # Секунды между очистками просроченных файлов
+
+    def __init__(self, directory: str = rabbitmq_settings.CLAIM_CHECK_DIR, ttl: int = rabbitmq_settings.CLAIM_CHECK_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._purged_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace(":", "_"))
+
+    def purge_expired(self) -> None:
+        """Удаление файлов, переживших TTL (их сообщения уже не будут обработаны)."""
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+        self._purged_at = time.monotonic()
+
+    async def put(self, data: bytes) -> str:
+        if time.monotonic() - self._purged_at > self.PURGE_INTERVAL:
+            self.purge_expired()
+        key = f"{KEY_PREFIX}{uuid4().hex}"
+        path = self._path(key)
+        # Запись во временный файл и переименование: читатель не увидит неполных данных
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+        return key
+
+    async def get(self, key: str) -> memoryview:
+        try:
+            with open(self._path(key), "rb") as f:
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except FileNotFoundError:
+            raise ClaimNotFound(key)
+
+    async def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+BlobStore = Union[RedisBlobStore, FileBlobStore]
+
+_blob_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    """Хранилище полезной нагрузки процесса, выбранное в настройках."""
+    global _blob_store
+    if _blob_store is None:
+        if rabbitmq_settings.CLAIM_CHECK_BACKEND == "file":
+            _blob_store = FileBlobStore()
+        elif rabbitmq_settings.CLAIM_CHECK_BACKEND == "redis":
+            _blob_store = RedisBlobStore()
+        else:
+            raise ValueError(f"Unknown claim-check backend: {rabbitmq_settings.CLAIM_CHECK_BACKEND}")
+    return _blob_store
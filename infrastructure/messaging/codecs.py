@@ -0,0 +1,85 @@
+import base64
+import json
+import msgpack
+from typing import Any, Dict, Optional, Tuple
+
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+RAW_CONTENT_TYPE = "application/octet-stream"
+
+
+class JsonCodec:
+    """Тело сообщения в JSON (исходный формат, двоичные данные - в base64)."""
+
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, message: Any) -> Tuple[bytes, Dict[str, Any]]:
+        return json.dumps(message, default=self._encode_bytes).encode(), {}
+
+    @staticmethod
+    def _encode_bytes(value: Any) -> str:
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return base64.b64encode(value).decode('utf-8')
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def decode(self, body: bytes, headers: Dict[str, Any]) -> Any:
+        return json.loads(bytes(body))
+
+
+class MsgpackCodec:
+    """Тело сообщения в msgpack, двоичные поля передаются без base64."""
+
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def encode(self, message: Any) -> Tuple[bytes, Dict[str, Any]]:
+        return msgpack.packb(message, use_bin_type=True), {}
+
+    def decode(self, body: bytes, headers: Dict[str, Any]) -> Any:
+        return msgpack.unpackb(body, raw=False)
+
+
+class RawBytesCodec:
+    """Тело сообщения - сырые байты одного поля, остальные поля - в заголовках AMQP.
+
+    Сообщение вида {"type": ..., "data": {payload_field: bytes, ...}}
+    передается без копирования полезной нагрузки в промежуточный формат.
+    """
+
+    content_type = RAW_CONTENT_TYPE
+
+    def __init__(self, payload_field: str = "payload"):
+        self.payload_field = payload_field
+
+    def encode(self, message: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+        data = dict(message.get("data") or {})
+        payload = data.pop(self.payload_field)
+        headers = {
+            "x-message-type": message.get("type"),
+            "x-payload-field": self.payload_field,
+            "x-meta": json.dumps(data)
+        }
+        return bytes(payload), headers
+
+    def decode(self, body: bytes, headers: Dict[str, Any]) -> Dict[str, Any]:
+        data = json.loads(headers.get("x-meta") or "{}")
+        data[headers.get("x-payload-field", self.payload_field)] = body
+        return {
+            "type": headers.get("x-message-type"),
+            "data": data
+        }
+
+
+CODECS = {
+    JSON_CONTENT_TYPE: JsonCodec(),
+    MSGPACK_CONTENT_TYPE: MsgpackCodec(),
+    RAW_CONTENT_TYPE: RawBytesCodec(),
+}
+
+def get_codec(content_type: Optional[str]):
+    """Выбор кодека по content_type. Сообщения без content_type читаются как JSON."""
+    if not content_type:
+        return CODECS[JSON_CONTENT_TYPE]
+    if content_type not in CODECS:
+        raise ValueError(f"Unsupported content type: {content_type}")
+    return CODECS[content_type]
@@ -16,8 +16,69 @@ class RabbitMQSettings(BaseSettings):
     LLM_QUEUE: str = "llm_requests"  # Очередь для запросов к языковой модели
     
     MAIN_EXCHANGE: str = "main_exchange"  # Основной обменник для маршрутизации сообщений
+
+    # Параметры потребления для каждой очереди: prefetch, число одновременных
+    # обработчиков и момент подтверждения (after - после обработки, before - при получении)
+    STT_PREFETCH: int = int(os.getenv("RABBITMQ_STT_PREFETCH", "2"))
+    STT_CONCURRENCY: int = int(os.getenv("RABBITMQ_STT_CONCURRENCY", "1"))
+    STT_ACK_STRATEGY: str = os.getenv("RABBITMQ_STT_ACK_STRATEGY", "after")
+    TTS_PREFETCH: int = int(os.getenv("RABBITMQ_TTS_PREFETCH", "2"))
+    TTS_CONCURRENCY: int = int(os.getenv("RABBITMQ_TTS_CONCURRENCY", "1"))
+    TTS_ACK_STRATEGY: str = os.getenv("RABBITMQ_TTS_ACK_STRATEGY", "after")
+    LLM_PREFETCH: int = int(os.getenv("RABBITMQ_LLM_PREFETCH", "2"))
+    LLM_CONCURRENCY: int = int(os.getenv("RABBITMQ_LLM_CONCURRENCY", "1"))
+    LLM_ACK_STRATEGY: str = os.getenv("RABBITMQ_LLM_ACK_STRATEGY", "after")
+
+    # Повторы обработки с экспоненциальной задержкой, после них - очередь <queue>.dlq
+    MAX_RETRIES: int = int(os.getenv("RABBITMQ_MAX_RETRIES", "3"))
+    RETRY_BASE_DELAY_MS: int = int(os.getenv("RABBITMQ_RETRY_BASE_DELAY_MS", "1000"))
+    RETRY_MAX_DELAY_MS: int = int(os.getenv("RABBITMQ_RETRY_MAX_DELAY_MS", "60000"))
+    # Ограничение DLQ (0 - без ограничения): при переполнении удаляются самые старые сообщения
+    DLQ_MAX_LENGTH: int = int(os.getenv("RABBITMQ_DLQ_MAX_LENGTH", "10000"))
+    DLQ_MESSAGE_TTL_MS: int = int(os.getenv("RABBITMQ_DLQ_MESSAGE_TTL_MS", "604800000"))  # 7 дней
+
+    PUBLISHER_CHANNELS: int = int(os.getenv("RABBITMQ_PUBLISHER_CHANNELS", "4"))  # Пул каналов для публикации на процесс
+
+    # Формат тела сообщений: application/msgpack или application/json
+    MESSAGE_CODEC: str = os.getenv("RABBITMQ_MESSAGE_CODEC", "application/msgpack")
+    RPC_TIMEOUT: float = float(os.getenv("RABBITMQ_RPC_TIMEOUT", "30"))  # Время ожидания ответа воркера в секундах
+    MESSAGE_TTL: float = float(os.getenv("RABBITMQ_MESSAGE_TTL", "300"))  # Срок жизни сообщений, на которые не ждут ответа
+    # Claim-check: тела больше порога (байт, 0 - отключено) хранятся вне брокера,
+    # в Redis (redis) или в общем каталоге tmpfs (file)
+    CLAIM_CHECK_THRESHOLD: int = int(os.getenv("RABBITMQ_CLAIM_CHECK_THRESHOLD", "262144"))
+    CLAIM_CHECK_BACKEND: str = os.getenv("RABBITMQ_CLAIM_CHECK_BACKEND", "redis")
+    CLAIM_CHECK_DIR: str = os.getenv("RABBITMQ_CLAIM_CHECK_DIR", "/dev/shm/claim-check")
+    CLAIM_CHECK_TTL: int = int(os.getenv("RABBITMQ_CLAIM_CHECK_TTL", "900"))  # Секунды
+
+    # Контроль допуска: отклонение запросов, ответ на которые не успеет прийти до таймаута
+    ADMISSION_ENABLED: bool = os.getenv("RABBITMQ_ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_EWMA_ALPHA: float = float(os.getenv("RABBITMQ_ADMISSION_EWMA_ALPHA", "0.2"))
+    ADMISSION_DEPTH_REFRESH_INTERVAL: float = float(os.getenv("RABBITMQ_ADMISSION_DEPTH_REFRESH_INTERVAL", "1"))
+    # Доставка результатов RPC: rpc - очередь ответов процесса, redis - pub/sub Redis
+    # с хранением результата RESULT_TTL секунд (для нескольких реплик API и опроса)
+    RESULT_DELIVERY: str = os.getenv("RABBITMQ_RESULT_DELIVERY", "rpc")
+    RESULT_TTL: int = int(os.getenv("RABBITMQ_RESULT_TTL", "300"))
+    JOB_TIMEOUT: float = float(os.getenv("RABBITMQ_JOB_TIMEOUT", "600"))  # Срок фоновой задачи /api/jobs в секундах
+    # Очереди, обрабатываемые внутри процесса API (пустая строка - только внешние воркеры)
+    WORKER_QUEUES: str = os.getenv("RABBITMQ_WORKER_QUEUES", "stt_requests,tts_requests,llm_requests")
     
     class Config:
         env_prefix = "RABBITMQ_"
 
+    def queue_options(self, queue_name: str) -> dict:
+        """Параметры потребления для очереди по ее имени."""
+        prefixes = {
+            self.STT_QUEUE: "STT",
+            self.TTS_QUEUE: "TTS",
+            self.LLM_QUEUE: "LLM",
+        }
+        prefix = prefixes.get(queue_name)
+        if prefix is None:
+            return {"prefetch": 1, "concurrency": 1, "ack_strategy": "after"}
+        return {
+            "prefetch": getattr(self, f"{prefix}_PREFETCH"),
+            "concurrency": getattr(self, f"{prefix}_CONCURRENCY"),
+            "ack_strategy": getattr(self, f"{prefix}_ACK_STRATEGY"),
+        }
+
 rabbitmq_settings = RabbitMQSettings() 
\ No newline at end of file
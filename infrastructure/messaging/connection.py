@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import aio_pika
+from aio_pika.pool import Pool
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+from .config import rabbitmq_settings
+
+
+logger = logging.getLogger(__name__)
+
+class ConnectionManager:
+    """Одно устойчивое соединение с RabbitMQ на процесс.
+
+    Клиенты получают собственные каналы для потребления и объявления
+    топологии, а публикуют через небольшой общий пул каналов издателя,
+    поэтому QoS потребителей и публикации не мешают друг другу.
+    """
+
+    def __init__(self, publisher_channels: int = rabbitmq_settings.PUBLISHER_CHANNELS):
+        self.publisher_channels = publisher_channels
+        self.connection: Optional[aio_pika.RobustConnection] = None
+        self._publisher_pool: Optional[Pool] = None
+        self._lock = asyncio.Lock()
+
+    async def get_connection(self) -> aio_pika.RobustConnection:
+        """Общее соединение процесса, создается при первом обращении."""
+        async with self._lock:
+            if self.connection is None or self.connection.is_closed:
+                self.connection = await aio_pika.connect_robust(
+                    host=rabbitmq_settings.HOST,
+                    port=rabbitmq_settings.PORT,
+                    login=rabbitmq_settings.USER,
+                    password=rabbitmq_settings.PASSWORD,
+                    virtualhost=rabbitmq_settings.VHOST
+                )
+                self._publisher_pool = Pool(self.open_channel, max_size=self.publisher_channels)
+                logger.info("RabbitMQ connection established")
+            return self.connection
+
+    def add_reconnect_callback(self, callback: Callable[..., None]) -> None:
+        """Подписка клиента на переподключение общего соединения."""
+        self.connection.reconnect_callbacks.add(callback)
+
+    async def open_channel(self) -> aio_pika.abc.AbstractChannel:
+        """Новый канал для потребления и объявления топологии."""
+        connection = await self.get_connection()
+        return await connection.channel()
+
+    @asynccontextmanager
+    async def publish_channel(self):
+        """Канал из пула издателя на время одной публикации."""
+        await self.get_connection()
+        async with self._publisher_pool.acquire() as channel:
+            yield channel
+
+    async def close(self) -> None:
+        """Закрытие пула каналов и соединения."""
+        async with self._lock:
+            if self._publisher_pool is not None:
+                await self._publisher_pool.close()
+                self._publisher_pool = None
+            if self.connection is not None:
+                await self.connection.close()
+                self.connection = None
+
+connection_manager = ConnectionManager()
@@ -0,0 +1,63 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Mapping, Optional
+
+
+DEADLINE_HEADER = "x-deadline"  # Абсолютный срок ответа, мс с начала эпохи
+
+# Срок текущего обрабатываемого сообщения, доступен внутри callback обработчика
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Срок запроса истек, результат уже никому не нужен."""
+
+
+def deadline_after(timeout: float) -> float:
+    """Абсолютный срок (секунды с начала эпохи) через timeout секунд."""
+    return time.time() + timeout
+
+def time_left(deadline: Optional[float]) -> Optional[float]:
+    """Оставшееся до срока время в секундах, None - срок не задан."""
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+def is_expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.time() >= deadline
+
+def encode_deadline(deadline: float) -> int:
+    return int(deadline * 1000)
+
+def decode_deadline(headers: Optional[Mapping[str, Any]]) -> Optional[float]:
+    """Срок из заголовков сообщения. Сообщения без заголовка сроков не имеют."""
+    value = (headers or {}).get(DEADLINE_HEADER)
+    if value is None:
+        return None
+    return int(value) / 1000
+
+
+class DeadlineCounters:
+    """Счетчики сообщений, отброшенных до инференса и прерванных во время него."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _increment(self, queue_name: str, kind: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(queue_name, {"dropped": 0, "aborted": 0})
+            counters[kind] += 1
+
+    def dropped(self, queue_name: str) -> None:
+        self._increment(queue_name, "dropped")
+
+    def aborted(self, queue_name: str) -> None:
+        self._increment(queue_name, "aborted")
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._counters.items()}
+
+deadline_counters = DeadlineCounters()
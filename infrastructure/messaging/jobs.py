@@ -0,0 +1,104 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional
+from uuid import uuid4
+from .config import rabbitmq_settings
+from .message_service import MessageService
+from .results import ResultBroker, result_broker
+
+
+JOB_KINDS = ("stt", "tts", "llm")
+KEY_PREFIX = "job:"
+
+JOB_QUEUED = "queued"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_EXPIRED = "expired"
+
+class JobService:
+    """Фоновые задачи STT/TTS/LLM.
+
+    Описание задачи хранится в Redis под job:<id>, результат воркер
+    сохраняет под тем же идентификатором через ResultBroker. Клиент
+    получает статус опросом (в том числе long-poll) без повторного инференса.
+    """
+
+    def __init__(self, results: ResultBroker = result_broker, client=None):
+        self.results = results
+        self._client = client
+        self.message_service = MessageService()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from infrastructure.db.db_connection import get_async_redis_client
+            self._client = get_async_redis_client()
+        return self._client
+
+    @property
+    def ttl(self) -> int:
+        """Задача хранится до своего срока и еще RESULT_TTL после него - как и ее результат."""
+        return int(rabbitmq_settings.JOB_TIMEOUT) + self.results.ttl
+
+    async def create(self, kind: str, data: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+        """Создание задачи и публикация запроса воркеру."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = str(uuid4())
+        now = time.time()
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "user_id": user_id,
+            "created_at": now,
+            "deadline": now + rabbitmq_settings.JOB_TIMEOUT
+        }
+        await self.client.set(f"{KEY_PREFIX}{job_id}", json.dumps(job), ex=self.ttl)
+        try:
+            await self.message_service.submit_job(kind, data, job_id)
+        except Exception:
+            await self.client.delete(f"{KEY_PREFIX}{job_id}")
+            raise
+        return self._state(job, None)
+
+    async def get(self, job_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """Состояние задачи, при wait > 0 - ожидание результата до wait секунд."""
+        raw = await self.client.get(f"{KEY_PREFIX}{job_id}")
+        if raw is None:
+            return None
+        job = json.loads(raw)
+
+        reply = await self.results.get(job_id)
+        remaining = job["deadline"] - time.time()
+        if reply is None and wait > 0 and remaining > 0:
+            try:
+                reply = await self.results.wait(job_id, timeout=min(wait, remaining))
+            except asyncio.TimeoutError:
+                pass
+        return self._state(job, reply)
+
+    @staticmethod
+    def _state(job: Dict[str, Any], reply: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        state = {
+            "id": job["id"],
+            "kind": job["kind"],
+            "user_id": job["user_id"],
+            "created_at": job["created_at"],
+            "status": JOB_QUEUED,
+            "result": None,
+            "error": None
+        }
+        if reply is not None:
+            if reply.get("status") == "ok":
+                state["status"] = JOB_DONE
+                state["result"] = reply.get("result")
+            else:
+                state["status"] = JOB_FAILED
+                state["error"] = reply.get("error")
+        elif time.time() > job["deadline"]:
+            state["status"] = JOB_EXPIRED
+        return state
+
+job_service = JobService()
@@ -1,4 +1,4 @@
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 from .rabbitmq_client import RabbitMQClient
 from .config import rabbitmq_settings
 
@@ -6,6 +6,8 @@ from .config import rabbitmq_settings
 class LLMRabbitMQClient(RabbitMQClient):
     """Клиент RabbitMQ для операций с языковой моделью (LLM)."""
     
+    QUEUES = (rabbitmq_settings.LLM_QUEUE,)
+    
     async def publish_llm_request(self, prompt_data: Any) -> None:
         """Публикация запроса к языковой модели в очередь LLM."""
         await self.publish_message(
@@ -16,9 +18,38 @@ class LLMRabbitMQClient(RabbitMQClient):
             }
         )
     
-    async def consume_llm_requests(self, callback: Callable[[Any], None]) -> None:
+    async def request_llm(self, prompt_data: Any) -> Any:
+        """RPC-запрос к языковой модели с ожиданием ответа воркера."""
+        return await self.call(
+            rabbitmq_settings.LLM_QUEUE,
+            {
+                "type": "llm_request",
+                "data": prompt_data
+            }
+        )
+    
+    async def submit_llm_request(self, prompt_data: Any, request_id: str, timeout: float) -> str:
+        """Фоновый запрос к языковой модели, результат сохраняется в Redis под request_id."""
+        return await self.submit(
+            rabbitmq_settings.LLM_QUEUE,
+            {
+                "type": "llm_request",
+                "data": prompt_data
+            },
+            request_id=request_id,
+            timeout=timeout
+        )
+    
+    async def consume_llm_requests(
+        self,
+        callback: Callable[[Any], Any],
+        prefetch_count: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> None:
         """Начало потребления запросов к языковой модели."""
         await self.consume_messages(
             rabbitmq_settings.LLM_QUEUE,
-            callback
+            callback,
+            prefetch_count=prefetch_count,
+            concurrency=concurrency
         ) 
\ No newline at end of file
@@ -1,7 +1,12 @@
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from .tts_client import TTSRabbitMQClient
 from .stt_client import STTRabbitMQClient
 from .llm_client import LLMRabbitMQClient
+from .admission import AdmissionController
+from .config import rabbitmq_settings
+from .connection import connection_manager
+from .results import result_broker
+import base64
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,6 +16,7 @@ class MessageService:
     _tts_client: Optional[TTSRabbitMQClient] = None
     _stt_client: Optional[STTRabbitMQClient] = None
     _llm_client: Optional[LLMRabbitMQClient] = None
+    _admission: Optional[AdmissionController] = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -29,6 +35,8 @@ class MessageService:
             await self._stt_client.connect()
             await self._llm_client.connect()
 
+            self._admission = AdmissionController(self._llm_client.get_queue_stats)
+
             logger.info("RabbitMQ clients initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize RabbitMQ clients: {e}")
@@ -43,6 +51,8 @@ class MessageService:
                 await self._stt_client.close()
             if self._llm_client:
                 await self._llm_client.close()
+            await connection_manager.close()
+            await result_broker.close()
             logger.info("RabbitMQ connections closed")
         except Exception as e:
             logger.error(f"Error closing RabbitMQ connections: {e}")
@@ -68,6 +78,35 @@ class MessageService:
         })
         logger.info("Published STT request")
 
+    async def request_tts(self, text: str, speaker: str = "baya") -> Tuple[bytes, int]:
+        """Запрос на синтез речи с ожиданием аудио от воркера"""
+        if not self._tts_client:
+            raise RuntimeError("TTS client not initialized")
+
+        logger.info(f"Sending TTS request for text: {text[:50]}...")
+        async with self._admission.admit(rabbitmq_settings.TTS_QUEUE, rabbitmq_settings.RPC_TIMEOUT):
+            result = await self._tts_client.request_tts({
+                "text": text,
+                "speaker": speaker
+            })
+        audio_data = result["audio_data"]
+        # Ответ на JSON-запрос содержит аудио в base64
+        if isinstance(audio_data, str):
+            audio_data = base64.b64decode(audio_data)
+        return audio_data, result["sample_rate"]
+
+    async def request_stt(self, audio_data: bytes) -> str:
+        """Запрос на распознавание речи с ожиданием текста от воркера"""
+        if not self._stt_client:
+            raise RuntimeError("STT client not initialized")
+
+        logger.info("Sending STT request")
+        async with self._admission.admit(rabbitmq_settings.STT_QUEUE, rabbitmq_settings.RPC_TIMEOUT):
+            result = await self._stt_client.request_stt({
+                "audio_data": audio_data
+            })
+        return result["text"]
+
     async def publish_llm_request(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7, request_id: str = None):
         """Публикация запроса к языковой модели"""
         if not self._llm_client:
@@ -79,4 +118,49 @@ class MessageService:
             "temperature": temperature,
             "request_id": request_id
         })
-        logger.info(f"Published LLM request for prompt: {prompt[:50]}...") 
\ No newline at end of file
+        logger.info(f"Published LLM request for prompt: {prompt[:50]}...")
+
+    async def request_llm(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> str:
+        """Запрос к языковой модели с ожиданием результата от воркера"""
+        if not self._llm_client:
+            raise RuntimeError("LLM client not initialized")
+
+        logger.info(f"Sending LLM request for prompt: {prompt[:50]}...")
+        async with self._admission.admit(rabbitmq_settings.LLM_QUEUE, rabbitmq_settings.RPC_TIMEOUT):
+            result = await self._llm_client.request_llm({
+                "prompt": prompt,
+                "max_tokens": max_tokens,
+                "temperature": temperature
+            })
+        return result["text"]
+
+    async def peek_dead_letters(self, queue_name: str, limit: int = 10) -> Dict[str, Any]:
+        """Просмотр сообщений, не обработанных после всех повторов"""
+        if not self._llm_client:
+            raise RuntimeError("RabbitMQ clients not initialized")
+
+        return await self._llm_client.peek_dead_letters(queue_name, limit)
+
+    def queue_load(self) -> Dict[str, Any]:
+        """Наблюдаемая нагрузка очередей, по которой принимаются решения о допуске"""
+        if not self._admission:
+            raise RuntimeError("RabbitMQ clients not initialized")
+
+        return self._admission.stats()
+
+    async def submit_job(self, kind: str, data: Dict[str, Any], job_id: str) -> None:
+        """Фоновая задача: запрос публикуется без ожидания, результат воркер сохраняет в Redis"""
+        if not self._llm_client:
+            raise RuntimeError("RabbitMQ clients not initialized")
+
+        submitters = {
+            "stt": (rabbitmq_settings.STT_QUEUE, self._stt_client.submit_stt_request),
+            "tts": (rabbitmq_settings.TTS_QUEUE, self._tts_client.submit_tts_request),
+            "llm": (rabbitmq_settings.LLM_QUEUE, self._llm_client.submit_llm_request),
+        }
+        queue_name, submit = submitters[kind]
+
+        # Задача не держит соединение, поэтому допуск рассчитывается по ее сроку
+        await self._admission.check(queue_name, rabbitmq_settings.JOB_TIMEOUT)
+        await submit(data, request_id=job_id, timeout=rabbitmq_settings.JOB_TIMEOUT)
+        logger.info(f"Submitted {kind} job {job_id}")
@@ -0,0 +1,138 @@
+"""Статистика процессов API и воркеров в Redis.
+
+Счетчики (например, просроченные сообщения) живут в памяти процесса, а
+эндпоинты /api/system обслуживает любой процесс API. Поэтому каждый процесс
+периодически сохраняет снимки своих источников под ключом
+stats:<источник>:<процесс> с TTL, а эндпоинты собирают снимки всех живых
+процессов. Снимок завершившегося процесса исчезает по истечении TTL.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Any, Callable, Dict, Optional
+from .deadlines import deadline_counters
+from infrastructure.ml_models.thread_budget import thread_budget
+
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STATS_INTERVAL = float(os.getenv('PROCESS_STATS_INTERVAL', '5'))
+KEY_PREFIX = "stats:"
+
+class ProcessStats:
+    """Периодическая публикация снимков статистики процесса."""
+
+    def __init__(
+        self,
+        sources: Dict[str, Callable[[], Dict[str, Any]]],
+        client=None,
+        interval: float = PROCESS_STATS_INTERVAL
+    ):
+        self.sources = sources
+        self._client = client
+        self.interval = interval
+        self.ttl = max(int(interval * 3), 1)
+        self.process_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, source: Callable[[], Dict[str, Any]]) -> None:
+        """Добавление источника, доступного только после запуска процесса."""
+        self.sources[name] = source
+
+    @property
+    def client(self):
+        if self._client is None:
+            from infrastructure.db.db_connection import get_async_redis_client
+            self._client = get_async_redis_client()
+        return self._client
+
+    async def publish(self) -> None:
+        """Сохранение текущих снимков всех источников процесса."""
+        async with self.client.pipeline(transaction=False) as pipe:
+            for name, source in self.sources.items():
+                pipe.set(f"{KEY_PREFIX}{name}:{self.process_id}", json.dumps(source()), ex=self.ttl)
+            await pipe.execute()
+
+    async def collect(self, name: str) -> Dict[str, Dict[str, Any]]:
+        """Снимки источника по процессам: {процесс: снимок}."""
+        prefix = f"{KEY_PREFIX}{name}:"
+        keys = [key async for key in self.client.scan_iter(match=f"{prefix}*")]
+        if not keys:
+            return {}
+        snapshots = {}
+        for key, value in zip(keys, await self.client.mget(keys)):
+            if value is None:
+                continue
+            key = key.decode("utf-8") if isinstance(key, bytes) else key
+            snapshots[key[len(prefix):]] = json.loads(value)
+        return snapshots
+
+    def start(self) -> None:
+        """Запуск периодической публикации (без ожидания)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.publish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to publish process stats: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        """Остановка публикации и удаление снимков процесса."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            try:
+                await self.client.delete(*[f"{KEY_PREFIX}{name}:{self.process_id}" for name in self.sources])
+            except Exception as e:
+                logger.warning(f"Failed to remove process stats: {e}")
+
+def sum_deadline_counters(snapshots: Dict[str, Dict[str, Dict[str, int]]]) -> Dict[str, Dict[str, int]]:
+    """Сумма счетчиков просроченных сообщений по всем процессам."""
+    totals: Dict[str, Dict[str, int]] = {}
+    for snapshot in snapshots.values():
+        for queue_name, counters in snapshot.items():
+            queue_totals = totals.setdefault(queue_name, {"dropped": 0, "aborted": 0})
+            for kind, count in counters.items():
+                queue_totals[kind] = queue_totals.get(kind, 0) + count
+    return totals
+
+def sum_queue_load(snapshots: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Нагрузка очередей по всем процессам API.
+
+    Глубина и число консьюмеров приходят от брокера и одинаковы для всех
+    процессов, поэтому берется самый большой (свежий) снимок. Запросы в работе
+    складываются, время обработки усредняется, ожидание берется худшее.
+    """
+    totals: Dict[str, Dict[str, Any]] = {}
+    service_times: Dict[str, list] = {}
+    for snapshot in snapshots.values():
+        for queue_name, load in snapshot.items():
+            queue_totals = totals.setdefault(queue_name, {
+                "depth": 0, "consumers": 0, "in_flight": 0, "in_flight_ewma": 0.0,
+                "service_time_ewma": None, "predicted_wait": None
+            })
+            queue_totals["depth"] = max(queue_totals["depth"], load["depth"])
+            queue_totals["consumers"] = max(queue_totals["consumers"], load["consumers"])
+            queue_totals["in_flight"] += load["in_flight"]
+            queue_totals["in_flight_ewma"] = round(queue_totals["in_flight_ewma"] + load["in_flight_ewma"], 3)
+            if load["service_time_ewma"] is not None:
+                service_times.setdefault(queue_name, []).append(load["service_time_ewma"])
+            if load["predicted_wait"] is not None:
+                queue_totals["predicted_wait"] = max(queue_totals["predicted_wait"] or 0, load["predicted_wait"])
+    for queue_name, times in service_times.items():
+        totals[queue_name]["service_time_ewma"] = sum(times) / len(times)
+    return totals
+
+process_stats = ProcessStats({
+    "deadlines": deadline_counters.snapshot,
+    "threads": thread_budget.allocation,
+})
@@ -5,147 +5,180 @@ import numpy as np
 import soundfile as sf
 import io
 from pydub import AudioSegment
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional
 from .message_service import MessageService
-from core.use_cases.tts_use_cases import TextToSpeechUseCase
-from core.use_cases.stt_use_cases import SpeechToTextUseCase
-from core.use_cases.qwen_use_cases import QwenUseCase
+from .config import rabbitmq_settings
+from .deadlines import DeadlineExceeded, current_deadline, is_expired
 from core.entities.audio import AudioInput
-from core.entities.text import LLMInput
-from infrastructure.ml_models.silero.model import SileroModel
-from infrastructure.ml_models.whisper.model import WhisperModel
-from infrastructure.ml_models.qwen.model import QwenModel
-from infrastructure.web.controllers.qwen_controller import response_futures
+from core.entities.text import LLMInput, TextInput
 
 logger = logging.getLogger(__name__)
 
+ALL_QUEUES = (
+    rabbitmq_settings.STT_QUEUE,
+    rabbitmq_settings.TTS_QUEUE,
+    rabbitmq_settings.LLM_QUEUE,
+)
+
 class QueueProcessor:
-    def __init__(self):
+    """Обработчик очередей. Загружает только модели обслуживаемых очередей."""
+
+    def __init__(self, queues: Optional[Iterable[str]] = None, concurrency: Optional[int] = None):
         self.message_service = MessageService()
-        self.tts_use_case = TextToSpeechUseCase(SileroModel())
-        self.stt_use_case = SpeechToTextUseCase(WhisperModel())
-        self.llm_use_case = QwenUseCase()
+        self.queues = list(queues) if queues is not None else list(ALL_QUEUES)
+        self.concurrency = concurrency  # None - значения из настроек очереди
+
+        unknown = set(self.queues) - set(ALL_QUEUES)
+        if unknown:
+            raise ValueError(f"Unknown queues: {', '.join(sorted(unknown))}")
+
+        self.tts_use_case = None
+        self.stt_use_case = None
+        self.llm_use_case = None
+
+        # Модели импортируются лениво, чтобы не загружать torch без необходимости
+        if rabbitmq_settings.TTS_QUEUE in self.queues:
+            from core.use_cases.tts_use_cases import TextToSpeechUseCase
+            from infrastructure.ml_models.silero.model import SileroModel
+            self.tts_use_case = TextToSpeechUseCase(SileroModel())
+        if rabbitmq_settings.STT_QUEUE in self.queues:
+            from core.use_cases.stt_use_cases import SpeechToTextUseCase
+            from infrastructure.ml_models.whisper.model import WhisperModel
+            self.stt_use_case = SpeechToTextUseCase(WhisperModel())
+        if rabbitmq_settings.LLM_QUEUE in self.queues:
+            from core.use_cases.qwen_use_cases import QwenUseCase
+            self.llm_use_case = QwenUseCase()
 
-    async def process_tts_message(self, message: Dict[str, Any]):
+    async def process_tts_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """Обработка сообщения из очереди TTS"""
-        try:
-            text = message["data"]["text"]
-            speaker = message["data"].get("speaker", "baya")
-            
-            logger.info(f"Processing TTS request: {text[:50]}...")
+        text = message["data"]["text"]
+        speaker = message["data"].get("speaker", "baya")
 
-            
-        except Exception as e:
-            logger.error(f"Error processing TTS message: {e}")
+        logger.info(f"Processing TTS request: {text[:50]}...")
+
+        result = await self.tts_use_case.synthesize(
+            text_input=TextInput(text=text),
+            speaker=speaker
+        )
+
+        if not result.is_success:
+            logger.error(f"TTS processing failed: {result.error_message}")
+            raise RuntimeError(result.error_message)
 
-    async def process_stt_message(self, message: Dict[str, Any]):
+        logger.info(f"TTS processing successful: {len(result.data)} bytes")
+
+        return {
+            "audio_data": result.data,
+            "sample_rate": result.sample_rate
+        }
+
+    async def process_stt_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """Обработка сообщения из очереди STT"""
-        try:
-            # Декодируем base64 обратно в бинарные данные
-            audio_base64 = message["data"]["audio_data"]
-            raw_data = base64.b64decode(audio_base64)
-            
-            # Конвертируем в нужный формат
-            audio = AudioSegment.from_file(
-                io.BytesIO(raw_data), 
-                format="webm"  # Для Chrome
-                # format="ogg"  # Для Firefox
-            )
-            
-            # Устанавливаем нужные параметры
-            audio = audio.set_frame_rate(16000).set_channels(1)
-            
-            # Конвертируем в WAV
-            wav_buffer = io.BytesIO()
-            audio.export(wav_buffer, format="wav")
-            wav_buffer.seek(0)
-            
-            # Читаем аудио данные и частоту дискретизации
-            audio_data, sample_rate = sf.read(wav_buffer)
-            
-            # Нормализуем данные
-            if audio_data.dtype != np.float32:
-                audio_data = audio_data.astype(np.float32)
-            audio_data /= np.max(np.abs(audio_data))
-            
-            # Создаем входные данные для STT
-            audio_input = AudioInput(
-                data=audio_data,
-                sample_rate=sample_rate
-            )
-            
-            # Обрабатываем аудио
-            result = await self.stt_use_case.transcribe(audio_input=audio_input)
-            
-            if not result.is_success:
-                logger.error(f"STT processing failed: {result.error_message}")
-                return
-                
-            logger.info(f"STT processing successful: {result.text[:50]}...")
-            
-            
-        except Exception as e:
-            logger.error(f"Error processing STT message: {e}")
+        raw_data = message["data"]["audio_data"]
+        # Сообщения в JSON-формате содержат аудио в base64
+        if isinstance(raw_data, str):
+            raw_data = base64.b64decode(raw_data)
+
+        # Конвертируем в нужный формат
+        audio = AudioSegment.from_file(
+            io.BytesIO(raw_data),
+            format="webm"  # Для Chrome
+            # format="ogg"  # Для Firefox
+        )
+
+        # Устанавливаем нужные параметры
+        audio = audio.set_frame_rate(16000).set_channels(1)
+
+        # Конвертируем в WAV
+        wav_buffer = io.BytesIO()
+        audio.export(wav_buffer, format="wav")
+        wav_buffer.seek(0)
+
+        # Читаем аудио данные и частоту дискретизации
+        audio_data, sample_rate = sf.read(wav_buffer)
+
+        # Нормализуем данные
+        if audio_data.dtype != np.float32:
+            audio_data = audio_data.astype(np.float32)
+        audio_data /= np.max(np.abs(audio_data))
 
-    async def process_llm_message(self, message: Dict[str, Any]):
+        # Декодирование могло занять заметное время, распознавание уже не нужно
+        if is_expired(current_deadline.get()):
+            raise DeadlineExceeded("STT request expired before transcription")
+
+        # Создаем входные данные для STT
+        audio_input = AudioInput(
+            data=audio_data,
+            sample_rate=sample_rate
+        )
+
+        # Обрабатываем аудио
+        result = await self.stt_use_case.transcribe(audio_input=audio_input)
+
+        if not result.is_success:
+            logger.error(f"STT processing failed: {result.error_message}")
+            raise RuntimeError(result.error_message)
+
+        logger.info(f"STT processing successful: {result.text[:50]}...")
+
+        return {"text": result.text}
+
+    async def process_llm_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """Обработка сообщения из очереди LLM"""
-        try:
-            prompt = message["data"]["prompt"]
-            max_tokens = message["data"].get("max_tokens", 500)
-            temperature = message["data"].get("temperature", 0.7)
-            request_id = message["data"].get("request_id")
-            
-            logger.info(f"Processing LLM request: {prompt[:50]}...")
-            
-            # Создаем входные данные для LLM
-            input_data = LLMInput(prompt=prompt)
-            
-            # Обрабатываем запрос
-            result = await self.llm_use_case.generate(
-                input_data=input_data,
-                max_length=max_tokens,
-                temperature=temperature
-            )
-            
-            if not result.is_success:
-                logger.error(f"LLM processing failed: {result.error_message}")
-                if request_id and request_id in response_futures:
-                    response_futures[request_id].set_exception(
-                        Exception(result.error_message)
-                    )
-                return
-                
-            logger.info(f"LLM processing successful: {result.text[:50]}...")
-            
-            # Отправляем результат обратно в контроллер
-            if request_id and request_id in response_futures:
-                response_futures[request_id].set_result(result.text)
-            
-        except Exception as e:
-            logger.error(f"Error processing LLM message: {e}")
-            if request_id and request_id in response_futures:
-                response_futures[request_id].set_exception(e)
+        prompt = message["data"]["prompt"]
+        max_tokens = message["data"].get("max_tokens", 500)
+        temperature = message["data"].get("temperature", 0.7)
+
+        logger.info(f"Processing LLM request: {prompt[:50]}...")
+
+        # Создаем входные данные для LLM
+        input_data = LLMInput(prompt=prompt)
+
+        # Обрабатываем запрос, генерация прерывается по истечении срока сообщения
+        result = await self.llm_use_case.generate(
+            input_data=input_data,
+            max_length=max_tokens,
+            temperature=temperature,
+            deadline=current_deadline.get()
+        )
+
+        if not result.is_success:
+            logger.error(f"LLM processing failed: {result.error_message}")
+            raise RuntimeError(result.error_message)
+
+        logger.info(f"LLM processing successful: {result.text[:50]}...")
+
+        return {"text": result.text}
 
     async def start_processing(self):
-        """Запуск обработки сообщений из всех очередей"""
+        """Запуск обработки сообщений из обслуживаемых очередей"""
         try:
             # Подписываемся на очереди
-            await self.message_service._tts_client.consume_tts_requests(
-                self.process_tts_message
-            )
-            await self.message_service._stt_client.consume_stt_requests(
-                self.process_stt_message
-            )
-            await self.message_service._llm_client.consume_llm_requests(
-                self.process_llm_message
-            )
-            
-            logger.info("Started processing messages from all queues")
-            
+            if self.tts_use_case:
+                await self.message_service._tts_client.consume_tts_requests(
+                    self.process_tts_message,
+                    prefetch_count=self.concurrency,
+                    concurrency=self.concurrency
+                )
+            if self.stt_use_case:
+                await self.message_service._stt_client.consume_stt_requests(
+                    self.process_stt_message,
+                    prefetch_count=self.concurrency,
+                    concurrency=self.concurrency
+                )
+            if self.llm_use_case:
+                await self.message_service._llm_client.consume_llm_requests(
+                    self.process_llm_message,
+                    prefetch_count=self.concurrency,
+                    concurrency=self.concurrency
+                )
+
+            logger.info(f"Started processing messages from queues: {', '.join(self.queues)}")
+
             # Держим процессор запущенным
             while True:
                 await asyncio.sleep(1)
-                
+
         except Exception as e:
             logger.error(f"Error in queue processor: {e}")
-            raise 
\ No newline at end of file
+            raise
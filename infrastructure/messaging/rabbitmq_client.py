@@ -1,88 +1,590 @@
-import json
+import asyncio
+import logging
 import aio_pika
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+from uuid import uuid4
 from .config import rabbitmq_settings
+from .claim_check import CLAIM_CHECK_HEADER, ClaimNotFound, get_blob_store
+from .codecs import CODECS, MSGPACK_CONTENT_TYPE, RAW_CONTENT_TYPE, get_codec
+from .connection import connection_manager
+from .results import RESULT_KEY_HEADER, result_broker
+from .deadlines import (
+    DEADLINE_HEADER,
+    current_deadline,
+    deadline_after,
+    deadline_counters,
+    decode_deadline,
+    encode_deadline,
+    is_expired,
+    time_left
+)
+
+
+logger = logging.getLogger(__name__)
+
+ACK_AFTER = "after"  # Подтверждение после обработки (at-least-once)
+ACK_BEFORE = "before"  # Подтверждение при получении (at-most-once)
+ACK_STRATEGIES = (ACK_AFTER, ACK_BEFORE)
+
+RETRY_COUNT_HEADER = "x-retry-count"  # Число уже выполненных повторов сообщения
+ERROR_HEADER = "x-error"  # Последняя ошибка обработки
+ORIGINAL_QUEUE_HEADER = "x-original-queue"  # Очередь, из которой сообщение попало в DLQ
+
+
+def retry_queue_name(queue_name: str, attempt: int) -> str:
+    """Имя очереди задержки для попытки с указанным номером."""
+    return f"{queue_name}.retry.{attempt}"
+
+def dead_letter_queue_name(queue_name: str) -> str:
+    """Имя очереди недоставляемых сообщений."""
+    return f"{queue_name}.dlq"
+
+def retry_delay_ms(attempt: int) -> int:
+    """Экспоненциальная задержка перед повтором, ограниченная сверху."""
+    delay = rabbitmq_settings.RETRY_BASE_DELAY_MS * 2 ** (attempt - 1)
+    return min(delay, rabbitmq_settings.RETRY_MAX_DELAY_MS)
+
+
+def dead_letter_arguments() -> Optional[Dict[str, Any]]:
+    """Ограничения DLQ по числу и возрасту сообщений из настроек."""
+    arguments = {}
+    if rabbitmq_settings.DLQ_MAX_LENGTH:
+        arguments["x-max-length"] = rabbitmq_settings.DLQ_MAX_LENGTH
+    if rabbitmq_settings.DLQ_MESSAGE_TTL_MS:
+        arguments["x-message-ttl"] = rabbitmq_settings.DLQ_MESSAGE_TTL_MS
+    return arguments or None
+
+
+class MessageDecodeError(Exception):
+    """Тело сообщения не удалось декодировать, повтор бесполезен."""
+
+class RpcError(Exception):
+    """Ошибка, возвращенная воркером в ответ на RPC-запрос."""
 
 
 class RabbitMQClient:
     """Базовый класс для операций с RabbitMQ."""
-    
+
+    QUEUES: Tuple[str, ...] = ()  # Очереди, объявляемые сразу при подключении
+    codec = CODECS[rabbitmq_settings.MESSAGE_CODEC]  # Кодек по умолчанию для публикуемых сообщений
+
     def __init__(self):
-        self.connection: Optional[aio_pika.Connection] = None  # Соединение с RabbitMQ
-        self.channel: Optional[aio_pika.Channel] = None  # Канал для обмена сообщениями
+        self.connection: Optional[aio_pika.Connection] = None  # Общее соединение процесса
+        self.channel: Optional[aio_pika.Channel] = None  # Канал для потребления и объявления топологии
         self.exchange: Optional[aio_pika.Exchange] = None  # Обменник для маршрутизации
-        
+        self.reply_queue: Optional[aio_pika.Queue] = None  # Эксклюзивная очередь ответов на RPC-запросы
+        self._pending_replies: Dict[str, asyncio.Future] = {}  # Ожидающие ответа запросы по correlation_id
+        self._declared_queues: Dict[str, aio_pika.Queue] = {}  # Очереди, уже объявленные и привязанные в текущем канале
+        self._tasks: Set[asyncio.Task] = set()  # Обрабатываемые в данный момент сообщения
+
     async def connect(self) -> None:
-        """Установка соединения с сервером RabbitMQ."""
+        """Подключение к общему соединению процесса и открытие канала клиента."""
         if not self.connection:
-            self.connection = await aio_pika.connect_robust(
-                host=rabbitmq_settings.HOST,
-                port=rabbitmq_settings.PORT,
-                login=rabbitmq_settings.USER,
-                password=rabbitmq_settings.PASSWORD,
-                virtualhost=rabbitmq_settings.VHOST
-            )
-            self.channel = await self.connection.channel()
-            self.exchange = await self.channel.declare_exchange(
-                rabbitmq_settings.MAIN_EXCHANGE,
-                aio_pika.ExchangeType.DIRECT
+            self.connection = await connection_manager.get_connection()
+            connection_manager.add_reconnect_callback(self._on_reconnect)
+            self.channel = await connection_manager.open_channel()
+            await self._declare_topology()
+
+    async def _declare_topology(self) -> None:
+        """Объявление обменника и известных очередей в текущем канале."""
+        self._declared_queues.clear()
+        self.exchange = await self.channel.declare_exchange(
+            rabbitmq_settings.MAIN_EXCHANGE,
+            aio_pika.ExchangeType.DIRECT
+        )
+        for queue_name in self.QUEUES:
+            await self._ensure_queue(queue_name)
+
+    def _on_reconnect(self, *args) -> None:
+        """После переподключения топология объявляется заново."""
+        logger.info("RabbitMQ reconnected, redeclaring topology")
+        self._declared_queues.clear()
+        if self.channel:
+            asyncio.get_running_loop().create_task(self._declare_topology())
+
+    async def _ensure_queue(self, queue_name: str) -> aio_pika.Queue:
+        """Объявление и привязка очереди один раз на канал."""
+        queue = self._declared_queues.get(queue_name)
+        if queue is None:
+            queue = await self.channel.declare_queue(queue_name, durable=True)
+            await queue.bind(self.exchange, queue_name)
+            self._declared_queues[queue_name] = queue
+        return queue
+
+    async def _ensure_aux_queue(self, queue_name: str, arguments: Optional[Dict[str, Any]] = None) -> aio_pika.Queue:
+        """Объявление служебной очереди (повторы, DLQ), публикуемой через default exchange."""
+        queue = self._declared_queues.get(queue_name)
+        if queue is None:
+            queue = await self.channel.declare_queue(queue_name, durable=True, arguments=arguments)
+            self._declared_queues[queue_name] = queue
+        return queue
+
+    async def _ensure_retry_topology(self, queue_name: str) -> None:
+        """Очереди задержки для каждой попытки и DLQ для исходной очереди.
+
+        Сообщение в очереди задержки живет retry_delay_ms(attempt) и затем
+        возвращается в исходную очередь через основной обменник.
+        """
+        for attempt in range(1, rabbitmq_settings.MAX_RETRIES + 1):
+            await self._ensure_aux_queue(
+                retry_queue_name(queue_name, attempt),
+                arguments={
+                    "x-message-ttl": retry_delay_ms(attempt),
+                    "x-dead-letter-exchange": rabbitmq_settings.MAIN_EXCHANGE,
+                    "x-dead-letter-routing-key": queue_name
+                }
             )
-    
+        await self._ensure_aux_queue(dead_letter_queue_name(queue_name), arguments=dead_letter_arguments())
+
     async def close(self) -> None:
-        """Закрытие соединения с RabbitMQ."""
+        """Закрытие канала клиента. Общее соединение закрывает connection_manager."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for future in self._pending_replies.values():
+            if not future.done():
+                future.cancel()
+        self._pending_replies.clear()
         if self.connection:
-            await self.connection.close()
+            self.connection.reconnect_callbacks.discard(self._on_reconnect)
+            if self.channel and not self.channel.is_closed:
+                await self.channel.close()
             self.connection = None
             self.channel = None
             self.exchange = None
-    
-    async def publish_message(self, queue_name: str, message: Any) -> None:
-        """Публикация сообщения в указанную очередь."""
+            self.reply_queue = None
+            self._declared_queues.clear()
+
+    async def publish_message(
+        self,
+        queue_name: str,
+        message: Any,
+        correlation_id: Optional[str] = None,
+        reply_to: Optional[str] = None,
+        codec=None,
+        deadline: Optional[float] = None,
+        result_key: Optional[str] = None
+    ) -> None:
+        """Публикация сообщения в указанную очередь.
+
+        Сообщение несет абсолютный срок в заголовке x-deadline и AMQP expiration,
+        поэтому брокер и воркер отбрасывают его, когда ответ уже никому не нужен.
+        Тело больше CLAIM_CHECK_THRESHOLD байт передается через хранилище claim-check.
+        """
         if not self.connection:
             await self.connect()
-            
-        queue = await self.channel.declare_queue(queue_name, durable=True)
-        
-        await queue.bind(self.exchange, queue_name)
-        
-        await self.exchange.publish(
+
+        await self._ensure_queue(queue_name)
+
+        codec = codec or self.codec
+        body, headers = codec.encode(message)
+
+        if deadline is None:
+            deadline = deadline_after(rabbitmq_settings.MESSAGE_TTL)
+        headers[DEADLINE_HEADER] = encode_deadline(deadline)
+        if result_key is not None:
+            headers[RESULT_KEY_HEADER] = result_key
+
+        threshold = rabbitmq_settings.CLAIM_CHECK_THRESHOLD
+        if threshold and len(body) > threshold:
+            headers[CLAIM_CHECK_HEADER] = await get_blob_store().put(body)
+            body = b""
+
+        await self._publish(
+            aio_pika.Message(
+                body=body,
+                headers=headers,
+                content_type=codec.content_type,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                correlation_id=correlation_id,
+                reply_to=reply_to,
+                expiration=max(time_left(deadline), 0.001)
+            ),
+            routing_key=queue_name,
+            exchange_name=rabbitmq_settings.MAIN_EXCHANGE
+        )
+
+    async def _publish(self, message: aio_pika.Message, routing_key: str, exchange_name: Optional[str] = None) -> None:
+        """Публикация через пул каналов издателя (без exchange_name - в default exchange)."""
+        async with connection_manager.publish_channel() as channel:
+            if exchange_name is None:
+                exchange = channel.default_exchange
+            else:
+                exchange = await channel.get_exchange(exchange_name, ensure=False)
+            await exchange.publish(message, routing_key=routing_key)
+
+    @staticmethod
+    def decode_message(message: aio_pika.IncomingMessage, body: Optional[bytes] = None) -> Any:
+        """Декодирование тела сообщения (или полезной нагрузки claim-check) по его content_type."""
+        try:
+            codec = get_codec(message.content_type)
+            return codec.decode(message.body if body is None else body, message.headers or {})
+        except Exception as e:
+            raise MessageDecodeError(str(e)) from e
+
+    async def _ensure_reply_queue(self) -> aio_pika.Queue:
+        """Создание эксклюзивной очереди ответов для этого экземпляра клиента."""
+        if not self.connection:
+            await self.connect()
+
+        if self.reply_queue is None:
+            self.reply_queue = await self.channel.declare_queue(
+                exclusive=True,
+                auto_delete=True
+            )
+            await self.reply_queue.consume(self._on_reply, no_ack=True)
+        return self.reply_queue
+
+    async def call(
+        self,
+        queue_name: str,
+        message: Any,
+        timeout: float = rabbitmq_settings.RPC_TIMEOUT,
+        codec=None
+    ) -> Any:
+        """RPC-запрос: публикация сообщения и ожидание ответа воркера.
+
+        При RESULT_DELIVERY=redis ответ приходит через Redis, а не в очередь
+        ответов процесса, и остается доступным RESULT_TTL секунд.
+        """
+        if rabbitmq_settings.RESULT_DELIVERY == "redis":
+            request_id = await self.submit(queue_name, message, timeout=timeout, codec=codec)
+            return self._unwrap_reply(await result_broker.wait(request_id, timeout))
+
+        reply_queue = await self._ensure_reply_queue()
+
+        correlation_id = str(uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self._pending_replies[correlation_id] = future
+
+        try:
+            await self.publish_message(
+                queue_name,
+                message,
+                correlation_id=correlation_id,
+                reply_to=reply_queue.name,
+                codec=codec,
+                deadline=deadline_after(timeout)
+            )
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending_replies.pop(correlation_id, None)
+
+    async def submit(
+        self,
+        queue_name: str,
+        message: Any,
+        request_id: Optional[str] = None,
+        timeout: float = rabbitmq_settings.RPC_TIMEOUT,
+        codec=None
+    ) -> str:
+        """Публикация запроса, результат которого воркер сохранит в Redis под request_id."""
+        request_id = request_id or str(uuid4())
+        await self.publish_message(
+            queue_name,
+            message,
+            correlation_id=request_id,
+            codec=codec,
+            deadline=deadline_after(timeout),
+            result_key=request_id
+        )
+        return request_id
+
+    @staticmethod
+    def _unwrap_reply(reply: Dict[str, Any]) -> Any:
+        """Результат из ответа воркера или RpcError."""
+        if reply.get("status") == "ok":
+            return reply.get("result")
+        raise RpcError(reply.get("error", "Unknown worker error"))
+
+    async def _on_reply(self, message: aio_pika.IncomingMessage) -> None:
+        """Обработка ответа воркера на RPC-запрос."""
+        future = self._pending_replies.get(message.correlation_id)
+        if future is None or future.done():
+            logger.warning(f"Reply for unknown or finished request: {message.correlation_id}")
+            return
+
+        try:
+            reply = self.decode_message(message)
+        except Exception as e:
+            future.set_exception(RpcError(f"Malformed reply: {e}"))
+            return
+
+        try:
+            future.set_result(self._unwrap_reply(reply))
+        except RpcError as e:
+            future.set_exception(e)
+
+    async def _send_reply(self, message: aio_pika.IncomingMessage, reply: Dict[str, Any]) -> None:
+        """Отправка ответа в очередь reply_to вызывающей стороны.
+
+        Ответ кодируется в формате запроса, чтобы клиенты, ожидающие JSON,
+        продолжали работать во время перехода на msgpack.
+        """
+        codec = get_codec(message.content_type)
+        if codec.content_type == RAW_CONTENT_TYPE:
+            codec = CODECS[MSGPACK_CONTENT_TYPE]
+        body, headers = codec.encode(reply)
+        await self._publish(
             aio_pika.Message(
-                body=json.dumps(message).encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                body=body,
+                headers=headers,
+                content_type=codec.content_type,
+                correlation_id=message.correlation_id
             ),
-            routing_key=queue_name
+            routing_key=message.reply_to
         )
-    
+
     async def consume_messages(
         self,
         queue_name: str,
-        callback: Callable[[Any], None],
-        prefetch_count: int = 1
+        callback: Callable[[Any], Any],
+        prefetch_count: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        ack_strategy: Optional[str] = None
     ) -> None:
-        """Начало потребления сообщений из указанной очереди."""
+        """Начало потребления сообщений из указанной очереди.
+
+        Не заданные параметры берутся из настроек очереди в RabbitMQSettings.
+        Одновременно выполняется не более concurrency обработчиков.
+        """
         if not self.connection:
             await self.connect()
-            
-        await self.channel.set_qos(prefetch_count=prefetch_count)
-        
-        queue = await self.channel.declare_queue(queue_name, durable=True)
-        
-        await queue.bind(self.exchange, queue_name)
-        
+
+        options = rabbitmq_settings.queue_options(queue_name)
+        prefetch_count = prefetch_count or options["prefetch"]
+        concurrency = concurrency or options["concurrency"]
+        ack_strategy = ack_strategy or options["ack_strategy"]
+        if ack_strategy not in ACK_STRATEGIES:
+            raise ValueError(f"Unknown ack strategy: {ack_strategy}")
+
+        await self.channel.set_qos(prefetch_count=max(prefetch_count, concurrency))
+
+        queue = await self._ensure_queue(queue_name)
+        await self._ensure_retry_topology(queue_name)
+        semaphore = asyncio.Semaphore(concurrency)
+
         await queue.consume(
-            lambda message: self._process_message(message, callback)
+            lambda message: self._dispatch(message, queue_name, callback, semaphore, ack_strategy)
         )
-    
-    async def _process_message(
+        logger.info(
+            f"Consuming {queue_name}: prefetch={prefetch_count}, "
+            f"concurrency={concurrency}, ack={ack_strategy}"
+        )
+
+    async def _dispatch(
         self,
         message: aio_pika.IncomingMessage,
-        callback: Callable[[Any], None]
+        queue_name: str,
+        callback: Callable[[Any], Any],
+        semaphore: asyncio.Semaphore,
+        ack_strategy: str
     ) -> None:
-        """Обработка входящего сообщения."""
-        async with message.process():
+        """Запуск обработки сообщения в пуле, ограниченном семафором.
+
+        При ACK_BEFORE сообщение подтверждается только после захвата слота:
+        иначе брокер досылает новые сообщения сверх prefetch, и они копятся
+        в памяти процесса, а при его падении теряются.
+        """
+        async with semaphore:
+            if ack_strategy == ACK_BEFORE:
+                await message.ack()
+
+            task = asyncio.current_task()
+            self._tasks.add(task)
             try:
-                data = json.loads(message.body.decode())
-                await callback(data)
-            except Exception as e:
-                print(f"Ошибка обработки сообщения: {e}")
-                await message.reject(requeue=True) 
\ No newline at end of file
+                await self._process_message(message, queue_name, callback)
+            finally:
+                self._tasks.discard(task)
+
+    async def _process_message(
+        self,
+        message: aio_pika.IncomingMessage,
+        queue_name: str,
+        callback: Callable[[Any], Any]
+    ) -> None:
+        """Обработка входящего сообщения.
+
+        Результат callback отправляется в reply_to, если он указан. Сообщения
+        с ошибкой повторяются с экспоненциальной задержкой до MAX_RETRIES раз,
+        пока повтор успевает до срока сообщения; RPC-запрос получает ответ
+        от успешного повтора. Когда повторы исчерпаны, ошибка возвращается
+        вызывающей стороне, а сообщение уходит в DLQ.
+
+        Просроченные сообщения подтверждаются без обработки, а результат или
+        ошибка, полученные после срока, отбрасываются без ответа и повторов.
+        """
+        deadline = decode_deadline(message.headers)
+        claim = (message.headers or {}).get(CLAIM_CHECK_HEADER)
+        keep_claim = False
+        try:
+            async with message.process(ignore_processed=True):
+                if is_expired(deadline):
+                    deadline_counters.dropped(queue_name)
+                    logger.info(f"Dropped expired message from {queue_name}")
+                    return
+
+                token = current_deadline.set(deadline)
+                try:
+                    data = self.decode_message(message, await self._load_claim(claim))
+                    result = await callback(data)
+                    if is_expired(deadline):
+                        deadline_counters.aborted(queue_name)
+                        logger.warning(f"Discarded result for expired message from {queue_name}")
+                        return
+                    await self._deliver(message, {"status": "ok", "result": result})
+                except Exception as e:
+                    if is_expired(deadline):
+                        deadline_counters.aborted(queue_name)
+                        logger.warning(f"Aborted expired message from {queue_name}: {e}")
+                        return
+                    logger.error(f"Ошибка обработки сообщения из {queue_name}: {e}")
+                    retryable = not isinstance(e, MessageDecodeError)
+                    if not await self._handle_failure(message, queue_name, e, retryable, deadline):
+                        await self._deliver(message, {"status": "error", "error": str(e)})
+                    # Полезная нагрузка нужна повтору или для разбора DLQ, ее удалит TTL
+                    keep_claim = True
+                finally:
+                    current_deadline.reset(token)
+        finally:
+            if claim and not keep_claim:
+                await self._release_claim(claim)
+
+    async def _deliver(self, message: aio_pika.IncomingMessage, reply: Dict[str, Any]) -> None:
+        """Отправка ответа в reply_to и/или в хранилище результатов по x-result-key."""
+        if message.reply_to:
+            await self._send_reply(message, reply)
+        result_key = (message.headers or {}).get(RESULT_KEY_HEADER)
+        if result_key:
+            await result_broker.publish(result_key, reply, deadline=decode_deadline(message.headers))
+
+    @staticmethod
+    async def _load_claim(claim: Optional[str]) -> Optional[bytes]:
+        """Чтение полезной нагрузки по ссылке claim-check."""
+        if claim is None:
+            return None
+        try:
+            return await get_blob_store().get(claim)
+        except ClaimNotFound as e:
+            raise MessageDecodeError(f"Claim-check payload not found: {e}") from e
+
+    @staticmethod
+    async def _release_claim(claim: str) -> None:
+        """Удаление полезной нагрузки после подтверждения сообщения."""
+        try:
+            await get_blob_store().delete(claim)
+        except Exception as e:
+            logger.warning(f"Could not delete claim-check payload {claim}: {e}")
+
+    async def _handle_failure(
+        self,
+        message: aio_pika.IncomingMessage,
+        queue_name: str,
+        error: Exception,
+        retryable: bool,
+        deadline: Optional[float] = None
+    ) -> bool:
+        """Перенос сообщения в очередь задержки или в DLQ с подтверждением оригинала.
+
+        Повтор, который вернется в очередь после срока сообщения, бесполезен:
+        такое сообщение сразу уходит в DLQ. Если переопубликовать сообщение
+        не удалось, оригинал возвращается в очередь (nack с requeue), чтобы
+        не потерять его. Возвращает True, если сообщение будет обработано
+        повторно.
+        """
+        headers = dict(message.headers or {})
+        retry_count = int(headers.get(RETRY_COUNT_HEADER, 0))
+        headers[ERROR_HEADER] = str(error)[:1000]
+
+        remaining = time_left(deadline)
+        retry = (
+            retryable
+            and retry_count < rabbitmq_settings.MAX_RETRIES
+            and (remaining is None or remaining * 1000 > retry_delay_ms(retry_count + 1))
+        )
+        if retry:
+            headers[RETRY_COUNT_HEADER] = retry_count + 1
+            target = retry_queue_name(queue_name, retry_count + 1)
+            logger.warning(
+                f"Retry {retry_count + 1}/{rabbitmq_settings.MAX_RETRIES} for message from {queue_name} "
+                f"in {retry_delay_ms(retry_count + 1)} ms"
+            )
+        else:
+            headers[ORIGINAL_QUEUE_HEADER] = queue_name
+            target = dead_letter_queue_name(queue_name)
+            logger.error(f"Message from {queue_name} moved to {target} after {retry_count} retries")
+
+        try:
+            await self._ensure_retry_topology(queue_name)
+            await self._publish(
+                aio_pika.Message(
+                    body=message.body,
+                    headers=headers,
+                    content_type=message.content_type,
+                    correlation_id=message.correlation_id,
+                    reply_to=message.reply_to,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                ),
+                routing_key=target
+            )
+        except Exception as e:
+            if message.processed:
+                # При ACK_BEFORE оригинал уже подтвержден, вернуть его нельзя
+                logger.error(f"Failed to move message from {queue_name} to {target}, message lost: {e}")
+                return False
+            logger.error(f"Failed to move message from {queue_name} to {target}, requeueing: {e}")
+            await message.nack(requeue=True)
+            return True
+
+        if not message.processed:
+            await message.ack()
+        return retry
+
+    async def get_queue_stats(self, queue_name: str) -> Tuple[int, int]:
+        """Число готовых сообщений и потребителей очереди (пассивное объявление)."""
+        if not self.connection:
+            await self.connect()
+
+        await self._ensure_queue(queue_name)
+        queue = await self.channel.declare_queue(queue_name, durable=True, passive=True)
+        result = queue.declaration_result
+        return result.message_count, result.consumer_count
+
+    async def peek_dead_letters(self, queue_name: str, limit: int = 10) -> Dict[str, Any]:
+        """Просмотр сообщений в DLQ без их удаления."""
+        if not self.connection:
+            await self.connect()
+
+        dlq_name = dead_letter_queue_name(queue_name)
+        queue = await self.channel.declare_queue(dlq_name, durable=True, passive=True)
+        total = queue.declaration_result.message_count
+
+        fetched = []
+        try:
+            for _ in range(min(limit, total)):
+                message = await queue.get(no_ack=False, fail=False)
+                if message is None:
+                    break
+                fetched.append(message)
+        finally:
+            # Возвращаем сообщения в очередь после просмотра
+            for message in fetched:
+                await message.nack(requeue=True)
+
+        return {
+            "queue": dlq_name,
+            "message_count": total,
+            "messages": [
+                {
+                    "correlation_id": m.correlation_id,
+                    "content_type": m.content_type,
+                    "size": len(m.body),
+                    "retry_count": int((m.headers or {}).get(RETRY_COUNT_HEADER, 0)),
+                    "error": (m.headers or {}).get(ERROR_HEADER),
+                    "headers": {
+                        k: v for k, v in (m.headers or {}).items()
+                        if isinstance(v, (str, int, float, bool))
+                    }
+                }
+                for m in fetched
+            ]
+        }
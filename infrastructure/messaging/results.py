@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import math
+import time
+import msgpack
+from typing import Any, Dict, Optional, Set
+from .config import rabbitmq_settings
+
+
+logger = logging.getLogger(__name__)
+
+RESULT_KEY_HEADER = "x-result-key"  # Идентификатор запроса, под которым воркер сохраняет результат
+RESULTS_CHANNEL = "results"
+KEY_PREFIX = "result:"
+
+class ResultBroker:
+    """Доставка результатов воркеров через Redis.
+
+    Воркер сохраняет ответ под ключом result:<request_id> с TTL и публикует
+    в канал results только request_id. Каждый процесс API держит одну
+    подписку на канал и читает из хранилища лишь ответы своих ожидающих
+    запросов, поэтому тело ответа (например, аудио TTS) не рассылается всем
+    репликам, а опоздавший клиент может прочитать его из хранилища.
+    """
+
+    RECONNECT_DELAY = 1.0  # Секунды между попытками восстановить подписку
+
+    def __init__(self, client=None, ttl: int = rabbitmq_settings.RESULT_TTL):
+        self._client = client
+        self.ttl = ttl
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed: Optional[asyncio.Event] = None
+        self._fetches: Set[asyncio.Task] = set()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from infrastructure.db.db_connection import get_async_redis_client
+            self._client = get_async_redis_client()
+        return self._client
+
+    async def publish(self, request_id: str, reply: Dict[str, Any], deadline: Optional[float] = None) -> None:
+        """Сохранение ответа и уведомление ожидающих процессов.
+
+        Ответ хранится ttl секунд после срока запроса (или после публикации,
+        если срока нет): столько же, сколько описание фоновой задачи, чей
+        результат пришел раньше срока.
+        """
+        payload = msgpack.packb(reply, use_bin_type=True)
+        ttl = self.ttl
+        if deadline is not None:
+            ttl += max(math.ceil(deadline - time.time()), 0)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(f"{KEY_PREFIX}{request_id}", payload, ex=ttl)
+            pipe.publish(RESULTS_CHANNEL, request_id)
+            await pipe.execute()
+
+    async def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Сохраненный ответ или None, если его еще нет (или истек TTL)."""
+        payload = await self.client.get(f"{KEY_PREFIX}{request_id}")
+        if payload is None:
+            return None
+        return msgpack.unpackb(payload, raw=False)
+
+    async def wait(self, request_id: str, timeout: float) -> Dict[str, Any]:
+        """Ожидание ответа не дольше timeout секунд (asyncio.TimeoutError по истечении)."""
+        await asyncio.wait_for(self._ensure_listener(), timeout=timeout)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(request_id, set()).add(future)
+        try:
+            # Ответ мог прийти до подписки ожидающего
+            stored = await self.get(request_id)
+            if stored is not None:
+                return stored
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            waiters = self._waiters.get(request_id)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[request_id]
+
+    async def _ensure_listener(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._subscribed = asyncio.Event()
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        await self._subscribed.wait()
+
+    async def _listen(self) -> None:
+        """Единственная подписка процесса на канал результатов."""
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(RESULTS_CHANNEL)
+                self._subscribed.set()
+                await self._recheck_waiters()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Results subscription lost: {e}, reconnecting")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+
+    async def _recheck_waiters(self) -> None:
+        """Ответы, опубликованные, пока подписка восстанавливалась, читаются из хранилища."""
+        for request_id in list(self._waiters):
+            stored = await self.get(request_id)
+            if stored is not None:
+                self._resolve(request_id, stored)
+
+    def _dispatch(self, data: bytes) -> None:
+        request_id = data.decode("utf-8") if isinstance(data, bytes) else data
+        if request_id in self._waiters:
+            fetch = asyncio.get_running_loop().create_task(self._fetch(request_id))
+            self._fetches.add(fetch)
+            fetch.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, request_id: str) -> None:
+        """Чтение ответа, о котором пришло уведомление, для ожидающих в этом процессе."""
+        try:
+            stored = await self.get(request_id)
+        except Exception as e:
+            logger.warning(f"Failed to fetch result {request_id}: {e}")
+            return
+        if stored is not None:
+            self._resolve(request_id, stored)
+
+    def _resolve(self, request_id: str, reply: Dict[str, Any]) -> None:
+        for future in self._waiters.get(request_id, ()):
+            if not future.done():
+                future.set_result(reply)
+
+    async def close(self) -> None:
+        """Остановка подписки и отмена ожидающих запросов."""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        for fetch in list(self._fetches):
+            fetch.cancel()
+        for waiters in self._waiters.values():
+            for future in waiters:
+                if not future.done():
+                    future.cancel()
+        self._waiters.clear()
+
+result_broker = ResultBroker()
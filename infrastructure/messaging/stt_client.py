@@ -1,11 +1,15 @@
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 from .rabbitmq_client import RabbitMQClient
+from .codecs import RawBytesCodec
 from .config import rabbitmq_settings
 
 
 class STTRabbitMQClient(RabbitMQClient):
     """Клиент RabbitMQ для операций преобразования речи в текст (STT)."""
     
+    QUEUES = (rabbitmq_settings.STT_QUEUE,)
+    audio_codec = RawBytesCodec(payload_field="audio_data")  # Аудио передается телом сообщения без base64
+    
     async def publish_stt_request(self, audio_data: Any) -> None:
         """Публикация запроса на преобразование речи в текст в очередь STT."""
         await self.publish_message(
@@ -13,12 +17,44 @@ class STTRabbitMQClient(RabbitMQClient):
             {
                 "type": "stt_request",
                 "data": audio_data
-            }
+            },
+            codec=self.audio_codec
+        )
+    
+    async def request_stt(self, audio_data: Any) -> Any:
+        """RPC-запрос на преобразование речи в текст с ожиданием ответа воркера."""
+        return await self.call(
+            rabbitmq_settings.STT_QUEUE,
+            {
+                "type": "stt_request",
+                "data": audio_data
+            },
+            codec=self.audio_codec
+        )
+    
+    async def submit_stt_request(self, audio_data: Any, request_id: str, timeout: float) -> str:
+        """Фоновый запрос на распознавание, результат сохраняется в Redis под request_id."""
+        return await self.submit(
+            rabbitmq_settings.STT_QUEUE,
+            {
+                "type": "stt_request",
+                "data": audio_data
+            },
+            request_id=request_id,
+            timeout=timeout,
+            codec=self.audio_codec
         )
     
-    async def consume_stt_requests(self, callback: Callable[[Any], None]) -> None:
+    async def consume_stt_requests(
+        self,
+        callback: Callable[[Any], Any],
+        prefetch_count: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> None:
         """Начало потребления запросов на преобразование речи в текст."""
         await self.consume_messages(
             rabbitmq_settings.STT_QUEUE,
-            callback
+            callback,
+            prefetch_count=prefetch_count,
+            concurrency=concurrency
         ) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 from .rabbitmq_client import RabbitMQClient
 from .config import rabbitmq_settings
 
@@ -6,6 +6,8 @@ from .config import rabbitmq_settings
 class TTSRabbitMQClient(RabbitMQClient):
     """Клиент RabbitMQ для операций преобразования текста в речь (TTS)."""
     
+    QUEUES = (rabbitmq_settings.TTS_QUEUE,)
+    
     async def publish_tts_request(self, text_data: Any) -> None:
         """Публикация запроса на преобразование текста в речь в очередь TTS."""
         await self.publish_message(
@@ -16,9 +18,38 @@ class TTSRabbitMQClient(RabbitMQClient):
             }
         )
     
-    async def consume_tts_requests(self, callback: Callable[[Any], None]) -> None:
+    async def request_tts(self, text_data: Any) -> Any:
+        """RPC-запрос на преобразование текста в речь с ожиданием ответа воркера."""
+        return await self.call(
+            rabbitmq_settings.TTS_QUEUE,
+            {
+                "type": "tts_request",
+                "data": text_data
+            }
+        )
+    
+    async def submit_tts_request(self, text_data: Any, request_id: str, timeout: float) -> str:
+        """Фоновый запрос на синтез речи, результат сохраняется в Redis под request_id."""
+        return await self.submit(
+            rabbitmq_settings.TTS_QUEUE,
+            {
+                "type": "tts_request",
+                "data": text_data
+            },
+            request_id=request_id,
+            timeout=timeout
+        )
+    
+    async def consume_tts_requests(
+        self,
+        callback: Callable[[Any], Any],
+        prefetch_count: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> None:
         """Начало потребления запросов на преобразование текста в речь."""
         await self.consume_messages(
             rabbitmq_settings.TTS_QUEUE,
-            callback
+            callback,
+            prefetch_count=prefetch_count,
+            concurrency=concurrency
         ) 
\ No newline at end of file
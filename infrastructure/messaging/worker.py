@@ -0,0 +1,72 @@
+"""Отдельный процесс-воркер для одной или нескольких очередей моделей.
+
+Пример запуска:
+    python -m infrastructure.messaging.worker --queue llm_requests --concurrency 2
+"""
+import argparse
+import asyncio
+import logging
+from typing import List, Optional
+from .config import rabbitmq_settings
+from .message_service import MessageService
+from .process_stats import process_stats
+from .queue_processor import ALL_QUEUES, QueueProcessor
+from infrastructure.ml_models.thread_budget import thread_budget
+
+
+logger = logging.getLogger(__name__)
+
+# Модель, обслуживающая каждую очередь
+QUEUE_MODELS = {
+    rabbitmq_settings.STT_QUEUE: "whisper",
+    rabbitmq_settings.TTS_QUEUE: "silero",
+    rabbitmq_settings.LLM_QUEUE: "qwen",
+}
+
+async def run_worker(queues: List[str], concurrency: Optional[int] = None) -> None:
+    """Запуск воркера: загрузка моделей и потребление сообщений из очередей."""
+    for queue in queues:
+        workers = concurrency or rabbitmq_settings.queue_options(queue)["concurrency"]
+        thread_budget.configure(QUEUE_MODELS[queue], workers=workers)
+
+    message_service = MessageService()
+    await message_service.initialize()
+    process_stats.start()
+    try:
+        processor = QueueProcessor(queues=queues, concurrency=concurrency)
+        logger.info(f"Worker started for {', '.join(queues)}")
+        await processor.start_processing()
+    finally:
+        await process_stats.close()
+        await message_service.close()
+        thread_budget.shutdown()
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Model worker consuming RabbitMQ request queues")
+    parser.add_argument(
+        "--queue",
+        action="append",
+        choices=ALL_QUEUES,
+        required=True,
+        help="Queue to consume; may be repeated"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Messages processed in parallel per queue (defaults to queue settings)"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+    )
+
+    try:
+        asyncio.run(run_worker(args.queue, args.concurrency))
+    except KeyboardInterrupt:
+        logger.info("Worker stopped")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
 import logging
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteria, StoppingCriteriaList
 import torch
 import os
+import time
+from typing import Optional
 from core.entities.text import LLMInput, LLMResult
+from infrastructure.ml_models.thread_budget import thread_budget
 
 
 logger = logging.getLogger(__name__)
 
+class DeadlineStoppingCriteria(StoppingCriteria):
+    """Остановка генерации, когда истек срок запроса."""
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return time.time() >= self.deadline
+
 class QwenModel:
     def __init__(self, model_name: str = None):
         self.model_name = model_name or os.getenv("QWEN_MODEL_PATH", "models/qwen")
@@ -63,9 +75,14 @@ class QwenModel:
         self,
         input_data: LLMInput,
         max_length: int = 256,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
     ) -> LLMResult:
         try:
+            generation_kwargs = {}
+            if deadline is not None:
+                generation_kwargs["stopping_criteria"] = StoppingCriteriaList([DeadlineStoppingCriteria(deadline)])
+
             formatted_prompt = self._format_prompt(input_data.prompt)
             
             inputs = self.tokenizer(
@@ -74,14 +91,20 @@ class QwenModel:
                 return_attention_mask=True
             ).to(self.model.device)
 
-            outputs = self.model.generate(
+            outputs = await thread_budget.run(
+                "qwen",
+                self.model.generate,
                 **inputs,
                 max_new_tokens=max_length,
                 temperature=temperature,
                 eos_token_id=self.tokenizer.eos_token_id,
                 pad_token_id=self.tokenizer.pad_token_id,
-                do_sample=True
+                do_sample=True,
+                **generation_kwargs
             )
+
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError("Generation aborted: request deadline exceeded")
             
             full_response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
 
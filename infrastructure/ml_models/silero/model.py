@@ -5,6 +5,7 @@ import logging
 import random
 from pathlib import Path
 from config.silero import SILERO_MODEL_DIR, SILERO_DEVICE
+from infrastructure.ml_models.thread_budget import thread_budget
 
 
 logger = logging.getLogger(__name__)
@@ -39,7 +40,9 @@ class SileroModel:
                 raise ValueError(f"Speaker {speaker} not in {self.speakers}")
 
             # Генерация аудио
-            audio = self.model.apply_tts(
+            audio = await thread_budget.run(
+                "silero",
+                self.model.apply_tts,
                 text=text,
                 speaker=speaker,
                 sample_rate=sample_rate
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from config.threads import CPU_COUNT, MODEL_THREADS
+
+
+logger = logging.getLogger(__name__)
+
+class ThreadBudget:
+    """Распределение потоков CPU между моделями, работающими в одном процессе.
+
+    Каждая модель получает собственный пул воркеров. Число intra-op потоков
+    PyTorch задается один раз в каждом потоке пула при его запуске: в сборках
+    с OpenMP оно действует на поток, поэтому пулы разных моделей не
+    перезаписывают значения друг друга. Бэкенды с общим на процесс пулом
+    (например, нативный пул ATen без OpenMP) используют последнее заданное
+    значение; строгое разделение дают отдельные процессы-воркеры.
+    """
+
+    def __init__(self, allocations: Optional[Dict[str, Dict[str, int]]] = None, cpu_count: int = CPU_COUNT):
+        self.allocations = allocations or MODEL_THREADS
+        self.cpu_count = cpu_count
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._active: Dict[str, int] = {name: 0 for name in self.allocations}
+        self._lock = threading.Lock()
+        self._inter_op_applied = False
+
+    def _get_allocation(self, model_name: str) -> Dict[str, int]:
+        if model_name not in self.allocations:
+            raise ValueError(f"No thread allocation for model {model_name}")
+        return self.allocations[model_name]
+
+    def _get_executor(self, model_name: str) -> ThreadPoolExecutor:
+        with self._lock:
+            executor = self._executors.get(model_name)
+            if executor is None:
+                allocation = self._get_allocation(model_name)
+                executor = ThreadPoolExecutor(
+                    max_workers=allocation["workers"],
+                    thread_name_prefix=f"{model_name}-worker",
+                    initializer=self._init_worker,
+                    initargs=(allocation["intra_op"],)
+                )
+                self._executors[model_name] = executor
+            return executor
+
+    def configure(self, model_name: str, **values: int) -> None:
+        """Изменение распределения для модели до первого вызова инференса."""
+        with self._lock:
+            if model_name in self._executors:
+                raise RuntimeError(f"Executor for {model_name} is already running")
+            self._get_allocation(model_name).update(values)
+
+    def apply_inter_op(self) -> None:
+        """Установка числа inter-op потоков (глобально, один раз на процесс)."""
+        if self._inter_op_applied:
+            return
+        import torch
+        inter_op = max(a["inter_op"] for a in self.allocations.values())
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # PyTorch запрещает менять значение после начала параллельной работы
+            logger.warning(f"Could not set inter-op threads: {e}")
+        self._inter_op_applied = True
+
+    @staticmethod
+    def _init_worker(intra_op: int) -> None:
+        """Число intra-op потоков PyTorch для потока пула (один раз при запуске потока)."""
+        import torch
+        torch.set_num_threads(intra_op)
+
+    def _call(self, model_name: str, func: Callable[..., Any], args, kwargs) -> Any:
+        with self._lock:
+            self._active[model_name] = self._active.get(model_name, 0) + 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active[model_name] -= 1
+
+    async def run(self, model_name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Выполнение инференса в пуле модели с ограничением потоков."""
+        self.apply_inter_op()
+        executor = self._get_executor(model_name)
+        return await asyncio.get_running_loop().run_in_executor(
+            executor,
+            self._call,
+            model_name,
+            func,
+            args,
+            kwargs
+        )
+
+    def allocation(self) -> Dict[str, Any]:
+        """Текущее распределение ядер между моделями."""
+        with self._lock:
+            models = {
+                name: {
+                    "intra_op": a["intra_op"],
+                    "inter_op": a["inter_op"],
+                    "workers": a["workers"],
+                    "reserved_cores": a["intra_op"] * a["workers"],
+                    "active_calls": self._active.get(name, 0),
+                    "busy_cores": a["intra_op"] * self._active.get(name, 0)
+                }
+                for name, a in self.allocations.items()
+            }
+        reserved = sum(m["reserved_cores"] for m in models.values())
+        return {
+            "cpu_count": self.cpu_count,
+            "reserved_cores": reserved,
+            "busy_cores": sum(m["busy_cores"] for m in models.values()),
+            "oversubscribed": reserved > self.cpu_count,
+            "models": models
+        }
+
+    def shutdown(self) -> None:
+        """Остановка пулов воркеров."""
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=False)
+            self._executors.clear()
+
+thread_budget = ThreadBudget()
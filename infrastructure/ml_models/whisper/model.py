@@ -3,7 +3,7 @@ import numpy as np
 from typing import Optional
 from pathlib import Path
 from config.whisper import WHISPER_MODEL, WHISPER_MODEL_DIR, WHISPER_DEVICE
-import asyncio
+from infrastructure.ml_models.thread_budget import thread_budget
 import logging
 
 
@@ -41,9 +41,11 @@ class WhisperModel:
             audio_data = audio_data.reshape(-1) 
             audio_data = audio_data.astype(np.float32)
             
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.model.transcribe(audio_data, language=language)
+            result = await thread_budget.run(
+                "whisper",
+                self.model.transcribe,
+                audio_data,
+                language=language
             )
             
             logger.info("Transcription successful")
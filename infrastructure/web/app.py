@@ -8,9 +8,18 @@ from infrastructure.web.controllers.user_controller import router as user_router
 from infrastructure.web.controllers.qwen_controller import router as qwen_router
 from infrastructure.web.controllers.stt_controller import router as stt_router
 from infrastructure.web.controllers.tts_controller import router as tts_router
+from infrastructure.web.controllers.system_controller import router as system_router
+from infrastructure.web.controllers.voice_controller import router as voice_router
+from infrastructure.web.controllers.job_controller import router as job_router
 from infrastructure.db.init_db import init_db, wait_for_db
 from infrastructure.messaging.message_service import MessageService
 from infrastructure.messaging.queue_processor import QueueProcessor
+from infrastructure.messaging.config import rabbitmq_settings
+from infrastructure.db.credit_ledger import CREDIT_LEDGER, credit_ledger
+from infrastructure.db.analytics_rollup import analytics_rollup
+from infrastructure.messaging.process_stats import process_stats
+from infrastructure.web.principal_cache import principal_cache
+from infrastructure.web.revocation import revocation_list
 import asyncio
 import logging
 
@@ -42,6 +51,9 @@ app.include_router(user_router)
 app.include_router(stt_router)
 app.include_router(tts_router)
 app.include_router(qwen_router)
+app.include_router(system_router)
+app.include_router(voice_router)
+app.include_router(job_router)
 
 @app.on_event("startup")
 async def startup_event():
@@ -56,16 +68,36 @@ async def startup_event():
     else:
         logger.error("Failed to connect to the database. Application may not function correctly.")
 
+    # Журнал кредитов: восстановление балансов в Redis и запуск записи в БД
+    if CREDIT_LEDGER == "redis":
+        try:
+            await credit_ledger.reconcile()
+            credit_ledger.start()
+            logger.info("Credit ledger writer started")
+        except Exception as e:
+            logger.error(f"Failed to start credit ledger: {e}")
+
+    # Периодическое сворачивание статистики в дневные сводки
+    analytics_rollup.start()
+    # Статистика процесса для /api/system
+    process_stats.start()
+
     # Инициализация сервиса сообщений
     try:
         message_service = MessageService()
         await message_service.initialize()
         logger.info("Message service initialized successfully")
+        # Решения о допуске принимает только API, воркеры нагрузку не публикуют
+        process_stats.register("queues", message_service.queue_load)
 
-        # Запуск обработчика очередей
-        queue_processor = QueueProcessor()
-        asyncio.create_task(queue_processor.start_processing())
-        logger.info("Queue processor started")
+        # Запуск встроенного обработчика очередей (если не вынесен во внешние воркеры)
+        worker_queues = [q for q in rabbitmq_settings.WORKER_QUEUES.split(",") if q]
+        if worker_queues:
+            queue_processor = QueueProcessor(queues=worker_queues)
+            asyncio.create_task(queue_processor.start_processing())
+            logger.info(f"Queue processor started for: {', '.join(worker_queues)}")
+        else:
+            logger.info("No in-process queue workers configured")
     except Exception as e:
         logger.error(f"Failed to initialize message service: {e}")
 
@@ -77,6 +109,11 @@ async def shutdown_event():
     try:
         message_service = MessageService()
         await message_service.close()
+        await principal_cache.close()
+        await revocation_list.close()
+        await credit_ledger.close()
+        await analytics_rollup.close()
+        await process_stats.close()
         logger.info("Message service connections closed")
     except Exception as e:
         logger.error(f"Error closing message service connections: {e}")
@@ -3,10 +3,12 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from passlib.context import CryptContext
-from infrastructure.db.db_connection import get_redis_client
-from core.repositories.user_repository_impl import UserRepositoryImpl
+from uuid import uuid4
+from core.repositories.user_repository_impl import AsyncUserRepositoryImpl
 from core.entities.user import User
+from infrastructure.web.principal_cache import principal_cache
+from infrastructure.web.revocation import revocation_list
+from infrastructure.web.password_hasher import password_hasher
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -15,9 +17,9 @@ class AuthService:
     """Сервис аутентификации и авторизации пользователей."""
     
     def __init__(self):
-        self.user_repository = UserRepositoryImpl()  # Репозиторий для работы с пользователями
-        self.redis_client = get_redis_client()  # Клиент Redis для хранения токенов
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")  # Контекст для хеширования паролей
+        self.user_repository = AsyncUserRepositoryImpl()  # Репозиторий для работы с пользователями
+        self.password_hasher = password_hasher  # Хеширование паролей в пуле потоков
+        self.pwd_context = password_hasher.pwd_context  # Контекст для хеширования паролей
         self.SECRET_KEY = "your-secret-key"  # Секретный ключ для JWT (в продакшене использовать безопасный ключ)
         self.ALGORITHM = "HS256"  # Алгоритм шифрования JWT
         self.ACCESS_TOKEN_EXPIRE_MINUTES = 30  # Время жизни токена в минутах
@@ -37,33 +39,30 @@ class AuthService:
             expire = datetime.now(timezone.utc) + expires_delta
         else:
             expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-        to_encode.update({"exp": expire})
+        # jti - идентификатор токена для отзыва, сам токен нигде не хранится
+        to_encode.update({"exp": expire, "jti": uuid4().hex})
         encoded_jwt = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         
-        # Сохраняем токен в Redis для возможности инвалидации
-        self.redis_client.setex(
-            f"token:{encoded_jwt}",
-            int(expires_delta.total_seconds()) if expires_delta else 900,  # 15 минут в секундах
-            str(data.get("user_id", ""))
-        )
-        
         return encoded_jwt
 
-    def register_user(self, name: str, email: str, password: str):
+    async def register_user(self, name: str, email: str, password: str, client_ip: Optional[str] = None):
         """Регистрация нового пользователя."""
-        existing_user = self.user_repository.get_by_email(email)
+        existing_user = await self.user_repository.get_by_email(email)
         if existing_user:
             return None, "Email already registered"
 
+        async with self.password_hasher.limit(ip=client_ip, email=email):
+            password_hash = await self.password_hasher.hash(password)
+
         user = User(
             id=None,  
             name=name,
             email=email,
-            password_hash=self.get_password_hash(password),
+            password_hash=password_hash,
             user_role="user"  
         )
         
-        user = self.user_repository.save(user)
+        user = await self.user_repository.save(user)
         if not user:
             return None, "Failed to create user"
 
@@ -79,13 +78,15 @@ class AuthService:
 
         return {"access_token": access_token, "token_type": "bearer"}, None
 
-    def authenticate_user(self, email: str, password: str):
+    async def authenticate_user(self, email: str, password: str, client_ip: Optional[str] = None):
         """Аутентификация пользователя."""
-        user = self.user_repository.get_by_email(email)
+        user = await self.user_repository.get_by_email(email)
         if not user:
             return None, "User not found"
 
-        if not self.verify_password(password, user.password_hash):
+        async with self.password_hasher.limit(ip=client_ip, email=email):
+            password_ok = await self.password_hasher.verify(password, user.password_hash)
+        if not password_ok:
             return None, "Incorrect password"
 
         # Создаем токен для аутентифицированного пользователя
@@ -100,34 +101,62 @@ class AuthService:
 
         return {"access_token": access_token, "token_type": "bearer"}, None
 
-    def validate_token(self, token: str):
+    async def update_user(self, user: User):
+        """Сохранение профиля и удаление токенов пользователя из кэша всех процессов API."""
+        updated_user = await self.user_repository.save(user)
+        if updated_user:
+            await principal_cache.invalidate_user(updated_user.id)
+        return updated_user
+
+    async def validate_token(self, token: str):
         """Проверка валидности токена."""
+        principal_cache.start()
+        revocation_list.start()
+        cached = principal_cache.get(token)
+        if cached:
+            user, jti = cached
+            if await revocation_list.is_revoked(jti):
+                return None, "Token has been revoked"
+            return user, None
+        generation = principal_cache.generation
+
         try:
             try:
                 payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
             except jwt.ExpiredSignatureError:
-                self.redis_client.delete(f"token:{token}")
                 return None, "Token has expired"
             except jwt.JWTError:
                 return None, "Invalid token"
 
-            # Проверяем наличие токена в Redis
-            if not self.redis_client.exists(f"token:{token}"):
-                return None, "Token has expired"
-
             user_id = payload.get("user_id")
-            if not user_id:
+            jti = payload.get("jti")
+            if not user_id or not jti:
                 return None, "Invalid token payload"
 
-            user = self.user_repository.get_by_id(user_id)
+            # Хранятся только отозванные токены, остальные проверяются по подписи и сроку
+            if await revocation_list.is_revoked(jti):
+                return None, "Token has been revoked"
+
+            user = await self.user_repository.get_by_id(user_id)
             if not user:
                 return None, "User not found"
 
+            principal_cache.put(token, user, payload["exp"], jti, generation)
             return user, None
 
         except Exception:
             return None, "Invalid token"
 
+    async def revoke_token(self, token: str):
+        """Отзыв токена (выход) во всех процессах API до истечения его срока."""
+        try:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        except JWTError:
+            # Недействительный или истекший токен отзывать не нужно
+            return
+        if payload.get("jti"):
+            await revocation_list.revoke(payload["jti"], payload["exp"])
+
     async def get_current_user_id(self, token: str = Depends(oauth2_scheme)) -> int:
         """Получение ID текущего пользователя из токена."""
         credentials_exception = HTTPException(
@@ -152,7 +181,7 @@ async def get_current_user(authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     token = authorization.split(" ")[1]
-    user, error = auth_service.validate_token(token)
+    user, error = await auth_service.validate_token(token)
     
     if error:
         raise HTTPException(status_code=401, detail=error)
@@ -1,16 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from pydantic import BaseModel
 from typing import Optional, Dict, List
 from datetime import datetime
-from core.repositories.request_history_repository_impl import RequestHistoryRepositoryImpl
+from core.repositories.request_history_repository_impl import AsyncRequestHistoryRepositoryImpl
 from infrastructure.web.auth_service import get_current_user
-from infrastructure.db.models import User, RequestHistory, QwenHistory
-from infrastructure.db.db_connection import get_db_session
-from sqlalchemy.orm import joinedload
+from infrastructure.db.models import User
+from infrastructure.db.pagination import CURSOR_HEADER, next_cursor
 
 
 router = APIRouter(prefix="/api", tags=["analytics"])
-request_history_repository = RequestHistoryRepositoryImpl()
+request_history_repository = AsyncRequestHistoryRepositoryImpl()
 
 class UsageStatistics(BaseModel):
     total_requests: int
@@ -56,52 +55,17 @@ async def create_request_history(
 ):
     """Create a new request history entry with optional Qwen history"""
     try:
-        with get_db_session() as session:
-            # Create request history
-            request = RequestHistory(
-                user_id=current_user.id,
-                request_type=request_data.request_type,
-                request_data=request_data.request_data,
-                status=request_data.status,
-                error_message=request_data.error_message,
-                processing_time=request_data.processing_time
-            )
-            session.add(request)
-            session.flush()  # Get the request ID
-
-            # If this is a Qwen request, create Qwen history
-            if qwen_data and request_data.request_type == "Общение с ИИ":
-                qwen_history = QwenHistory(
-                    request_id=request.id,
-                    user_id=current_user.id,
-                    prompt=qwen_data.prompt,
-                    response=qwen_data.response,
-                    tokens_used=qwen_data.tokens_used
-                )
-                session.add(qwen_history)
-
-            session.commit()
-            session.refresh(request)
-
-            # Prepare response
-            response = {
-                "id": request.id,
-                "request_type": request.request_type,
-                "request_data": request.request_data,
-                "status": request.status,
-                "error_message": request.error_message,
-                "processing_time": request.processing_time,
-                "created_at": request.created_at.isoformat()
-            }
-
-            if request.qwen_history:
-                response["qwen_history"] = {
-                    "prompt": request.qwen_history.prompt,
-                    "response": request.qwen_history.response,
-                    "tokens_used": request.qwen_history.tokens_used
-                }
-
-            return response
+        # If this is a Qwen request, save Qwen history with it
+        qwen = qwen_data.model_dump() if qwen_data and request_data.request_type == "Общение с ИИ" else None
+        return await request_history_repository.create_request(
+            user_id=current_user.id,
+            request_type=request_data.request_type,
+            request_data=request_data.request_data,
+            status=request_data.status,
+            error_message=request_data.error_message,
+            processing_time=request_data.processing_time,
+            qwen=qwen
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -109,7 +73,7 @@ async def create_request_history(
 async def get_usage_statistics(current_user: User = Depends(get_current_user)):
     """Get usage statistics for the current user"""
     try:
-        stats = request_history_repository.get_usage_statistics(current_user.id)
+        stats = await request_history_repository.get_usage_statistics(current_user.id)
         return UsageStatistics(**stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -118,58 +82,46 @@ async def get_usage_statistics(current_user: User = Depends(get_current_user)):
 async def get_credit_statistics(current_user: User = Depends(get_current_user)):
     """Get credit statistics for the current user"""
     try:
-        stats = request_history_repository.get_credit_statistics(current_user.id)
+        stats = await request_history_repository.get_credit_statistics(current_user.id)
         return CreditStatistics(**stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/analytics/history", response_model=List[RequestHistoryResponse])
 async def get_request_history(
+    response: Response,
     request_type: Optional[str] = None,
     status: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    """Get request history for the current user with optional filters"""
+    """
+    Get request history for the current user with optional filters.
+
+    Pass the X-Next-Cursor header of a page as `cursor` to get the next page.
+    """
     try:
-        with get_db_session() as session:
-            query = session.query(RequestHistory)\
-                .options(joinedload(RequestHistory.qwen_history))\
-                .filter(RequestHistory.user_id == current_user.id)
-            
-            if request_type:
-                query = query.filter(RequestHistory.request_type == request_type)
-            if status:
-                query = query.filter(RequestHistory.status == status)
-            if start_date:
-                query = query.filter(RequestHistory.created_at >= start_date)
-            if end_date:
-                query = query.filter(RequestHistory.created_at <= end_date)
-            
-            history = query.order_by(RequestHistory.created_at.desc())\
-                .offset(offset)\
-                .limit(limit)\
-                .all()
-            
-            return [
-                {
-                    "id": h.id,
-                    "request_type": h.request_type,
-                    "request_data": h.request_data,
-                    "status": h.status,
-                    "error_message": h.error_message,
-                    "processing_time": h.processing_time,
-                    "created_at": h.created_at.isoformat(),
-                    "qwen_history": {
-                        "prompt": h.qwen_history.prompt,
-                        "response": h.qwen_history.response,
-                        "tokens_used": h.qwen_history.tokens_used
-                    } if h.qwen_history else None
-                }
-                for h in history
-            ]
+        history = await request_history_repository.get_user_history(
+            user_id=current_user.id,
+            limit=limit,
+            offset=offset,
+            request_type=request_type,
+            status=status,
+            start_date=start_date,
+            end_date=end_date,
+            with_qwen=True,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    next_page = next_cursor(history, limit)
+    if next_page:
+        response.headers[CURSOR_HEADER] = next_page
+    return history
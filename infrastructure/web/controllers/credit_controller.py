@@ -1,15 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from pydantic import BaseModel
 from typing import List, Optional
-from core.repositories.credit_repository_impl import CreditRepositoryImpl
+from core.repositories.credit_repository_impl import AsyncCreditRepositoryImpl
 from infrastructure.web.auth_service import get_current_user
 from infrastructure.db.models import User
+from infrastructure.db.pagination import CURSOR_HEADER, next_cursor
 from infrastructure.web.schemas.credit_schema import CreditBalance, CreditTransaction, CreditTransactionCreate, CreditTransactionResponse
 from pydantic import ConfigDict
 
 
 router = APIRouter(prefix="/api", tags=["credits"])
-credit_repository = CreditRepositoryImpl()
+credit_repository = AsyncCreditRepositoryImpl()
 
 class CreditTransactionResponse(BaseModel):
     id: int
@@ -33,25 +34,35 @@ class CreditTransactionResponse(BaseModel):
 @router.get("/credits/balance", response_model=CreditBalance)
 async def get_balance(current_user: User = Depends(get_current_user)):
     """Get current credit balance"""
-    balance = credit_repository.get_user_balance(current_user.id)
+    balance = await credit_repository.get_user_balance(current_user.id)
     return {"balance": balance, "user_id": current_user.id}
 
 @router.get("/credits/history", response_model=List[CreditTransactionResponse])
 async def get_credit_history(
+    response: Response,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    """Get credit transaction history"""
-    history = credit_repository.get_transaction_history(
-        user_id=current_user.id,
-        limit=limit,
-        offset=offset
-    )
-    
-    for transaction in history:
-        transaction["balance"] = credit_repository.get_user_balance(current_user.id)
-    
+    """
+    Get credit transaction history with the balance after each transaction.
+
+    Pass the X-Next-Cursor header of a page as `cursor` to get the next page.
+    """
+    try:
+        history = await credit_repository.get_transaction_history(
+            user_id=current_user.id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    next_page = next_cursor(history, limit)
+    if next_page:
+        response.headers[CURSOR_HEADER] = next_page
     return history
 
 @router.post("/credits/add", response_model=CreditTransactionResponse)
@@ -63,14 +74,14 @@ async def add_credits(
     if transaction.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
 
-    result = credit_repository.create_transaction(
+    result = await credit_repository.create_transaction(
         user_id=current_user.id,
         amount=transaction.amount,
         transaction_type="add",
         description=transaction.description
     )
 
-    balance = credit_repository.get_user_balance(current_user.id)
+    balance = await credit_repository.get_user_balance(current_user.id)
     result["balance"] = balance
     return result
 
@@ -84,26 +95,17 @@ async def deduct_credits(
     if transaction.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
 
-    # Получаем текущий баланс
-    current_balance = credit_repository.get_user_balance(current_user.id)
-    
-    # Проверяем достаточность средств
-    if current_balance < transaction.amount:
+    # Проверка баланса и списание - один атомарный UPDATE, результат содержит новый баланс
+    try:
+        return await credit_repository.deduct_credits(
+            user_id=current_user.id,
+            amount=transaction.amount,
+            transaction_type="deduct",
+            description=transaction.description
+        )
+    except ValueError:
         raise HTTPException(status_code=400, detail="Insufficient credit balance")
 
-    # Создаем транзакцию списания (отрицательная сумма)
-    result = credit_repository.create_transaction(
-        user_id=current_user.id,
-        amount=-transaction.amount,  # Отрицательное значение для списания
-        transaction_type="deduct",
-        description=transaction.description
-    )
-
-    # Получаем обновленный баланс
-    balance = credit_repository.get_user_balance(current_user.id)
-    result["balance"] = balance
-    return result
-
 @router.post("/credits/transactions", response_model=CreditTransaction)
 async def create_transaction(
     transaction: CreditTransactionCreate,
@@ -111,15 +113,7 @@ async def create_transaction(
 ):
     """Create a new credit transaction"""
     try:
-        if transaction.amount < 0:
-            current_balance = credit_repository.get_user_balance(current_user.id)
-            if current_balance + transaction.amount < 0:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Insufficient credit balance"
-                )
-        
-        result = credit_repository.create_transaction(
+        result = await credit_repository.create_transaction(
             user_id=current_user.id,
             amount=transaction.amount,
             transaction_type=transaction.transaction_type,
@@ -127,8 +121,11 @@ async def create_transaction(
         )
         
         return result
-    except HTTPException:
-        raise
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Insufficient credit balance"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -136,7 +133,7 @@ async def create_transaction(
 async def get_credit_balance(current_user: User = Depends(get_current_user)):
     """Get current credit balance"""
     try:
-        balance = credit_repository.get_user_balance(current_user.id)
+        balance = await credit_repository.get_user_balance(current_user.id)
         return {"balance": balance, "user_id": current_user.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
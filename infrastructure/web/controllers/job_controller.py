@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
+from typing import Any, Dict
+from infrastructure.db.models import User
+from infrastructure.messaging.admission import Overloaded
+from infrastructure.messaging.jobs import JOB_DONE, JOB_QUEUED, job_service
+from infrastructure.web.auth_service import auth_service, get_current_user
+import base64
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+MAX_WAIT = 30  # Секунды: предел long-poll, чтобы не упираться в таймауты прокси
+WS_POLL_INTERVAL = 25  # Секунды одного ожидания результата для WebSocket
+
+def job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Состояние задачи для клиента, аудио TTS - в base64"""
+    result = job["result"]
+    if job["kind"] == "tts" and job["status"] == JOB_DONE:
+        audio_data = result["audio_data"]
+        if isinstance(audio_data, bytes):
+            audio_data = base64.b64encode(audio_data).decode("utf-8")
+        result = {**result, "audio_data": audio_data}
+    return {**job, "result": result}
+
+async def owned_job(job_id: str, user: User, wait: float = 0) -> Dict[str, Any]:
+    """Задача текущего пользователя, чужие и неизвестные - 404"""
+    job = await job_service.get(job_id, wait=wait)
+    if job is None or job["user_id"] != user.id:
+        raise HTTPException(404, detail="Job not found")
+    return job
+
+async def create_job(kind: str, data: Dict[str, Any], user: User) -> Dict[str, Any]:
+    try:
+        job = await job_service.create(kind, data, user.id)
+    except Overloaded as e:
+        raise HTTPException(e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error(f"Failed to submit {kind} job: {e}", exc_info=True)
+        raise HTTPException(500, detail="Failed to submit job")
+    logger.info(f"Created {kind} job {job['id']} for user {user.id}")
+    return job_response(job)
+
+@router.post("/stt", status_code=202)
+async def create_stt_job(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Submit an audio file for transcription and return the job ID"""
+    audio = await file.read()
+    return await create_job("stt", {"audio_data": audio}, current_user)
+
+@router.post("/tts", status_code=202)
+async def create_tts_job(
+    text: str = Body(..., embed=True),
+    speaker: str = Body("baya", embed=True),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Submit text for speech synthesis and return the job ID"""
+    return await create_job("tts", {"text": text, "speaker": speaker}, current_user)
+
+@router.post("/llm", status_code=202)
+async def create_llm_job(
+    prompt: str = Body(..., embed=True),
+    max_tokens: int = Body(100, embed=True),
+    temperature: float = Body(0.7, embed=True),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Submit a prompt for generation and return the job ID"""
+    data = {"prompt": prompt, "max_tokens": max_tokens, "temperature": temperature}
+    return await create_job("llm", data, current_user)
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for the result (long-poll)"),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Get job status and result; with wait > 0 the request blocks until the job finishes or wait elapses"""
+    job = await owned_job(job_id, current_user, wait=min(wait, MAX_WAIT))
+    return job_response(job)
+
+@router.get("/{job_id}/audio")
+async def get_job_audio(job_id: str, current_user: User = Depends(get_current_user)) -> Response:
+    """Download the synthesized audio of a finished TTS job as WAV"""
+    job = await owned_job(job_id, current_user)
+    if job["kind"] != "tts":
+        raise HTTPException(400, detail="Job has no audio")
+    if job["status"] != JOB_DONE:
+        raise HTTPException(409, detail=f"Job is {job['status']}")
+
+    audio_data = job["result"]["audio_data"]
+    if isinstance(audio_data, str):
+        audio_data = base64.b64decode(audio_data)
+    return Response(
+        audio_data,
+        media_type="audio/wav",
+        headers={"Sample-Rate": str(job["result"]["sample_rate"])}
+    )
+
+@router.websocket("/{job_id}/ws")
+async def job_ws(websocket: WebSocket, job_id: str, token: str = Query(...)):
+    """Push the job state once it finishes, then close the socket"""
+    user, error = await auth_service.validate_token(token)
+    if error:
+        await websocket.close(code=4401, reason=error)
+        return
+
+    job = await job_service.get(job_id)
+    if job is None or job["user_id"] != user.id:
+        await websocket.close(code=4404, reason="Job not found")
+        return
+
+    await websocket.accept()
+    try:
+        while job["status"] == JOB_QUEUED:
+            job = await job_service.get(job_id, wait=WS_POLL_INTERVAL)
+            if job is None:
+                await websocket.close(code=4404, reason="Job expired")
+                return
+        await websocket.send_json(job_response(job))
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"Job {job_id} WebSocket disconnected")
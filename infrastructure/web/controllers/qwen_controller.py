@@ -1,33 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, List
-from core.use_cases.qwen_use_cases import QwenUseCase
 from core.entities.text import LLMInput, TextInput
 from core.entities.user import User
 from infrastructure.web.auth_service import get_current_user
 from infrastructure.db.models import User as DBUser
-from core.repositories.qwen_repository_impl import QwenRepositoryImpl
-from core.repositories.credit_repository_impl import CreditRepositoryImpl
+from infrastructure.db.pagination import CURSOR_HEADER, next_cursor
+from core.repositories.qwen_repository_impl import AsyncQwenRepositoryImpl
+from core.repositories.credit_repository_impl import AsyncCreditRepositoryImpl
 from infrastructure.web.schemas.qwen_schema import QwenHistory
 from fastapi.responses import JSONResponse
-from infrastructure.ml_models.qwen.model import QwenModel
 from infrastructure.messaging.message_service import MessageService
+from infrastructure.messaging.admission import Overloaded
+from infrastructure.messaging.rabbitmq_client import RpcError
 import logging
 import asyncio
-from uuid import uuid4
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/qwen", tags=["qwen"])
-use_case = QwenUseCase()
-qwen_repo = QwenRepositoryImpl()
-credit_repo = CreditRepositoryImpl()
-model = QwenModel()
+qwen_repo = AsyncQwenRepositoryImpl()
+credit_repo = AsyncCreditRepositoryImpl()
 message_service = MessageService()
 
-# Словарь для хранения результатов обработки
-response_futures = {}
-
 # Models
 class GenerateTextRequest(BaseModel):
     prompt: str = Field(..., min_length=1, description="Prompt cannot be empty")
@@ -50,31 +45,30 @@ class GenerateTextResponse(BaseModel):
 
 @router.get("/history", response_model=List[QwenHistory])
 async def get_history(
+    response: Response,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: DBUser = Depends(get_current_user)
 ):
-    """Get chat history"""
+    """Get chat history; pass the X-Next-Cursor header of a page as `cursor` to get the next page"""
     try:
-        history = qwen_repo.get_history(
+        history = await qwen_repo.get_history(
             user_id=current_user.id,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
-        
-        return [
-            {
-                "id": h.id,
-                "prompt": h.prompt,
-                "response": h.response,
-                "tokens_used": h.tokens_used,
-                "created_at": h.created_at.isoformat()
-            }
-            for h in history
-        ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    next_page = next_cursor(history, limit)
+    if next_page:
+        response.headers[CURSOR_HEADER] = next_page
+    return history
+
 @router.post("/generate")
 async def generate_text(
     request_data: dict  # {"prompt": "текст", "max_tokens": 500, "temperature": 0.7}
@@ -84,31 +78,21 @@ async def generate_text(
         max_tokens = request_data.get("max_tokens", 500)
         temperature = request_data.get("temperature", 0.7)
 
-        # Генерируем уникальный ID для запроса
-        request_id = str(uuid4())
-        
-        # Создаем Future для ожидания результата
-        future = asyncio.Future()
-        response_futures[request_id] = future
-
-        # Публикуем запрос в очередь
-        await message_service.publish_llm_request(
-            prompt=prompt,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            request_id=request_id  # Добавляем ID запроса
-        )
-        logger.info(f"LLM request published to queue: {prompt[:50]}...")
-
-        # Ждем результат
+        # Отправляем RPC-запрос в очередь и ждем ответ воркера
         try:
-            result = await asyncio.wait_for(future, timeout=30.0)  # 30 секунд таймаут
+            result = await message_service.request_llm(
+                prompt=prompt,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
             return JSONResponse(content={"text": result})
+        except Overloaded as e:
+            raise HTTPException(e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
         except asyncio.TimeoutError:
             raise HTTPException(504, detail="Request timeout")
-        finally:
-            # Удаляем Future из словаря
-            response_futures.pop(request_id, None)
+        except RpcError as e:
+            logger.error(f"LLM worker error: {str(e)}")
+            raise HTTPException(500, detail="Internal server error")
             
     except HTTPException as he:
         raise he
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from infrastructure.messaging.process_stats import process_stats, sum_deadline_counters, sum_queue_load
+from infrastructure.messaging.message_service import MessageService
+from infrastructure.messaging.queue_processor import ALL_QUEUES
+from infrastructure.web.auth_service import get_current_user
+from core.entities.user import User
+
+
+router = APIRouter(prefix="/api/system", tags=["system"], dependencies=[Depends(get_current_user)])
+message_service = MessageService()
+
+@router.get("/threads")
+async def get_thread_allocation():
+    """Get CPU core allocation between models for each live API and worker process, keyed by host:pid"""
+    return await process_stats.collect("threads")
+
+@router.get("/queues")
+async def get_queue_load():
+    """Get observed queue depth, in-flight requests and service time estimates, combined over live API processes"""
+    return sum_queue_load(await process_stats.collect("queues"))
+
+@router.get("/deadlines")
+async def get_deadline_counters():
+    """Get counts of expired messages dropped before or aborted during inference, summed over live API and worker processes"""
+    return sum_deadline_counters(await process_stats.collect("deadlines"))
+
+@router.get("/dead-letters/{queue_name}")
+async def get_dead_letters(
+    queue_name: str,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Inspect messages that failed after all retries"""
+    if current_user.user_role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if queue_name not in ALL_QUEUES:
+        raise HTTPException(status_code=404, detail="Unknown queue")
+    return await message_service.peek_dead_letters(queue_name, limit)
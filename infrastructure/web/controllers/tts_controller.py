@@ -1,18 +1,16 @@
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from core.use_cases.tts_use_cases import TextToSpeechUseCase
-from core.entities.text import TextInput
-from infrastructure.ml_models.silero.model import SileroModel
 from infrastructure.messaging.message_service import MessageService
+from infrastructure.messaging.admission import Overloaded
+from infrastructure.messaging.rabbitmq_client import RpcError
 from io import BytesIO
+import asyncio
 import logging
 
 
 router = APIRouter(prefix="/tts", tags=["text-to-speech"])
 logger = logging.getLogger(__name__)
 
-model = SileroModel()
-use_case = TextToSpeechUseCase(model)
 message_service = MessageService()
 
 def is_russian_text(text: str) -> bool:
@@ -39,23 +37,22 @@ async def synthesize_speech(
         if not is_russian_text(text):
             raise HTTPException(400, detail="Поддерживается только русский язык")
 
-        # Публикуем запрос в очередь
-        await message_service.publish_tts_request(text, speaker)
-        logger.info(f"TTS request published to queue: {text[:50]}...")
-
-        # Для обратной совместимости продолжаем синхронную обработку
-        text_input = TextInput(text=text)
-        result = await use_case.synthesize(text_input=text_input, speaker=speaker)
-        
-        if not result.is_success:
-            logger.error(f"TTS failed: {result.error_message}")
-            raise HTTPException(400, detail=result.error_message)
+        # Отправляем текст воркеру TTS и ждем аудио
+        audio_data, sample_rate = await message_service.request_tts(text, speaker)
+        logger.info(f"TTS request processed by worker: {text[:50]}...")
             
         return StreamingResponse(
-            BytesIO(result.data),
+            BytesIO(audio_data),
             media_type="audio/wav",
-            headers={"Sample-Rate": str(result.sample_rate)}
+            headers={"Sample-Rate": str(sample_rate)}
         )
+    except Overloaded as e:
+        raise HTTPException(e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except asyncio.TimeoutError:
+        raise HTTPException(504, detail="Request timeout")
+    except RpcError as e:
+        logger.error(f"TTS failed: {str(e)}")
+        raise HTTPException(400, detail=str(e))
     except HTTPException as he:
         raise he
     except Exception as e:
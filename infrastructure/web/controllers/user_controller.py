@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response
+from typing import List, Optional
 from core.use_cases.user_use_cases import UserUseCases
-from core.repositories.user_repository_impl import UserRepositoryImpl
-from core.repositories.request_history_repository_impl import RequestHistoryRepositoryImpl
+from core.repositories.user_repository_impl import AsyncUserRepositoryImpl, UserRepositoryImpl
+from core.repositories.request_history_repository_impl import AsyncRequestHistoryRepositoryImpl
+from infrastructure.db.pagination import CURSOR_HEADER, next_cursor
 from infrastructure.web.auth_service import AuthService
+from infrastructure.web.principal_cache import publish_user_changed
+from infrastructure.web.password_hasher import TooManyAttempts
 from core.entities.user import User
 from infrastructure.web.schemas.user_schema import (
     UserRegistration,
@@ -13,15 +16,17 @@ from infrastructure.web.schemas.user_schema import (
     QuotaResponse,
     RequestHistoryResponse
 )
-from core.repositories.credit_repository_impl import CreditRepositoryImpl
+from core.repositories.credit_repository_impl import AsyncCreditRepositoryImpl
+import asyncio
 
 
 router = APIRouter(prefix="/api", tags=["users"])
-user_repository = UserRepositoryImpl()
-request_history_repository = RequestHistoryRepositoryImpl()
-user_use_cases = UserUseCases(user_repository)
+user_repository = AsyncUserRepositoryImpl()
+request_history_repository = AsyncRequestHistoryRepositoryImpl()
+# Синхронные сценарии выполняются в пуле потоков FastAPI (обработчики def)
+user_use_cases = UserUseCases(UserRepositoryImpl(), on_user_changed=publish_user_changed)
 auth_service = AuthService()
-credit_repository = CreditRepositoryImpl()
+credit_repository = AsyncCreditRepositoryImpl()
 
 
 # Authentication dependency
@@ -30,7 +35,7 @@ async def get_current_user(authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     token = authorization.split(" ")[1]
-    user, error = auth_service.validate_token(token)
+    user, error = await auth_service.validate_token(token)
     
     if error:
         raise HTTPException(status_code=401, detail=error)
@@ -39,25 +44,26 @@ async def get_current_user(authorization: str = Header(None)):
 
 # Authentication Routes
 @router.post("/register", response_model=TokenResponse)
-async def register(user_data: UserRegistration):
+async def register(user_data: UserRegistration, request: Request):
     """Register a new user with authentication, quotas and initial credits"""
     try:
-        token_data, error = auth_service.register_user(
+        token_data, error = await auth_service.register_user(
             name=user_data.name,
             email=user_data.email,
-            password=user_data.password
+            password=user_data.password,
+            client_ip=request.client.host if request.client else None
         )
         
         if error:
             raise HTTPException(status_code=400, detail=error)
 
-        user = user_repository.get_by_email(user_data.email)
+        user = await user_repository.get_by_email(user_data.email)
         if not user:
             raise HTTPException(status_code=500, detail="User creation failed")
 
-        user_use_cases.register_user(user.name, user.email)
+        await asyncio.to_thread(user_use_cases.register_user, user.name, user.email)
         
-        success, result = credit_repository.add_credits(
+        success, result = await credit_repository.add_credits(
             user_id=user.id,
             amount=100,
             transaction_type="initial",
@@ -71,24 +77,38 @@ async def register(user_data: UserRegistration):
         
     except HTTPException as e:
         raise
+    except TooManyAttempts:
+        raise HTTPException(status_code=429, detail="Too many attempts", headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/login", response_model=TokenResponse)
-async def login(user_data: UserLogin):
+async def login(user_data: UserLogin, request: Request):
     """
     Authenticate a user and return access token.
     """
-    token_data, error = auth_service.authenticate_user(
-        email=user_data.email,
-        password=user_data.password
-    )
+    try:
+        token_data, error = await auth_service.authenticate_user(
+            email=user_data.email,
+            password=user_data.password,
+            client_ip=request.client.host if request.client else None
+        )
+    except TooManyAttempts:
+        raise HTTPException(status_code=429, detail="Too many attempts", headers={"Retry-After": "1"})
     
     if error:
         raise HTTPException(status_code=401, detail=error)
     
     return token_data
 
+@router.post("/logout")
+async def logout(authorization: str = Header(None), current_user: User = Depends(get_current_user)):
+    """
+    Revoke the current access token.
+    """
+    await auth_service.revoke_token(authorization.split(" ")[1])
+    return {"status": "ok"}
+
 @router.get("/users/me", response_model=UserResponse)
 async def get_current_user_profile(current_user: User = Depends(get_current_user)):
     """
@@ -134,13 +154,29 @@ def get_user_quota(user_id: int, resource_type: str):
     return quota_data
 
 @router.get("/users/{user_id}/history", response_model=List[RequestHistoryResponse])
-def get_user_history(user_id: int, limit: int = 10, offset: int = 0):
+async def get_user_history(
+    user_id: int,
+    response: Response,
+    limit: int = 10,
+    offset: int = 0,
+    cursor: Optional[str] = None
+):
     """
     Get a user's request history.
+
+    Pass the X-Next-Cursor header of a page as `cursor` to get the next page.
     """
-    history = request_history_repository.get_user_history(
-        user_id=user_id,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        history = await request_history_repository.get_user_history(
+            user_id=user_id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    next_page = next_cursor(history, limit)
+    if next_page:
+        response.headers[CURSOR_HEADER] = next_page
     return history
@@ -0,0 +1,156 @@
+from fastapi import APIRouter, Depends, File, Form, Query, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, Optional
+from core.entities.user import User
+from core.repositories.credit_repository_impl import AsyncCreditRepositoryImpl
+from core.repositories.request_history_repository_impl import AsyncRequestHistoryRepositoryImpl
+from infrastructure.messaging.admission import Overloaded
+from infrastructure.messaging.message_service import MessageService
+from infrastructure.messaging.rabbitmq_client import RpcError
+from infrastructure.web.auth_service import auth_service, get_current_user
+import asyncio
+import base64
+import json
+import logging
+import re
+import time
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/voice", tags=["voice"])
+credit_repo = AsyncCreditRepositoryImpl()
+history_repo = AsyncRequestHistoryRepositoryImpl()
+message_service = MessageService()
+
+CHAT_REQUEST_TYPE = "Общение с ИИ"  # Тип запроса в истории, как у сценария расширения
+MAX_PROMPT_LENGTH = 1000
+MAX_REPLY_TOKENS = 256
+
+# Сценарии расширения, выполняемые в браузере (browser-extension/popup/core/scenarios),
+# в порядке CommandRouter; шаблоны должны совпадать с match() сценариев
+BROWSER_COMMANDS = [
+    ("Прокрутка страницы", re.compile(r"прокрути|прокрутка|скролл|листай", re.IGNORECASE)),
+    ("Поиск на странице", re.compile(r"найди|найти|ищи|покажи", re.IGNORECASE)),
+    ("Новая вкладка", re.compile(r"(создай|открой)\s*(новую)?\s*вкладку", re.IGNORECASE)),
+]
+# LLMChatScenario не берет текст с этими словами, даже если другой сценарий его не принял
+NOT_CHAT = re.compile(r"прокрути|скролл|найди|поиск|сохрани|закрой", re.IGNORECASE)
+
+def classify_command(text: str) -> Optional[str]:
+    """Сценарий для распознанного текста, как CommandRouter.match в расширении (None - не найден)"""
+    for name, pattern in BROWSER_COMMANDS:
+        if pattern.search(text):
+            return name
+    return None if NOT_CHAT.search(text) else CHAT_REQUEST_TYPE
+
+def sanitize_reply(text: str) -> str:
+    """Очистка ответа модели перед синтезом речи (как в сценарии расширения)"""
+    text = re.sub(r"[^\wа-яё\s,.!?-]", "", text, flags=re.IGNORECASE)
+    return re.sub(r"\s+", " ", text).strip()[:500]
+
+async def save_turn(user_id: int, transcript: str, reply: str, status: str, error: str, processing_time: int) -> None:
+    """Запись голосового запроса в историю пользователя"""
+    await history_repo.create_request(
+        user_id=user_id,
+        request_type=CHAT_REQUEST_TYPE,
+        request_data=transcript,
+        status=status,
+        error_message=error,
+        processing_time=processing_time,
+        qwen={"prompt": transcript, "response": reply, "tokens_used": 0} if status == "success" else None
+    )
+
+async def voice_turn(audio: bytes, user: User, speaker: str) -> AsyncIterator[Dict[str, Any]]:
+    """Голосовой запрос целиком: STT -> LLM -> TTS.
+
+    Промежуточные результаты передаются в памяти, события отдаются по мере
+    готовности. Если распознана команда браузера, LLM и TTS не вызываются:
+    клиент получает событие command и выполняет сценарий сам (и сам пишет его
+    в историю).
+    """
+    started = time.monotonic()
+    transcript, reply, stage, scenario = "", "", "stt", None
+    status, error = "success", None
+    try:
+        transcript = await message_service.request_stt(audio)
+        yield {"type": "transcript", "text": transcript}
+
+        scenario = classify_command(transcript)
+        if scenario != CHAT_REQUEST_TYPE:
+            yield {"type": "command", "scenario": scenario, "text": transcript}
+        else:
+            stage = "llm"
+            reply = await message_service.request_llm(
+                prompt=transcript[:MAX_PROMPT_LENGTH],
+                max_tokens=MAX_REPLY_TOKENS,
+                temperature=0.7
+            )
+            reply = sanitize_reply(reply)
+            yield {"type": "reply", "text": reply}
+
+            stage = "tts"
+            audio_data, sample_rate = await message_service.request_tts(reply, speaker)
+            yield {"type": "audio", "audio_data": audio_data, "sample_rate": sample_rate}
+    except (Overloaded, asyncio.TimeoutError, RpcError) as e:
+        detail = str(e) or "Request timeout"
+        status, error = "error", f"{stage}: {detail}"
+        logger.error(f"Voice turn failed at {stage}: {detail}")
+        yield {"type": "error", "stage": stage, "detail": detail}
+    except Exception as e:
+        status, error = "error", f"{stage}: {e}"
+        logger.error(f"Voice turn failed at {stage}: {e}")
+        yield {"type": "error", "stage": stage, "detail": "Internal server error"}
+
+    processing_time = int((time.monotonic() - started) * 1000)
+    if transcript and scenario == CHAT_REQUEST_TYPE:
+        try:
+            await save_turn(user.id, transcript, reply, status, error, processing_time)
+        except Exception as e:
+            logger.error(f"Failed to save voice turn: {e}")
+    yield {
+        "type": "done",
+        "processing_time": processing_time,
+        "balance": await credit_repo.get_user_balance(user.id)
+    }
+
+async def ndjson_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """События построчно в JSON, аудио - в base64"""
+    async for event in events:
+        if event["type"] == "audio":
+            event = {**event, "audio_data": base64.b64encode(event["audio_data"]).decode("utf-8")}
+        yield (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+@router.post("/turn")
+async def voice_turn_http(
+    file: UploadFile = File(...),
+    speaker: str = Form("baya"),
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """Run STT -> LLM -> TTS in one request, streaming NDJSON events as they are ready"""
+    audio = await file.read()
+    return StreamingResponse(
+        ndjson_events(voice_turn(audio, current_user, speaker)),
+        media_type="application/x-ndjson"
+    )
+
+@router.websocket("/ws")
+async def voice_turn_ws(websocket: WebSocket, token: str = Query(...), speaker: str = Query("baya")):
+    """Voice turns over WebSocket: binary audio in, JSON events and binary audio out"""
+    user, error = await auth_service.validate_token(token)
+    if error:
+        await websocket.close(code=4401, reason=error)
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            audio = await websocket.receive_bytes()
+            async for event in voice_turn(audio, user, speaker):
+                if event["type"] == "audio":
+                    await websocket.send_json({"type": "audio", "sample_rate": event["sample_rate"]})
+                    await websocket.send_bytes(event["audio_data"])
+                else:
+                    await websocket.send_json(event)
+    except WebSocketDisconnect:
+        logger.info("Voice WebSocket disconnected")
@@ -0,0 +1,81 @@
+import asyncio
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from passlib.context import CryptContext
+
+
+# bcrypt освобождает GIL на время хеширования, поэтому достаточно пула потоков
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+# Одновременных проверок пароля на один IP и на один email
+PASSWORD_ATTEMPTS_PER_IP = int(os.getenv('PASSWORD_ATTEMPTS_PER_IP', '4'))
+PASSWORD_ATTEMPTS_PER_EMAIL = int(os.getenv('PASSWORD_ATTEMPTS_PER_EMAIL', '1'))
+
+class TooManyAttempts(Exception):
+    """Превышено число одновременных проверок пароля для IP или email."""
+
+    def __init__(self, key: str):
+        super().__init__(f"Too many concurrent attempts for {key}")
+        self.key = key
+
+class PasswordHasher:
+    """Хеширование и проверка паролей вне цикла событий.
+
+    Вызовы bcrypt выполняются в ограниченном пуле потоков, поэтому всплеск
+    входов не задерживает остальные запросы. Число одновременных проверок
+    на один IP и один email ограничено: лишние попытки отклоняются сразу,
+    а не занимают очередь пула.
+    """
+
+    def __init__(
+        self,
+        pwd_context: CryptContext,
+        workers: int = PASSWORD_HASH_WORKERS,
+        per_ip: int = PASSWORD_ATTEMPTS_PER_IP,
+        per_email: int = PASSWORD_ATTEMPTS_PER_EMAIL
+    ):
+        self.pwd_context = pwd_context
+        self.workers = workers
+        self.limits = {"ip": per_ip, "email": per_email}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._active: Dict[str, int] = defaultdict(int)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.pwd_context.verify, password, hashed_password)
+
+    @asynccontextmanager
+    async def limit(self, ip: Optional[str] = None, email: Optional[str] = None):
+        """Ограничение одновременных попыток для IP и email на время блока."""
+        keys = [f"{kind}:{value}" for kind, value in (("ip", ip), ("email", email and email.lower())) if value]
+        for key in keys:
+            if self._active[key] >= self.limits[key.split(":", 1)[0]]:
+                raise TooManyAttempts(key)
+        for key in keys:
+            self._active[key] += 1
+        try:
+            yield
+        finally:
+            for key in keys:
+                self._active[key] -= 1
+                if not self._active[key]:
+                    del self._active[key]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+password_hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], deprecated="auto"))
@@ -0,0 +1,115 @@
+"""Кэш проверенных токенов в памяти процесса API.
+
+Повторный запрос с тем же токеном не обращается ни к Redis, ни к PostgreSQL.
+Запись живет не дольше PRINCIPAL_CACHE_TTL секунд и срока действия токена.
+Изменение пользователя публикуется в канал Redis, каждый процесс удаляет
+его записи. Пока подписка на канал не активна, кэш не используется: иначе
+процесс пропустил бы инвалидацию. Отзыв токена проверяется отдельно
+по списку отозванных jti (revocation.py).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from cachetools import TLRUCache
+
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_TTL = float(os.getenv('PRINCIPAL_CACHE_TTL', '60'))
+
+INVALIDATION_CHANNEL = "auth:invalidate"
+
+class PrincipalCache:
+    """Ограниченный TTL/LRU-кэш токен -> пользователь с инвалидацией через pub/sub."""
+
+    RECONNECT_DELAY = 1.0  # Секунды между попытками восстановить подписку
+
+    def __init__(self, client=None, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self._client = client
+        self.ttl = ttl
+        self._cache = TLRUCache(maxsize=maxsize, ttu=self._ttu, timer=time.time)
+        # Счетчик инвалидаций: запись, прочитанная до инвалидации, в кэш не попадает
+        self.generation = 0
+        self.subscribed = False
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from infrastructure.db.db_connection import get_async_redis_client
+            self._client = get_async_redis_client()
+        return self._client
+
+    def _ttu(self, token: str, entry, now: float) -> float:
+        _, expires_at, _ = entry
+        return min(now + self.ttl, expires_at)
+
+    def start(self) -> None:
+        """Запуск подписки на инвалидации (без ожидания), если она еще не запущена."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    def get(self, token: str) -> Optional[Tuple[Any, str]]:
+        """Пользователь и jti токена или None, если записи нет или кэш отключен."""
+        if not self.subscribed:
+            return None
+        entry = self._cache.get(token)
+        return (entry[0], entry[2]) if entry else None
+
+    def put(self, token: str, user, expires_at: float, jti: str, generation: int) -> None:
+        """Сохранение пользователя, проверенного при значении generation счетчика."""
+        if self.subscribed and generation == self.generation:
+            self._cache[token] = (user, expires_at, jti)
+
+    async def invalidate_user(self, user_id: int) -> None:
+        """Удаление всех токенов пользователя из кэша всех процессов (изменение профиля)."""
+        self._apply({"user_id": user_id})
+        await self.client.publish(INVALIDATION_CHANNEL, json.dumps({"user_id": user_id}))
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        self.generation += 1
+        for token, (user, _, _) in list(self._cache.items()):
+            if user.id == event["user_id"]:
+                self._cache.pop(token, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._cache.clear()
+
+    async def _listen(self) -> None:
+        """Подписка процесса на канал инвалидаций."""
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.subscribed = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._apply(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Auth invalidation subscription lost: {e}, reconnecting")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            finally:
+                # Инвалидации, пропущенные без подписки, не должны оставить устаревших записей
+                self.subscribed = False
+                self.clear()
+                await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+def publish_user_changed(user_id: int) -> None:
+    """Инвалидация пользователя из синхронного кода (UserUseCases, сценарии)."""
+    from infrastructure.db.db_connection import get_redis_client
+    get_redis_client().publish(INVALIDATION_CHANNEL, json.dumps({"user_id": user_id}))
+
+principal_cache = PrincipalCache()
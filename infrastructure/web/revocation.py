@@ -0,0 +1,108 @@
+"""Список отозванных токенов.
+
+Токены проверяются без обращения к хранилищу: подпись и срок действия
+содержатся в самом JWT. В Redis хранятся только идентификаторы (jti)
+отозванных токенов, ключ revoked:<jti> живет до истечения срока токена.
+Каждый процесс API держит копию списка в памяти: загружает ее при подписке
+на канал отзывов и пополняет по сообщениям из канала. Пока подписка не
+активна, отзыв проверяется запросом к Redis.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "auth:revoked"
+KEY_PREFIX = "revoked:"
+
+class RevocationList:
+    """Отозванные jti с синхронизацией между процессами через pub/sub."""
+
+    RECONNECT_DELAY = 1.0  # Секунды между попытками восстановить подписку
+
+    def __init__(self, client=None):
+        self._client = client
+        self._revoked: Dict[str, float] = {}  # jti -> срок действия токена
+        self.synced = False
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from infrastructure.db.db_connection import get_async_redis_client
+            self._client = get_async_redis_client()
+        return self._client
+
+    def start(self) -> None:
+        """Запуск синхронизации (без ожидания), если она еще не запущена."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def is_revoked(self, jti: str) -> bool:
+        if self.synced:
+            return jti in self._revoked
+        return bool(await self.client.exists(f"{KEY_PREFIX}{jti}"))
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """Отзыв токена до истечения его срока во всех процессах API."""
+        if expires_at <= time.time():
+            return
+        self._add(jti, expires_at)
+        await self.client.set(f"{KEY_PREFIX}{jti}", int(expires_at), exat=int(expires_at) + 1)
+        await self.client.publish(REVOCATION_CHANNEL, json.dumps({"jti": jti, "exp": expires_at}))
+
+    def _add(self, jti: str, expires_at: float) -> None:
+        self._revoked[jti] = expires_at
+        self._prune()
+
+    def _prune(self) -> None:
+        """Истекшие токены отклоняются по сроку действия, хранить их не нужно."""
+        now = time.time()
+        expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+        for jti in expired:
+            del self._revoked[jti]
+
+    async def _load(self) -> None:
+        """Загрузка отзывов, опубликованных до подписки."""
+        revoked = {}
+        async for key in self.client.scan_iter(match=f"{KEY_PREFIX}*", count=500):
+            expires_at = await self.client.get(key)
+            if expires_at is not None:
+                key = key.decode() if isinstance(key, bytes) else key
+                revoked[key[len(KEY_PREFIX):]] = float(expires_at)
+        self._revoked.update(revoked)
+        self._prune()
+
+    async def _listen(self) -> None:
+        """Подписка процесса на канал отзывов."""
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                # Загрузка после подписки: отзыв не потеряется между ними
+                await self._load()
+                self.synced = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        event = json.loads(message["data"])
+                        self._add(event["jti"], event["exp"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Revocation subscription lost: {e}, reconnecting")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            finally:
+                self.synced = False
+                await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+revocation_list = RevocationList()
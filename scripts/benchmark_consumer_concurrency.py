@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmark_thread_budget import WORKLOADS, make_inference
+from infrastructure.messaging.codecs import MSGPACK_CONTENT_TYPE, MsgpackCodec
+from infrastructure.messaging.rabbitmq_client import ACK_AFTER, RabbitMQClient
+from infrastructure.ml_models.thread_budget import ThreadBudget
+
+
+class FakeMessage:
+    """Сообщение без брокера: поддерживает process/ack/reject как IncomingMessage"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.headers = {}
+        self.content_type = MSGPACK_CONTENT_TYPE
+        self.reply_to = None
+        self.correlation_id = None
+        self.redelivered = False
+        self.processed = False
+
+    def process(self, ignore_processed=False):
+        message = self
+
+        class _Context:
+            async def __aenter__(self):
+                return message
+
+            async def __aexit__(self, *exc):
+                if not message.processed:
+                    await message.ack()
+
+        return _Context()
+
+    async def ack(self):
+        self.processed = True
+
+    async def reject(self, requeue=False):
+        self.processed = True
+
+async def measure(model_name: str, concurrency: int, messages: int, cpu_count: int) -> float:
+    """Пропускная способность одной очереди при заданной конкурентности"""
+    workload = WORKLOADS[model_name]
+    inference = make_inference(workload["size"], workload["steps"])
+    budget = ThreadBudget(
+        allocations={model_name: {
+            "intra_op": max(1, cpu_count // concurrency),
+            "inter_op": 1,
+            "workers": concurrency
+        }},
+        cpu_count=cpu_count
+    )
+
+    async def callback(data):
+        return await budget.run(model_name, inference)
+
+    client = RabbitMQClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    body, _ = MsgpackCodec().encode({"type": f"{model_name}_request", "data": {}})
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client._dispatch(FakeMessage(body), f"{model_name}_requests", callback, semaphore, ACK_AFTER)
+        for _ in range(messages)
+    ])
+    elapsed = time.perf_counter() - start
+    budget.shutdown()
+    return messages / elapsed
+
+async def main(messages: int, levels, cpu_count: int):
+    for model_name in WORKLOADS:
+        print(f"{model_name}:")
+        baseline = None
+        for concurrency in levels:
+            throughput = await measure(model_name, concurrency, messages, cpu_count)
+            baseline = baseline or throughput
+            print(f"  concurrency={concurrency:<3} {throughput:8.2f} msg/s  ({throughput / baseline:.2f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consumer throughput vs concurrency for each model queue")
+    parser.add_argument("--messages", type=int, default=24)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--cpu", type=int, default=os.cpu_count() or 1, help="Cores shared by the workers")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.messages, args.levels, args.cpu))
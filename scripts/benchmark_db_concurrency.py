@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+def make_queries(simulate: bool, query_time: float):
+    """Запрос к БД в синхронном и асинхронном вариантах.
+
+    В режиме simulate задержка БД имитируется sleep, иначе выполняется
+    SELECT pg_sleep через движки из db_connection (нужен запущенный PostgreSQL).
+    """
+    if simulate:
+        def sync_query():
+            time.sleep(query_time)
+
+        async def async_query():
+            await asyncio.sleep(query_time)
+
+        return sync_query, async_query, None
+
+    from sqlalchemy import text
+    from infrastructure.db.db_connection import async_engine, get_async_db_session, get_db_session
+
+    statement = text("SELECT pg_sleep(:seconds)")
+
+    def sync_query():
+        with get_db_session() as session:
+            session.execute(statement, {"seconds": query_time})
+
+    async def async_query():
+        async with get_async_db_session() as session:
+            await session.execute(statement, {"seconds": query_time})
+
+    return sync_query, async_query, async_engine.dispose
+
+async def run_mixed_load(db_call, requests: int, concurrency: int, db_share: float):
+    """Смешанная нагрузка: доля db_share запросов обращается к БД, остальные отвечают сразу.
+
+    Возвращает задержки (секунды) для запросов к БД и для быстрых запросов.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    db_latencies, fast_latencies = [], []
+    db_every = max(1, round(1 / db_share)) if db_share > 0 else 0
+
+    async def handler(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            if db_every and index % db_every == 0:
+                await db_call()
+                db_latencies.append(time.perf_counter() - started)
+            else:
+                # Обработчик без БД (например, /api/system/threads) тоже ждет цикл событий
+                await asyncio.sleep(0)
+                fast_latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*[handler(i) for i in range(requests)])
+    return db_latencies, fast_latencies
+
+async def main(args):
+    sync_query, async_query, dispose = make_queries(args.simulate, args.query_ms / 1000)
+
+    async def blocking_call():
+        # Так работали обработчики: синхронная сессия прямо в async def
+        sync_query()
+
+    modes = {"sync session": blocking_call, "async session": async_query}
+    print(f"{args.requests} requests, concurrency={args.concurrency}, "
+          f"db share={args.db_share:.0%}, query={args.query_ms} ms")
+    for name, call in modes.items():
+        started = time.perf_counter()
+        db_latencies, fast_latencies = await run_mixed_load(call, args.requests, args.concurrency, args.db_share)
+        elapsed = time.perf_counter() - started
+        all_latencies = db_latencies + fast_latencies
+        print(f"  {name:<14} p50={statistics.median(all_latencies) * 1000:8.1f} ms  "
+              f"p99={percentile(all_latencies, 0.99) * 1000:8.1f} ms  "
+              f"fast p99={percentile(fast_latencies, 0.99) * 1000:8.1f} ms  "
+              f"{args.requests / elapsed:8.1f} req/s")
+
+    if dispose:
+        await dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Request latency under mixed load: sync vs async DB sessions")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-share", type=float, default=0.5, help="Fraction of requests that query the database")
+    parser.add_argument("--query-ms", type=float, default=5)
+    parser.add_argument("--simulate", action="store_true", help="Simulate DB latency instead of querying PostgreSQL")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
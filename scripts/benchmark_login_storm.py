@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from passlib.context import CryptContext
+from infrastructure.web.password_hasher import PasswordHasher
+
+
+async def measure_lag(interval: float, samples: list, stop: asyncio.Event) -> None:
+    """Задержка цикла событий: насколько позже запланированного просыпается таймер"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+async def login_storm(verify, logins: int, hashed: str) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*[verify("password", hashed) for _ in range(logins)])
+    return time.perf_counter() - started
+
+async def main(logins: int, workers: int, rounds: int, interval: float):
+    pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hashed = pwd_context.hash("password")
+    hasher = PasswordHasher(pwd_context, workers=workers)
+
+    async def inline_verify(password, hashed_password):
+        # Так работал login: bcrypt прямо в цикле событий
+        return pwd_context.verify(password, hashed_password)
+
+    modes = {"inline": inline_verify, f"pool({workers})": hasher.verify}
+    print(f"{logins} concurrent logins, bcrypt rounds={rounds}, lag probe every {interval * 1000:.0f} ms")
+    for name, verify in modes.items():
+        samples, stop = [], asyncio.Event()
+        probe = asyncio.create_task(measure_lag(interval, samples, stop))
+        await asyncio.sleep(interval * 2)
+        elapsed = await login_storm(verify, logins, hashed)
+        stop.set()
+        await probe
+
+        samples.sort()
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"  {name:<10} storm {elapsed * 1000:8.1f} ms  "
+              f"lag p50={statistics.median(samples) * 1000:7.1f} ms  "
+              f"p99={p99 * 1000:7.1f} ms  max={samples[-1] * 1000:7.1f} ms")
+
+    hasher.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event-loop lag during a login storm: inline bcrypt vs worker pool")
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor (passlib default is 12)")
+    parser.add_argument("--interval", type=float, default=0.005)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.logins, args.workers, args.rounds, args.interval))
@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import aio_pika
+from infrastructure.messaging import rabbitmq_client
+from infrastructure.messaging.rabbitmq_client import RabbitMQClient
+
+
+class FakeBroker:
+    """Локальная замена брокера: каждая операция стоит один сетевой round trip"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.round_trips = 0
+
+    async def round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+
+class FakeExchange:
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+
+    async def publish(self, message, routing_key):
+        await self.broker.round_trip()
+
+
+class FakeQueue:
+    def __init__(self, broker: FakeBroker, name: str):
+        self.broker = broker
+        self.name = name
+
+    async def bind(self, exchange, routing_key):
+        await self.broker.round_trip()
+
+
+class FakeChannel:
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+
+    async def declare_exchange(self, name, type):
+        await self.broker.round_trip()
+        return FakeExchange(self.broker)
+
+    async def declare_queue(self, name, durable=False):
+        await self.broker.round_trip()
+        return FakeQueue(self.broker, name)
+
+    async def get_exchange(self, name, ensure=True):
+        if ensure:
+            await self.broker.round_trip()
+        return FakeExchange(self.broker)
+
+
+class FakeConnectionManager:
+    """Пул издателя из одного канала поверх локального брокера"""
+
+    def __init__(self, channel: FakeChannel):
+        self.channel = channel
+
+    @asynccontextmanager
+    async def publish_channel(self):
+        yield self.channel
+
+
+async def publish_uncached(channel, exchange, queue_name: str, message):
+    """Прежнее поведение: объявление и привязка очереди перед каждой публикацией"""
+    queue = await channel.declare_queue(queue_name, durable=True)
+    await queue.bind(exchange, queue_name)
+    await exchange.publish(
+        aio_pika.Message(
+            body=json.dumps(message).encode(),
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+        ),
+        routing_key=queue_name
+    )
+
+async def run(messages: int, latency: float):
+    message = {"type": "llm_request", "data": {"prompt": "Привет", "max_tokens": 256}}
+
+    broker = FakeBroker(latency)
+    channel = FakeChannel(broker)
+    exchange = await channel.declare_exchange("main_exchange", None)
+    broker.round_trips = 0
+    start = time.perf_counter()
+    for _ in range(messages):
+        await publish_uncached(channel, exchange, "llm_requests", message)
+    before = time.perf_counter() - start
+    before_trips = broker.round_trips
+
+    broker = FakeBroker(latency)
+    client = RabbitMQClient()
+    client.connection = object()
+    client.channel = FakeChannel(broker)
+    client.exchange = await client.channel.declare_exchange("main_exchange", None)
+    rabbitmq_client.connection_manager = FakeConnectionManager(client.channel)
+    broker.round_trips = 0
+    start = time.perf_counter()
+    for _ in range(messages):
+        await client.publish_message("llm_requests", message)
+    after = time.perf_counter() - start
+    after_trips = broker.round_trips
+
+    print(f"Messages: {messages}, simulated round trip: {latency * 1000:.1f} ms")
+    print(f"Before (declare+bind per publish): {messages / before:.0f} msg/s, "
+          f"{before_trips / messages:.2f} round trips/msg")
+    print(f"After (cached topology): {messages / after:.0f} msg/s, "
+          f"{after_trips / messages:.2f} round trips/msg")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RabbitMQ publish throughput benchmark against an in-memory broker")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=0.5, help="Simulated broker round trip")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.messages, args.latency_ms / 1000))
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+import torch
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from infrastructure.ml_models.thread_budget import ThreadBudget
+
+
+# Синтетическая нагрузка, примерно повторяющая профиль моделей
+WORKLOADS = {
+    "whisper": {"size": 768, "steps": 12},
+    "qwen": {"size": 1024, "steps": 16},
+    "silero": {"size": 512, "steps": 8},
+}
+
+def make_inference(size: int, steps: int):
+    """Создание функции, имитирующей один вызов инференса"""
+    weights = torch.randn(size, size)
+
+    def inference():
+        x = torch.randn(64, size)
+        for _ in range(steps):
+            x = torch.tanh(x @ weights)
+        return x.sum().item()
+
+    return inference
+
+async def run_mixed(submit, inferences, requests_per_model: int) -> float:
+    """Одновременный запуск запросов ко всем моделям, возвращает число запросов в секунду"""
+    tasks = []
+    start = time.perf_counter()
+    for _ in range(requests_per_model):
+        for name, inference in inferences.items():
+            tasks.append(submit(name, inference))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    return len(tasks) / elapsed
+
+async def main(requests_per_model: int, executor_threads: int):
+    inferences = {
+        name: make_inference(w["size"], w["steps"])
+        for name, w in WORKLOADS.items()
+    }
+    default_threads = torch.get_num_threads()
+    loop = asyncio.get_running_loop()
+
+    # До: общий пул run_in_executor, каждый вызов использует все ядра
+    from concurrent.futures import ThreadPoolExecutor
+    shared_executor = ThreadPoolExecutor(max_workers=executor_threads)
+
+    async def submit_default(name, inference):
+        return await loop.run_in_executor(shared_executor, inference)
+
+    before = await run_mixed(submit_default, inferences, requests_per_model)
+    shared_executor.shutdown()
+
+    # После: пулы и лимиты потоков из ThreadBudget
+    budget = ThreadBudget()
+
+    async def submit_budget(name, inference):
+        return await budget.run(name, inference)
+
+    after = await run_mixed(submit_budget, inferences, requests_per_model)
+    budget.shutdown()
+
+    print(f"CPU threads (torch default): {default_threads}")
+    print(f"Allocation: {budget.allocation()}")
+    print(f"Before (shared executor, {executor_threads} threads): {before:.2f} req/s")
+    print(f"After (thread budget): {after:.2f} req/s")
+    print(f"Speedup: {after / before:.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed STT/LLM/TTS workload throughput benchmark")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per model")
+    parser.add_argument("--executor-threads", type=int, default=os.cpu_count() or 4,
+                        help="Threads in the shared executor for the baseline run")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.executor_threads))
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from infrastructure.messaging.admission import AdmissionController, Overloaded
+
+class TestAdmissionController:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create controller with a fake broker reporting queue depth"""
+        self.depth = 0
+        self.consumers = 1
+
+        async def queue_stats(queue_name):
+            return self.depth, self.consumers
+
+        self.admission = AdmissionController(queue_stats, alpha=1.0, refresh_interval=0, enabled=True)
+
+    @pytest.mark.asyncio
+    async def test_admits_without_service_time_estimate(self):
+        """Test requests pass while there is no latency data yet"""
+        self.depth = 1000
+
+        await self.admission.check("llm_requests", timeout=30)
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_predicted_wait_exceeds_timeout(self):
+        """Test deep queue with slow workers is rejected with 429 and Retry-After"""
+        async with self.admission.admit("llm_requests", timeout=30):
+            await asyncio.sleep(0.05)
+        service_time = self.admission.stats()["llm_requests"]["service_time_ewma"]
+        self.depth = int(60 / service_time)
+
+        with pytest.raises(Overloaded) as exc_info:
+            await self.admission.check("llm_requests", timeout=30)
+
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.retry_after >= 29
+
+    @pytest.mark.asyncio
+    async def test_service_time_accounts_for_queue_position(self):
+        """Test latency of a queued request is split across messages ahead of it"""
+        self.depth = 4
+
+        async with self.admission.admit("stt_requests", timeout=30):
+            await asyncio.sleep(0.05)
+
+        service_time = self.admission.stats()["stt_requests"]["service_time_ewma"]
+        assert 0.009 <= service_time < 0.02
+
+    @pytest.mark.asyncio
+    async def test_rejects_with_503_without_consumers(self):
+        """Test requests are rejected when no worker consumes the queue"""
+        self.consumers = 0
+
+        with pytest.raises(Overloaded) as exc_info:
+            await self.admission.check("tts_requests", timeout=30)
+
+        assert exc_info.value.status_code == 503
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import text
+from core.repositories.credit_repository_impl import AsyncCreditRepositoryImpl
+from core.repositories.request_history_repository_impl import (
+    AsyncRequestHistoryRepositoryImpl, credit_statistics, usage_statistics
+)
+from infrastructure.db.analytics_rollup import AnalyticsRollup
+from infrastructure.db.db_connection import get_db_session, engine
+from infrastructure.db.models import CreditTransaction, DailyCreditStats, DailyRequestStats, RequestHistory, User
+
+
+class TestStatisticsFromRollups:
+    def test_usage_statistics_combines_rows(self):
+        """Test rolled-up days and today's delta for the same type are merged"""
+        rows = [
+            SimpleNamespace(request_type="llm", total=8, successful=6, processing_time_sum=800, processing_time_count=4),
+            SimpleNamespace(request_type="stt", total=2, successful=2, processing_time_sum=0, processing_time_count=0),
+        ]
+
+        stats = usage_statistics(rows)
+
+        assert stats["total_requests"] == 10
+        assert stats["failed_requests"] == 2
+        assert stats["success_rate"] == 80
+        assert stats["average_processing_time"] == 200
+        assert stats["requests_by_type"] == {"llm": 8, "stt": 2}
+
+    def test_empty_statistics(self):
+        """Test a user without history gets zeroes"""
+        assert usage_statistics([])["success_rate"] == 0
+        assert credit_statistics([]) == {
+            "current_balance": 0, "total_earned": 0, "total_spent": 0, "transactions_by_type": {}
+        }
+
+class TestAnalyticsRollup:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create a user with history on past days and today"""
+        self._clean()
+        now = datetime.utcnow()
+        with get_db_session() as session:
+            user = User(name="Test User", email="test@example.com", password_hash="hashed_password")
+            session.add(user)
+            session.commit()
+            self.user_id = user.id
+
+            for days_ago, status, processing_time in [(40, "success", 100), (3, "error", None), (3, "success", 300), (0, "success", 200)]:
+                session.add(RequestHistory(
+                    user_id=self.user_id, request_type="llm", status=status,
+                    processing_time=processing_time, created_at=now - timedelta(days=days_ago)
+                ))
+            for days_ago, amount, transaction_type in [(40, 100, "initial"), (3, -10, "scenario_usage"), (0, -5, "scenario_usage")]:
+                session.add(CreditTransaction(
+                    user_id=self.user_id, amount=amount, transaction_type=transaction_type,
+                    created_at=now - timedelta(days=days_ago)
+                ))
+            session.commit()
+
+        self.repository = AsyncRequestHistoryRepositoryImpl()
+        self.rollup = AnalyticsRollup(grace=0)
+        yield
+        self._clean()
+
+    def _clean(self):
+        with engine.connect() as conn:
+            conn.execute(text("SET session_replication_role = 'replica'"))
+            for table in ["daily_request_stats", "daily_credit_stats", "analytics_rollup_state",
+                          "request_history", "credit_transactions", "users"]:
+                conn.execute(text(f"DELETE FROM {table}"))
+            conn.execute(text("SET session_replication_role = 'origin'"))
+            conn.commit()
+
+    @pytest.mark.asyncio
+    async def test_statistics_unchanged_by_rollup(self):
+        """Test statistics read from rollups plus today's delta match the raw history"""
+        usage = await self.repository.get_usage_statistics(self.user_id)
+        credits = await self.repository.get_credit_statistics(self.user_id)
+
+        await self.rollup.compact()
+
+        assert await self.repository.get_usage_statistics(self.user_id) == usage
+        assert await self.repository.get_credit_statistics(self.user_id) == credits
+        assert usage["total_requests"] == 4
+        assert usage["average_processing_time"] == 200
+        assert credits["current_balance"] == 85
+
+    @pytest.mark.asyncio
+    async def test_compaction_is_incremental(self):
+        """Test past days are rolled up once and today stays in the raw table"""
+        until = await self.rollup.compact()
+        assert await self.rollup.compact() == until
+
+        with get_db_session() as session:
+            days = session.query(DailyRequestStats).filter(DailyRequestStats.user_id == self.user_id).all()
+            assert sorted(d.total for d in days) == [1, 2]
+            assert session.query(DailyCreditStats).filter(DailyCreditStats.user_id == self.user_id).count() == 2
+
+    @pytest.mark.asyncio
+    async def test_repository_writes_after_rollup_are_counted(self):
+        """Test rows written through the repositories after a rollup get the current time and appear in stats"""
+        await self.rollup.compact()
+        before = await self.repository.get_usage_statistics(self.user_id)
+        credits_before = await self.repository.get_credit_statistics(self.user_id)
+
+        first = await self.repository.create_request(self.user_id, "llm", "hi", "success", processing_time=100)
+        await asyncio.sleep(0.01)
+        second = await self.repository.create_request(self.user_id, "llm", "hi", "success", processing_time=100)
+        await AsyncCreditRepositoryImpl(ledger=None).add_credits(self.user_id, 20, "manual")
+
+        assert datetime.fromisoformat(first["created_at"]) < datetime.fromisoformat(second["created_at"])
+        assert datetime.utcnow() - datetime.fromisoformat(second["created_at"]) < timedelta(minutes=1)
+        assert (await self.repository.get_usage_statistics(self.user_id))["total_requests"] == before["total_requests"] + 2
+        credits = await self.repository.get_credit_statistics(self.user_id)
+        assert credits["total_earned"] == credits_before["total_earned"] + 20
@@ -3,6 +3,7 @@ import os
 import pytest
 from datetime import datetime, timedelta, timezone
 from sqlalchemy import text
+from jose import jwt
 from infrastructure.web.auth_service import AuthService
 from infrastructure.db.db_connection import get_db_session, engine, get_redis_client
 from infrastructure.db.models import User, UserCredits, Quota, RequestHistory, CreditTransaction
@@ -61,16 +62,19 @@ class TestAuthService:
         assert token is not None
         assert isinstance(token, str)
         
-        # Verify token is stored in Redis
-        assert self.auth_service.redis_client.exists(f"token:{token}")
+        # Verify token carries a jti and is not stored in Redis
+        payload = jwt.decode(token, self.auth_service.SECRET_KEY, algorithms=[self.auth_service.ALGORITHM])
+        assert payload["jti"]
+        assert not get_redis_client().keys("token:*")
 
-    def test_register_user_success(self):
+    @pytest.mark.asyncio
+    async def test_register_user_success(self):
         """Test successful user registration"""
         name = "Test User"
         email = "test@example.com"
         password = "test_password"
         
-        token_data, error = self.auth_service.register_user(name, email, password)
+        token_data, error = await self.auth_service.register_user(name, email, password)
         
         # Verify registration was successful
         assert error is None
@@ -92,35 +96,37 @@ class TestAuthService:
             assert any(q.resource_type == "scenario_basic" for q in quotas)
             assert any(q.resource_type == "scenario_llm" for q in quotas)
 
-    def test_register_user_duplicate_email(self):
+    @pytest.mark.asyncio
+    async def test_register_user_duplicate_email(self):
         """Test registration with duplicate email"""
         # Register first user
         name1 = "Test User 1"
         email = "test@example.com"
         password = "test_password"
         
-        token_data1, error1 = self.auth_service.register_user(name1, email, password)
+        token_data1, error1 = await self.auth_service.register_user(name1, email, password)
         assert error1 is None
         
         # Try to register second user with same email
         name2 = "Test User 2"
-        token_data2, error2 = self.auth_service.register_user(name2, email, password)
+        token_data2, error2 = await self.auth_service.register_user(name2, email, password)
         
         # Verify second registration failed
         assert error2 == "Email already registered"
         assert token_data2 is None
 
-    def test_authenticate_user_success(self):
+    @pytest.mark.asyncio
+    async def test_authenticate_user_success(self):
         """Test successful user authentication"""
         # Register user first
         name = "Test User"
         email = "test@example.com"
         password = "test_password"
         
-        self.auth_service.register_user(name, email, password)
+        await self.auth_service.register_user(name, email, password)
         
         # Try to authenticate
-        token_data, error = self.auth_service.authenticate_user(email, password)
+        token_data, error = await self.auth_service.authenticate_user(email, password)
         
         # Verify authentication was successful
         assert error is None
@@ -128,42 +134,45 @@ class TestAuthService:
         assert "access_token" in token_data
         assert token_data["token_type"] == "bearer"
 
-    def test_authenticate_user_wrong_password(self):
+    @pytest.mark.asyncio
+    async def test_authenticate_user_wrong_password(self):
         """Test authentication with wrong password"""
         # Register user first
         name = "Test User"
         email = "test@example.com"
         password = "test_password"
         
-        self.auth_service.register_user(name, email, password)
+        await self.auth_service.register_user(name, email, password)
         
         # Try to authenticate with wrong password
-        token_data, error = self.auth_service.authenticate_user(email, "wrong_password")
+        token_data, error = await self.auth_service.authenticate_user(email, "wrong_password")
         
         # Verify authentication failed
         assert error == "Incorrect password"
         assert token_data is None
 
-    def test_authenticate_user_not_found(self):
+    @pytest.mark.asyncio
+    async def test_authenticate_user_not_found(self):
         """Test authentication with non-existent user"""
-        token_data, error = self.auth_service.authenticate_user("nonexistent@example.com", "password")
+        token_data, error = await self.auth_service.authenticate_user("nonexistent@example.com", "password")
         
         # Verify authentication failed
         assert error == "User not found"
         assert token_data is None
 
-    def test_validate_token_success(self):
+    @pytest.mark.asyncio
+    async def test_validate_token_success(self):
         """Test successful token validation"""
         # Register user first
         name = "Test User"
         email = "test@example.com"
         password = "test_password"
         
-        token_data, _ = self.auth_service.register_user(name, email, password)
+        token_data, _ = await self.auth_service.register_user(name, email, password)
         token = token_data["access_token"]
         
         # Validate token
-        user, error = self.auth_service.validate_token(token)
+        user, error = await self.auth_service.validate_token(token)
         
         # Verify validation was successful
         assert error is None
@@ -171,15 +180,17 @@ class TestAuthService:
         assert user.email == email
         assert user.name == name
 
-    def test_validate_token_invalid(self):
+    @pytest.mark.asyncio
+    async def test_validate_token_invalid(self):
         """Test validation of invalid token"""
-        user, error = self.auth_service.validate_token("invalid_token")
+        user, error = await self.auth_service.validate_token("invalid_token")
         
         # Verify validation failed
         assert error == "Invalid token"
         assert user is None
 
-    def test_validate_token_expired(self):
+    @pytest.mark.asyncio
+    async def test_validate_token_expired(self):
         """Test validation of expired token"""
         # Create token with short expiration
         data = {"sub": "test@example.com", "user_id": 1}
@@ -190,7 +201,7 @@ class TestAuthService:
         time.sleep(2)
         
         # Try to validate expired token
-        user, error = self.auth_service.validate_token(token)
+        user, error = await self.auth_service.validate_token(token)
         
         # Verify validation failed
         assert error == "Token has expired"
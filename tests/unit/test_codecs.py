@@ -0,0 +1,53 @@
+import json
+import pytest
+from infrastructure.messaging.codecs import (
+    JsonCodec,
+    MsgpackCodec,
+    RawBytesCodec,
+    get_codec,
+    JSON_CONTENT_TYPE,
+    MSGPACK_CONTENT_TYPE,
+    RAW_CONTENT_TYPE
+)
+
+class TestCodecs:
+    def test_msgpack_roundtrip_keeps_bytes(self):
+        """Test msgpack carries binary fields without base64"""
+        codec = MsgpackCodec()
+        message = {"type": "tts_result", "data": {"audio_data": b"\x00\x01RIFF", "sample_rate": 24000}}
+
+        body, headers = codec.encode(message)
+
+        assert headers == {}
+        assert codec.decode(body, headers) == message
+
+    def test_raw_bytes_roundtrip(self):
+        """Test raw payload goes into the body and metadata into headers"""
+        codec = RawBytesCodec(payload_field="audio_data")
+        audio = b"\x1aE\xdf\xa3webm"
+        message = {"type": "stt_request", "data": {"audio_data": audio, "language": "ru"}}
+
+        body, headers = codec.encode(message)
+
+        assert body == audio
+        assert headers["x-message-type"] == "stt_request"
+        assert get_codec(RAW_CONTENT_TYPE).decode(body, headers) == message
+
+    def test_json_encodes_bytes_as_base64(self):
+        """Test JSON codec stays compatible with base64 consumers"""
+        body, _ = JsonCodec().encode({"audio_data": b"abc"})
+
+        assert json.loads(body) == {"audio_data": "YWJj"}
+
+    def test_legacy_messages_without_content_type_are_json(self):
+        """Test messages published before the codec change stay readable"""
+        codec = get_codec(None)
+
+        assert codec.content_type == JSON_CONTENT_TYPE
+        assert codec.decode(b'{"type": "llm_request"}', {}) == {"type": "llm_request"}
+
+    def test_codec_lookup(self):
+        """Test codec selection by content type"""
+        assert get_codec(MSGPACK_CONTENT_TYPE).content_type == MSGPACK_CONTENT_TYPE
+        with pytest.raises(ValueError):
+            get_codec("text/plain")
@@ -0,0 +1,39 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from infrastructure.messaging import connection, rabbitmq_client
+from infrastructure.messaging.connection import ConnectionManager
+from infrastructure.messaging.rabbitmq_client import RabbitMQClient
+
+class TestConnectionManager:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        """Replace connect_robust with a fake robust connection"""
+        self.connection = MagicMock()
+        self.connection.is_closed = False
+        self.connection.close = AsyncMock()
+        self.connection.channel = AsyncMock(side_effect=lambda: MagicMock(declare_exchange=AsyncMock()))
+        self.connect_robust = AsyncMock(return_value=self.connection)
+        monkeypatch.setattr(connection.aio_pika, "connect_robust", self.connect_robust)
+
+        self.manager = ConnectionManager(publisher_channels=2)
+        monkeypatch.setattr(rabbitmq_client, "connection_manager", self.manager)
+
+    @pytest.mark.asyncio
+    async def test_clients_share_one_connection(self):
+        """Test every client opens its own channel on a single process connection"""
+        clients = [RabbitMQClient() for _ in range(3)]
+        for client in clients:
+            await client.connect()
+
+        assert self.connect_robust.await_count == 1
+        assert self.connection.channel.await_count == 3
+        assert len({id(client.channel) for client in clients}) == 3
+
+    @pytest.mark.asyncio
+    async def test_publisher_pool_is_bounded(self):
+        """Test publishes reuse pooled channels instead of opening new ones"""
+        for _ in range(5):
+            async with self.manager.publish_channel():
+                pass
+
+        assert self.connection.channel.await_count == 1
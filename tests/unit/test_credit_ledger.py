@@ -0,0 +1,227 @@
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+from core.repositories.credit_repository_impl import AsyncCreditRepositoryImpl
+from infrastructure.db.credit_ledger import APPLIED, INSUFFICIENT, NO_IDS, NOT_LOADED, CreditLedger
+from infrastructure.db.models import CreditLedgerState, CreditTransaction, UserCredits
+
+
+def stream_entry(entry_id, transaction_id, user_id, amount, balance):
+    return (entry_id.encode(), {
+        b"id": str(transaction_id).encode(),
+        b"user_id": str(user_id).encode(),
+        b"amount": str(amount).encode(),
+        b"transaction_type": b"scenario_usage",
+        b"scenario_type": b"qwen",
+        b"description": b"",
+        b"created_at": b"2026-01-01T12:00:00",
+        b"balance": str(balance).encode()
+    })
+
+class TestCreditLedger:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create a ledger whose Lua script and Redis client are mocked"""
+        self.redis = MagicMock()
+        self.redis.xrange = AsyncMock(return_value=[])
+        self.redis.xdel = AsyncMock()
+        self.redis.set = AsyncMock()
+        self.redis.rpush = AsyncMock()
+        self.ledger = CreditLedger(client=self.redis, batch_size=10)
+        self.ledger._apply_script = AsyncMock()
+
+        self.state = CreditLedgerState(id=1, last_stream_id="0-0")
+        self.session = MagicMock()
+        self.session.execute = AsyncMock(return_value=MagicMock(rowcount=1))
+        self.session.scalar = AsyncMock(return_value=self.state)
+
+        @asynccontextmanager
+        async def db_session():
+            yield self.session
+
+        with patch("infrastructure.db.credit_ledger.get_async_db_session", db_session):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_apply_returns_transaction(self):
+        """Test a successful charge returns the new balance and the pre-allocated id"""
+        self.ledger._apply_script.return_value = [APPLIED, 90, 501]
+
+        result = await self.ledger.apply(1, -10, "scenario_usage", "qwen")
+
+        assert result["id"] == 501
+        assert result["amount"] == -10
+        assert result["balance"] == 90
+        assert result["scenario_type"] == "qwen"
+        args = self.ledger._apply_script.call_args.kwargs["args"]
+        assert args[:4] == [-10, 1, "scenario_usage", "qwen"]
+
+    @pytest.mark.asyncio
+    async def test_apply_insufficient_balance(self):
+        """Test a charge above the balance is rejected without touching the database"""
+        self.ledger._apply_script.return_value = [INSUFFICIENT]
+
+        with pytest.raises(ValueError):
+            await self.ledger.apply(1, -10, "scenario_usage")
+
+        self.session.scalar.assert_not_awaited()
+        self.redis.set.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_apply_loads_missing_balance(self):
+        """Test a balance missing from Redis is loaded from the database once and the charge retried"""
+        self.ledger._apply_script.side_effect = [[NOT_LOADED], [APPLIED, 30, 7]]
+        self.session.scalar.return_value = 40
+
+        result = await self.ledger.apply(1, -10, "scenario_usage")
+
+        assert result["balance"] == 30
+        self.redis.set.assert_awaited_once_with("ledger:balance:1", 40, nx=True)
+
+    @pytest.mark.asyncio
+    async def test_apply_refills_ids(self):
+        """Test an empty id pool is refilled from the database sequence"""
+        self.ledger._apply_script.side_effect = [[NO_IDS], [APPLIED, 30, 7]]
+        self.session.scalars = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[7, 8, 9])))
+
+        await self.ledger.apply(1, -10, "scenario_usage")
+
+        self.redis.rpush.assert_awaited_once_with("ledger:ids", 7, 8, 9)
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_batch(self):
+        """Test one flush inserts every pending transaction and the latest balance per user"""
+        self.redis.xrange.return_value = [
+            stream_entry("100-0", 1, 1, -10, 90),
+            stream_entry("100-1", 2, 2, 50, 150),
+            stream_entry("101-0", 3, 1, -5, 85),
+        ]
+
+        assert await self.ledger.flush() == 3
+
+        added = [call.args[0] for call in self.session.add.call_args_list]
+        transactions = [obj for obj in added if isinstance(obj, CreditTransaction)]
+        assert [t.id for t in transactions] == [1, 2, 3]
+        assert transactions[0].description is None
+        balances = {
+            call.args[0].compile().params["user_id_1"]: call.args[0].compile().params["balance"]
+            for call in self.session.execute.call_args_list
+            if call.args[0].is_update
+        }
+        assert balances == {1: 85, 2: 150}
+        assert self.state.last_stream_id == "101-0"
+        self.redis.xdel.assert_awaited_once_with("ledger:transactions", b"100-0", b"100-1", b"101-0")
+
+    @pytest.mark.asyncio
+    async def test_flush_skips_already_written_entries(self):
+        """Test entries written before a crash but not yet deleted from the stream are not inserted twice"""
+        self.state.last_stream_id = "100-1"
+        self.redis.xrange.return_value = [
+            stream_entry("100-0", 1, 1, -10, 90),
+            stream_entry("100-1", 2, 1, -10, 80),
+            stream_entry("101-0", 3, 1, -5, 75),
+        ]
+
+        await self.ledger.flush()
+
+        transactions = [
+            call.args[0] for call in self.session.add.call_args_list
+            if isinstance(call.args[0], CreditTransaction)
+        ]
+        assert [t.id for t in transactions] == [3]
+        self.redis.xdel.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_flush_creates_missing_balance_row(self):
+        """Test a user without a user_credits row gets one"""
+        self.session.execute.return_value = MagicMock(rowcount=0)
+        self.redis.xrange.return_value = [stream_entry("100-0", 1, 3, 100, 100)]
+
+        await self.ledger.flush()
+
+        rows = [
+            call.args[0] for call in self.session.add.call_args_list
+            if isinstance(call.args[0], UserCredits)
+        ]
+        assert [(row.user_id, row.balance) for row in rows] == [(3, 100)]
+
+    @pytest.mark.asyncio
+    async def test_drain_renews_lock_per_batch(self):
+        """Test the writer lock is renewed before every batch and draining stops once it is lost"""
+        self.ledger._lock_script = AsyncMock(side_effect=[1, 1, 0])
+        self.ledger.flush = AsyncMock(return_value=10)
+
+        assert await self.ledger.drain() is False
+
+        assert self.ledger._lock_script.await_count == 3
+        assert self.ledger.flush.await_count == 2
+
+    def _reconcile_mocks(self, versions):
+        """Mock the user list, the balances read after the snapshot and both scripts"""
+        self.ledger.drain = AsyncMock(return_value=True)
+        self.ledger._snapshot_script = AsyncMock(return_value=versions)
+        self.ledger._restore_script = AsyncMock(return_value=[1, 1])
+        self.session.scalars = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[1, 2])))
+        self.session.execute.return_value = MagicMock(all=MagicMock(return_value=[(1, 90), (2, 150)]))
+
+    @pytest.mark.asyncio
+    async def test_reconcile_restores_only_unchanged_balances(self):
+        """Test database balances replace Redis values conditioned on the versions captured before the read"""
+        self._reconcile_mocks([b"4", b""])
+        order = []
+        self.ledger._snapshot_script.side_effect = lambda **kwargs: order.append("snapshot") or [b"4", b""]
+        self.session.execute.side_effect = lambda *args: order.append("read") or MagicMock(
+            all=MagicMock(return_value=[(1, 90), (2, 150)])
+        )
+
+        await self.ledger.reconcile()
+
+        assert order == ["snapshot", "read"]
+        self.ledger._snapshot_script.assert_awaited_once_with(
+            keys=["ledger:transactions", "ledger:versions"], args=[1, 2]
+        )
+        self.ledger._restore_script.assert_awaited_once_with(
+            keys=["ledger:versions", "ledger:balance:1", "ledger:balance:2"],
+            args=[1, b"4", "90", 2, b"", "150"]
+        )
+        self.redis.pipeline.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_reconcile_only_fills_missing_balances_while_stream_pending(self):
+        """Test existing Redis balances are kept when transactions are still waiting in the stream"""
+        self._reconcile_mocks(None)
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[True, None])
+
+        @asynccontextmanager
+        async def pipeline(transaction=True):
+            yield pipe
+
+        self.redis.pipeline = pipeline
+
+        await self.ledger.reconcile()
+
+        self.ledger._restore_script.assert_not_awaited()
+        pipe.set.assert_any_call("ledger:balance:1", 90, nx=True)
+
+    @pytest.mark.asyncio
+    async def test_apply_bumps_user_version(self):
+        """Test every applied transaction passes the version hash so reconcile can detect it"""
+        self.ledger._apply_script.return_value = [APPLIED, 90, 501]
+
+        await self.ledger.apply(1, -10, "scenario_usage")
+
+        assert self.ledger._apply_script.call_args.kwargs["keys"][3] == "ledger:versions"
+
+class TestLedgerRepository:
+    @pytest.mark.asyncio
+    async def test_repository_charges_through_ledger(self):
+        """Test the async repository routes balance reads and changes to the ledger"""
+        ledger = MagicMock()
+        ledger.balance = AsyncMock(return_value=90)
+        ledger.apply = AsyncMock(return_value={"balance": 80})
+        repository = AsyncCreditRepositoryImpl(ledger=ledger)
+
+        assert await repository.get_user_balance(1) == 90
+        assert await repository.spend_credits(1, 10, "qwen") == (True, 80)
+        ledger.apply.assert_awaited_with(1, -10, "scenario_usage", "qwen", None)
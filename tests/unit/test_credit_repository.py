@@ -1,11 +1,14 @@
 import sys
 import os
+import asyncio
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from sqlalchemy import text
-from core.repositories.credit_repository_impl import CreditRepositoryImpl
+from sqlalchemy import event, text
+from core.repositories.credit_repository_impl import AsyncCreditRepositoryImpl, CreditRepositoryImpl
 from infrastructure.db.db_connection import get_db_session, engine
 from infrastructure.db.models import User, UserCredits, CreditTransaction
+from infrastructure.db.pagination import next_cursor
 
 class TestCreditRepository:
     @pytest.fixture(autouse=True)
@@ -126,6 +129,30 @@ class TestCreditRepository:
         assert len(history) == 2
         assert history[0]["amount"] == -30  # Most recent transaction (spending)
         assert history[1]["amount"] == 100  # Initial transaction
+        assert [t["balance"] for t in history] == [70, 100]  # Balance after each transaction
+
+    def test_transaction_history_page_balances(self):
+        """Test every page reports the balance after each transaction, not the current balance"""
+        for amount in [100, -10, -20, 50]:
+            self.repository.create_transaction(self.user_id, amount, "manual")
+
+        page = self.repository.get_transaction_history(self.user_id, limit=2, offset=1)
+
+        assert [(t["amount"], t["balance"]) for t in page] == [(-20, 70), (-10, 90)]
+
+    def test_transaction_history_cursor_pages(self):
+        """Test cursor pages cover every transaction once and new rows do not shift them"""
+        for amount in [100, -10, -20, 50, -5]:
+            self.repository.create_transaction(self.user_id, amount, "manual")
+
+        first = self.repository.get_transaction_history(self.user_id, limit=2)
+        self.repository.create_transaction(self.user_id, 1, "manual")  # Arrives while paging
+        second = self.repository.get_transaction_history(self.user_id, limit=2, cursor=next_cursor(first, 2))
+        third = self.repository.get_transaction_history(self.user_id, limit=2, cursor=next_cursor(second, 2))
+
+        assert [t["amount"] for t in first + second + third] == [-5, 50, -20, -10, 100]
+        assert [t["balance"] for t in second] == [70, 90]
+        assert next_cursor(third, 2) is None
 
     def test_get_scenario_usage_stats(self):
         """Test getting scenario usage statistics"""
@@ -165,4 +192,93 @@ class TestCreditRepository:
         assert len(stats) == 3  # Three different scenarios
         search_stats = next(s for s in stats if s["scenario_type"] == "search")
         assert search_stats["total_usage"] == 25  # 10 + 15
-        assert search_stats["usage_count"] == 2 
\ No newline at end of file
+        assert search_stats["usage_count"] == 2 
+
+    def test_concurrent_deductions_never_overspend(self):
+        """Test concurrent charges succeed only while the balance covers them"""
+        self.repository.add_credits(self.user_id, 100, "initial")
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(
+                lambda _: self.repository.spend_credits(self.user_id, 7, scenario_type="chat"),
+                range(30)
+            ))
+
+        successes = [balance for ok, balance in results if ok]
+        assert len(successes) == 14  # 14 * 7 = 98 <= 100
+        assert min(successes) == 2
+        with get_db_session() as session:
+            assert session.query(UserCredits).filter(UserCredits.user_id == self.user_id).one().balance == 2
+            charges = session.query(CreditTransaction).filter(CreditTransaction.amount == -7).count()
+            assert charges == 14
+
+    def test_concurrent_credits_and_debits_keep_balance(self):
+        """Test credits racing with debits are never lost and every balance_after matches a serial order"""
+        self.repository.add_credits(self.user_id, 100, "initial")
+
+        def operation(i):
+            if i % 2:
+                return self.repository.create_transaction(self.user_id, 5, "manual")
+            return self.repository.deduct_credits(self.user_id, 3, "deduct")
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            list(pool.map(operation, range(40)))
+
+        with get_db_session() as session:
+            assert session.query(UserCredits).filter(UserCredits.user_id == self.user_id).one().balance == 100 + 20 * 5 - 20 * 3
+            # Ids are taken while the balance row is locked, so they follow the order the balance changed in
+            rows = [(t.amount, t.balance_after) for t in session.query(CreditTransaction)
+                    .filter(CreditTransaction.user_id == self.user_id).order_by(CreditTransaction.id)]
+        for (_, before), (amount, after) in zip(rows, rows[1:]):
+            assert after == before + amount
+
+    @pytest.mark.asyncio
+    async def test_async_deduction_is_atomic(self):
+        """Test concurrent async charges through one pool keep the ledger and balance consistent"""
+        self.repository.add_credits(self.user_id, 50, "initial")
+        repository = AsyncCreditRepositoryImpl(ledger=None)
+
+        async def charge():
+            try:
+                return await repository.deduct_credits(self.user_id, 10, "deduct")
+            except ValueError:
+                return None
+
+        results = await asyncio.gather(*[charge() for _ in range(8)])
+
+        assert sorted(r["balance"] for r in results if r) == [0, 10, 20, 30, 40]
+        assert await repository.get_user_balance(self.user_id) == 0
+
+    def test_get_period_stats_single_query(self):
+        """Test period stats bucket every interval and scenario in one database round trip"""
+        now = datetime.utcnow()
+        with get_db_session() as session:
+            for days_ago, scenario, amount in [(0.5, "search", -10), (0.5, "search", -5), (0.5, "chat", -3), (10.5, "chat", -7)]:
+                session.add(CreditTransaction(
+                    user_id=self.user_id,
+                    amount=amount,
+                    transaction_type="scenario_usage",
+                    scenario_type=scenario,
+                    created_at=now - timedelta(days=days_ago)
+                ))
+            session.add(CreditTransaction(
+                user_id=self.user_id, amount=100, transaction_type="initial", created_at=now - timedelta(days=1)
+            ))
+            session.commit()
+
+        statements = []
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            stats = self.repository.get_period_stats(self.user_id, "month")
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+
+        assert len(statements) == 1
+        assert len(stats) == 30
+        assert stats[-1]["total_spent"] == 18
+        assert {s["scenario_type"]: s["usage_count"] for s in stats[-1]["scenario_breakdown"]} == {"chat": 1, "search": 2}
+        assert stats[-11]["total_spent"] == 7
+        assert sum(s["total_spent"] for s in stats) == 25
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from infrastructure.messaging import rabbitmq_client
+from infrastructure.messaging.jobs import JobService
+from infrastructure.messaging.message_service import MessageService
+from infrastructure.messaging.results import RESULT_KEY_HEADER, ResultBroker
+from infrastructure.messaging.stt_client import STTRabbitMQClient
+from infrastructure.web.controllers import job_controller
+from tests.unit.test_results import FakeRedis
+
+class JobRedis(FakeRedis):
+    def __init__(self):
+        super().__init__()
+        self.expires = {}
+
+    async def set(self, key, value, ex=None):
+        await super().set(key, value)
+        if ex is not None:
+            self.expires[key] = time.time() + ex
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+    def evict_expired(self, now):
+        """Drop keys whose TTL ran out by now"""
+        for key, expires in list(self.expires.items()):
+            if expires <= now:
+                self.store.pop(key, None)
+                del self.expires[key]
+
+class TestJobService:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create a job service and a worker-side broker sharing one Redis"""
+        self.redis = JobRedis()
+        self.results = ResultBroker(client=self.redis, ttl=60)
+        self.worker = ResultBroker(client=self.redis, ttl=60)
+        self.service = JobService(results=self.results, client=self.redis)
+        self.service.message_service = MagicMock()
+        self.service.message_service.submit_job = AsyncMock()
+
+    @pytest.mark.asyncio
+    async def test_create_stores_job_and_submits(self):
+        """Test a new job is stored as queued and published under its ID"""
+        job = await self.service.create("tts", {"text": "привет", "speaker": "baya"}, user_id=1)
+
+        assert job["status"] == "queued"
+        assert f"job:{job['id']}" in self.redis.store
+        self.service.message_service.submit_job.assert_awaited_once_with(
+            "tts", {"text": "привет", "speaker": "baya"}, job["id"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_failed_submit_removes_job(self):
+        """Test a job rejected at submission is not left in storage"""
+        self.service.message_service.submit_job.side_effect = RuntimeError("overloaded")
+
+        with pytest.raises(RuntimeError):
+            await self.service.create("llm", {"prompt": "hi"}, user_id=1)
+        assert self.redis.store == {}
+
+    @pytest.mark.asyncio
+    async def test_unknown_kind_rejected(self):
+        """Test only stt, tts and llm jobs are accepted"""
+        with pytest.raises(ValueError):
+            await self.service.create("ocr", {}, user_id=1)
+
+    @pytest.mark.asyncio
+    async def test_long_poll_returns_result(self):
+        """Test a waiting reader gets the result as soon as the worker publishes it"""
+        job = await self.service.create("llm", {"prompt": "hi"}, user_id=1)
+
+        poll = asyncio.create_task(self.service.get(job["id"], wait=1))
+        await asyncio.sleep(0.01)
+        await self.worker.publish(job["id"], {"status": "ok", "result": {"text": "ответ"}})
+
+        state = await poll
+        assert state["status"] == "done"
+        assert state["result"] == {"text": "ответ"}
+        # Повторное чтение не запускает инференс заново
+        assert (await self.service.get(job["id"]))["result"] == {"text": "ответ"}
+        self.service.message_service.submit_job.assert_awaited_once()
+        await self.results.close()
+
+    @pytest.mark.asyncio
+    async def test_status_transitions(self):
+        """Test queued, failed and expired states"""
+        job = await self.service.create("stt", {"audio_data": b"RIFF"}, user_id=1)
+        assert (await self.service.get(job["id"], wait=0.05))["status"] == "queued"
+
+        await self.worker.publish(job["id"], {"status": "error", "error": "bad audio"})
+        state = await self.service.get(job["id"])
+        assert state["status"] == "failed"
+        assert state["error"] == "bad audio"
+
+        stored = json.loads(self.redis.store[f"job:{job['id']}"])
+        stored.update(id="old", deadline=time.time() - 1)
+        self.redis.store["job:old"] = json.dumps(stored)
+        assert (await self.service.get("old", wait=1))["status"] == "expired"
+        await self.results.close()
+
+    @pytest.mark.asyncio
+    async def test_result_lives_as_long_as_job(self, monkeypatch):
+        """Test a result published early is still readable until the job record itself expires"""
+        job = await self.service.create("llm", {"prompt": "hi"}, user_id=1)
+        deadline = json.loads(self.redis.store[f"job:{job['id']}"])["deadline"]
+        await self.worker.publish(job["id"], {"status": "ok", "result": {"text": "ответ"}}, deadline=deadline)
+
+        # Past the deadline and the plain result TTL, but before the job record expires
+        later = self.redis.expires[f"job:{job['id']}"] - 1
+        assert later > time.time() + self.results.ttl
+        self.redis.evict_expired(later)
+        monkeypatch.setattr(time, "time", lambda: later)
+
+        state = await self.service.get(job["id"])
+        assert state["status"] == "done"
+        assert state["result"] == {"text": "ответ"}
+
+    @pytest.mark.asyncio
+    async def test_unknown_job(self):
+        """Test a missing or evicted job returns None"""
+        assert await self.service.get("missing") is None
+
+class TestSttJobSubmission:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        """Route STT job submission to a real STT client with a mocked publisher channel"""
+        self.exchange = MagicMock()
+        self.exchange.publish = AsyncMock()
+        channel = MagicMock()
+        channel.get_exchange = AsyncMock(return_value=self.exchange)
+
+        @asynccontextmanager
+        async def publish_channel():
+            yield channel
+
+        monkeypatch.setattr(rabbitmq_client.connection_manager, "publish_channel", publish_channel)
+
+        stt_client = STTRabbitMQClient()
+        stt_client.connection = MagicMock()
+        stt_client._ensure_queue = AsyncMock()
+        admission = MagicMock()
+        admission.check = AsyncMock()
+
+        service = MessageService()
+        monkeypatch.setattr(service, "_stt_client", stt_client)
+        monkeypatch.setattr(service, "_llm_client", MagicMock())
+        monkeypatch.setattr(service, "_tts_client", MagicMock())
+        monkeypatch.setattr(service, "_admission", admission)
+        monkeypatch.setattr(job_controller, "job_service", JobService(results=ResultBroker(client=JobRedis()), client=JobRedis()))
+
+    @pytest.mark.asyncio
+    async def test_stt_job_publishes_raw_audio(self):
+        """Test an uploaded file is published as the raw audio body of an STT request"""
+        upload = MagicMock()
+        upload.read = AsyncMock(return_value=b"RIFF-audio")
+
+        job = await job_controller.create_stt_job(file=upload, current_user=MagicMock(id=1))
+
+        published = self.exchange.publish.await_args.args[0]
+        assert published.body == b"RIFF-audio"
+        assert published.headers["x-payload-field"] == "audio_data"
+        assert published.headers[RESULT_KEY_HEADER] == job["id"]
+        assert STTRabbitMQClient.audio_codec.decode(published.body, published.headers)["data"] == {"audio_data": b"RIFF-audio"}
@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql
+from core.repositories.credit_repository_impl import transaction_history_statement
+from infrastructure.db.db_connection import engine
+from infrastructure.db.migrate import discover, migrate
+from infrastructure.db.migrations import m0002_transaction_balance_after
+from infrastructure.db.models import QwenHistory, RequestHistory
+
+
+class TestMigrationDiscovery:
+    def test_migrations_ordered_by_version(self):
+        """Test migrations are found in the migrations directory in version order"""
+        migrations = discover()
+
+        assert migrations[0] == (1, "m0001_composite_indexes")
+        assert [version for version, _ in migrations] == sorted(version for version, _ in migrations)
+
+class TestMigrations:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Apply pending migrations to the test database"""
+        migrate()
+
+    def _plan(self, statement, params=None) -> str:
+        """EXPLAIN a query with sequential scans disabled so an applicable index is always chosen"""
+        with engine.connect() as conn:
+            conn.execute(text("SET enable_seqscan = off"))
+            if not isinstance(statement, str):
+                compiled = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+                statement = str(compiled)
+            plan = conn.execute(text(f"EXPLAIN {statement}"), params or {}).scalars().all()
+            conn.rollback()
+        return "\n".join(plan)
+
+    def test_migrate_is_idempotent(self):
+        """Test a second run applies nothing and every migration is recorded once"""
+        assert migrate() == []
+        with engine.connect() as conn:
+            versions = conn.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars().all()
+        assert versions == [version for version, _ in discover()]
+
+    def test_user_credits_unique_per_user(self):
+        """Test a second balance row for the same user is rejected"""
+        with engine.connect() as conn:
+            conn.execute(text("SET session_replication_role = 'replica'"))
+            conn.execute(text("INSERT INTO user_credits (user_id, balance, created_at, updated_at) VALUES (-1, 0, now(), now())"))
+            with pytest.raises(IntegrityError):
+                conn.execute(text("INSERT INTO user_credits (user_id, balance, created_at, updated_at) VALUES (-1, 0, now(), now())"))
+            conn.rollback()
+
+    def test_request_history_page_uses_index(self):
+        """Test a user's request history page is read from the (user_id, created_at) index"""
+        statement = select(RequestHistory).where(RequestHistory.user_id == 1)\
+            .order_by(RequestHistory.created_at.desc()).limit(50)
+        assert "ix_request_history_user_id_created_at" in self._plan(statement)
+
+    def test_qwen_history_page_uses_index(self):
+        """Test a user's dialog history page is read from the (user_id, created_at) index"""
+        statement = select(QwenHistory).where(QwenHistory.user_id == 1)\
+            .order_by(QwenHistory.created_at.desc()).limit(50)
+        assert "ix_qwen_history_user_id_created_at" in self._plan(statement)
+
+    def test_credit_history_uses_index(self):
+        """Test the transaction history reads one user's rows through an index without a window over the history"""
+        plan = self._plan(transaction_history_statement(1, 50, 0))
+        assert "credit_transactions_user" in plan
+        assert "WindowAgg" not in plan
+
+    def test_balance_after_backfilled(self):
+        """Test existing transactions get the running balance of their user"""
+        with engine.connect() as conn:
+            conn.execute(text("SET session_replication_role = 'replica'"))
+            for amount, minute in [(100, 1), (-30, 2), (20, 3)]:
+                conn.execute(text(
+                    "INSERT INTO credit_transactions (user_id, amount, transaction_type, created_at) "
+                    "VALUES (-1, :amount, 'manual', timestamp '2026-01-01' + :minute * interval '1 minute')"
+                ), {"amount": amount, "minute": minute})
+
+            m0002_transaction_balance_after.upgrade(conn)
+
+            balances = conn.execute(text(
+                "SELECT balance_after FROM credit_transactions WHERE user_id = -1 ORDER BY created_at"
+            )).scalars().all()
+            conn.rollback()
+        assert balances == [100, 70, 90]
+
+    def test_balance_lookup_uses_unique_index(self):
+        """Test a balance lookup by user goes through the unique user_id index"""
+        plan = self._plan("SELECT balance FROM user_credits WHERE user_id = 1")
+        assert "uq_user_credits_user_id" in plan
@@ -0,0 +1,29 @@
+import pytest
+from datetime import datetime
+from infrastructure.db.pagination import decode_cursor, encode_cursor, next_cursor
+
+
+class TestCursor:
+    def test_cursor_round_trip(self):
+        """Test a cursor decodes to the key of the row it was made from"""
+        cursor = encode_cursor("2026-01-01T12:30:00.123456", 42)
+
+        assert decode_cursor(cursor) == (datetime(2026, 1, 1, 12, 30, 0, 123456), 42)
+        assert "=" not in cursor
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor("yesterday", 1), "W10"])
+    def test_invalid_cursor(self, cursor):
+        """Test a tampered cursor is rejected with ValueError"""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    def test_next_cursor_only_for_full_page(self):
+        """Test the next cursor points after the last row and is omitted on the last page"""
+        page = [
+            {"id": 9, "created_at": "2026-01-02T00:00:00"},
+            {"id": 7, "created_at": "2026-01-01T00:00:00"},
+        ]
+
+        assert decode_cursor(next_cursor(page, 2)) == (datetime(2026, 1, 1), 7)
+        assert next_cursor(page, 3) is None
+        assert next_cursor([], 2) is None
@@ -0,0 +1,84 @@
+import asyncio
+import time
+import pytest
+from passlib.context import CryptContext
+from infrastructure.web.password_hasher import PasswordHasher, TooManyAttempts
+
+class SlowContext:
+    """Password context whose hashing blocks the calling thread"""
+
+    def hash(self, password):
+        time.sleep(0.1)
+        return f"hashed:{password}"
+
+    def verify(self, password, hashed_password):
+        time.sleep(0.1)
+        return hashed_password == f"hashed:{password}"
+
+class TestPasswordHasher:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create hashers with real (cheap) bcrypt and a blocking fake"""
+        self.hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4), workers=2)
+        self.slow = PasswordHasher(SlowContext(), workers=2, per_ip=2, per_email=1)
+        yield
+        self.hasher.shutdown()
+        self.slow.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify(self):
+        """Test awaitable wrappers produce and check bcrypt hashes"""
+        hashed = await self.hasher.hash("secret")
+
+        assert hashed != "secret"
+        assert await self.hasher.verify("secret", hashed)
+        assert not await self.hasher.verify("wrong", hashed)
+
+    @pytest.mark.asyncio
+    async def test_event_loop_not_blocked(self):
+        """Test the loop keeps running while passwords are verified"""
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await asyncio.gather(*[self.slow.verify("p", "hashed:p") for _ in range(4)])
+        task.cancel()
+
+        # 4 проверки по 100 мс в двух потоках - около 200 мс, за это время тикер срабатывает много раз
+        assert ticks >= 10
+
+    @pytest.mark.asyncio
+    async def test_concurrent_attempts_per_email_limited(self):
+        """Test a second concurrent attempt for the same email is rejected"""
+        async def attempt(ip, email):
+            async with self.slow.limit(ip=ip, email=email):
+                return await self.slow.verify("p", "hashed:p")
+
+        first = asyncio.create_task(attempt("1.1.1.1", "a@b.c"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(TooManyAttempts):
+            await attempt("2.2.2.2", "A@b.c")
+        assert await attempt("2.2.2.2", "x@b.c")
+        assert await first
+        # После завершения попытки лимит освобождается
+        assert await attempt("1.1.1.1", "a@b.c")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_attempts_per_ip_limited(self):
+        """Test attempts from one IP beyond the limit are rejected"""
+        async def attempt(email):
+            async with self.slow.limit(ip="1.1.1.1", email=email):
+                return await self.slow.verify("p", "hashed:p")
+
+        running = [asyncio.create_task(attempt(f"u{i}@b.c")) for i in range(2)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(TooManyAttempts):
+            await attempt("u3@b.c")
+        assert all(await asyncio.gather(*running))
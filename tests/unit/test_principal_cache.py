@@ -0,0 +1,111 @@
+import asyncio
+import time
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, MagicMock
+from infrastructure.web import auth_service as auth_module
+from infrastructure.web.auth_service import AuthService
+from infrastructure.web.principal_cache import PrincipalCache
+from infrastructure.web.revocation import RevocationList
+from tests.unit.test_revocation import RevocationRedis
+
+class TestPrincipalCache:
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, monkeypatch):
+        """Create two API processes' caches sharing one Redis and an AuthService using the first"""
+        self.redis = RevocationRedis()
+        self.cache = PrincipalCache(client=self.redis, ttl=60)
+        self.other = PrincipalCache(client=self.redis, ttl=60)
+        self.revoked = RevocationList(client=self.redis)
+        self.cache.start()
+        self.other.start()
+        self.revoked.start()
+        await asyncio.sleep(0.01)
+
+        monkeypatch.setattr(auth_module, "principal_cache", self.cache)
+        monkeypatch.setattr(auth_module, "revocation_list", self.revoked)
+        self.auth = AuthService()
+        self.auth.user_repository = MagicMock()
+        self.auth.user_repository.get_by_id = AsyncMock(return_value=MagicMock(id=7, email="a@b.c"))
+        self.token = self.auth.create_access_token({"sub": "7", "user_id": 7})
+        yield
+        await self.cache.close()
+        await self.other.close()
+        await self.revoked.close()
+
+    @pytest.mark.asyncio
+    async def test_hit_skips_redis_and_database(self):
+        """Test a repeated token is served from memory"""
+        first, _ = await self.auth.validate_token(self.token)
+        self.redis.exists = AsyncMock()
+
+        second, error = await self.auth.validate_token(self.token)
+
+        assert error is None
+        assert second is first
+        self.redis.exists.assert_not_awaited()
+        self.auth.user_repository.get_by_id.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_rejected_on_cache_hit(self):
+        """Test a cached token stops validating once revoked"""
+        await self.auth.validate_token(self.token)
+
+        await self.auth.revoke_token(self.token)
+
+        user, error = await self.auth.validate_token(self.token)
+        assert user is None
+        assert error == "Token has been revoked"
+
+    @pytest.mark.asyncio
+    async def test_user_update_drops_all_user_tokens(self):
+        """Test invalidating a user removes all of their cached tokens"""
+        now = time.time()
+        self.other.put("t1", MagicMock(id=7), now + 60, "j", self.other.generation)
+        self.other.put("t2", MagicMock(id=7), now + 60, "j", self.other.generation)
+        self.other.put("t3", MagicMock(id=8), now + 60, "j", self.other.generation)
+
+        await self.cache.invalidate_user(7)
+        await asyncio.sleep(0.01)
+
+        assert self.other.get("t1") is None and self.other.get("t2") is None
+        assert self.other.get("t3")[0].id == 8
+
+    @pytest.mark.asyncio
+    async def test_profile_update_invalidates_other_processes(self):
+        """Test saving a user through AuthService drops their tokens everywhere"""
+        self.other.put("t1", MagicMock(id=7), time.time() + 60, "j", self.other.generation)
+        self.auth.user_repository.save = AsyncMock(return_value=MagicMock(id=7))
+
+        await self.auth.update_user(MagicMock(id=7))
+        await asyncio.sleep(0.01)
+
+        assert self.other.get("t1") is None
+
+    @pytest.mark.asyncio
+    async def test_entry_never_outlives_token(self):
+        """Test an entry expires with its token even if the cache TTL is longer"""
+        self.cache.put("short", MagicMock(id=7), time.time() - 1, "j", self.cache.generation)
+
+        assert self.cache.get("short") is None
+
+    @pytest.mark.asyncio
+    async def test_lookup_racing_invalidation_not_cached(self):
+        """Test a user read before an invalidation is not stored afterwards"""
+        generation = self.cache.generation
+        await self.cache.invalidate_user(7)
+
+        self.cache.put(self.token, MagicMock(id=7), time.time() + 60, "j", generation)
+
+        assert self.cache.get(self.token) is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_without_subscription(self):
+        """Test the cache is bypassed while the invalidation channel is not subscribed"""
+        await self.cache.close()
+        self.cache.subscribed = False
+
+        await self.auth.validate_token(self.token)
+        await self.auth.validate_token(self.token)
+
+        assert self.auth.user_repository.get_by_id.await_count == 2
@@ -0,0 +1,98 @@
+import fnmatch
+import pytest
+from infrastructure.messaging.process_stats import ProcessStats, sum_deadline_counters, sum_queue_load
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def set(self, key, value, ex=None):
+        self.redis.store[key.encode()] = value.encode()
+
+    async def execute(self):
+        return []
+
+class FakeRedis:
+    """In-memory Redis with SET, MGET, SCAN and DEL on bytes keys"""
+
+    def __init__(self):
+        self.store = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def scan_iter(self, match):
+        for key in list(self.store):
+            if fnmatch.fnmatch(key.decode(), match):
+                yield key
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key.encode(), None)
+
+class TestProcessStats:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create two processes publishing deadline counters to one Redis"""
+        self.redis = FakeRedis()
+        self.api = ProcessStats({"deadlines": lambda: {"llm_requests": {"dropped": 1, "aborted": 0}}}, client=self.redis)
+        self.worker = ProcessStats({"deadlines": lambda: {"llm_requests": {"dropped": 2, "aborted": 3}}}, client=self.redis)
+        self.api.process_id, self.worker.process_id = "api:1", "worker:2"
+
+    @pytest.mark.asyncio
+    async def test_collect_returns_every_process(self):
+        """Test snapshots published by different processes are read back by process id"""
+        await self.api.publish()
+        await self.worker.publish()
+
+        snapshots = await self.api.collect("deadlines")
+
+        assert set(snapshots) == {"api:1", "worker:2"}
+        assert sum_deadline_counters(snapshots) == {"llm_requests": {"dropped": 3, "aborted": 3}}
+
+    @pytest.mark.asyncio
+    async def test_closed_process_is_removed(self):
+        """Test a stopped process deletes its snapshots"""
+        await self.worker.publish()
+        self.worker.start()
+
+        await self.worker.close()
+
+        assert await self.api.collect("deadlines") == {}
+
+    @pytest.mark.asyncio
+    async def test_thread_allocation_published_per_process(self):
+        """Test the default publisher includes the thread budget of the process"""
+        from infrastructure.messaging.process_stats import process_stats
+
+        stats = ProcessStats(process_stats.sources, client=self.redis)
+        await stats.publish()
+
+        allocation = (await stats.collect("threads"))[stats.process_id]
+        assert set(allocation["models"]) == {"whisper", "qwen", "silero"}
+
+    @pytest.mark.asyncio
+    async def test_queue_load_combined_over_api_processes(self):
+        """Test queue load registered at startup is summed over API processes"""
+        load = {"depth": 4, "consumers": 2, "in_flight": 3, "in_flight_ewma": 2.5, "service_time_ewma": 1.0, "predicted_wait": 3.0}
+        self.api.register("queues", lambda: {"llm_requests": load})
+        other = ProcessStats({"queues": lambda: {"llm_requests": dict(load, depth=5, in_flight=1, service_time_ewma=3.0, predicted_wait=None)}}, client=self.redis)
+        other.process_id = "api:3"
+        await self.api.publish()
+        await other.publish()
+
+        totals = sum_queue_load(await self.api.collect("queues"))
+
+        assert totals == {"llm_requests": {
+            "depth": 5, "consumers": 2, "in_flight": 4, "in_flight_ewma": 5.0,
+            "service_time_ewma": 2.0, "predicted_wait": 3.0
+        }}
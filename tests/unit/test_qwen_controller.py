@@ -83,13 +83,6 @@ class TestQwenController:
             "email": "test@example.com"
         })
         
-        # Store token in Redis
-        redis_client.setex(
-            f"token:{self.token}",
-            900,  # 15 minutes in seconds
-            str(self.user_id)
-        )
-        
         self.headers = {"Authorization": f"Bearer {self.token}"}
         
         yield
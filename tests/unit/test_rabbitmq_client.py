@@ -0,0 +1,372 @@
+import asyncio
+import time
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from infrastructure.messaging import rabbitmq_client
+from infrastructure.messaging.claim_check import CLAIM_CHECK_HEADER, FileBlobStore
+from infrastructure.messaging.config import rabbitmq_settings
+from infrastructure.messaging.deadlines import DEADLINE_HEADER, deadline_counters, encode_deadline
+from infrastructure.messaging.results import RESULT_KEY_HEADER
+from infrastructure.messaging.rabbitmq_client import (
+    RabbitMQClient,
+    ACK_AFTER,
+    ACK_BEFORE,
+    RETRY_COUNT_HEADER,
+    retry_delay_ms
+)
+
+class TestRabbitMQClient:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        """Create client with a mocked channel, exchange and publisher pool"""
+        self.queue = MagicMock()
+        self.queue.bind = AsyncMock()
+        self.channel = MagicMock()
+        self.exchange = MagicMock()
+        self.exchange.publish = AsyncMock()
+        self.channel.declare_queue = AsyncMock(return_value=self.queue)
+        self.channel.declare_exchange = AsyncMock(return_value=self.exchange)
+        self.channel.default_exchange.publish = AsyncMock()
+        self.channel.get_exchange = AsyncMock(return_value=self.exchange)
+
+        @asynccontextmanager
+        async def publish_channel():
+            yield self.channel
+
+        monkeypatch.setattr(rabbitmq_client.connection_manager, "publish_channel", publish_channel)
+
+        self.client = RabbitMQClient()
+        self.client.connection = MagicMock()
+        self.client.channel = self.channel
+        self.client.exchange = self.exchange
+
+    @pytest.mark.asyncio
+    async def test_queue_declared_once_per_channel(self):
+        """Test repeated publishes reuse the declared queue"""
+        for _ in range(3):
+            await self.client.publish_message("llm_requests", {"type": "llm_request"})
+
+        assert self.channel.declare_queue.await_count == 1
+        assert self.queue.bind.await_count == 1
+        assert self.exchange.publish.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_reconnect_clears_declared_queues(self):
+        """Test topology is declared again after reconnect"""
+        await self.client.publish_message("llm_requests", {"type": "llm_request"})
+        self.client._on_reconnect()
+        await asyncio.sleep(0)
+        await self.client.publish_message("llm_requests", {"type": "llm_request"})
+
+        assert self.channel.declare_exchange.await_count == 1
+        assert self.channel.declare_queue.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_dispatch_bounds_in_flight_callbacks(self):
+        """Test semaphore limits concurrently running callbacks"""
+        active = 0
+        max_active = 0
+
+        async def callback(data):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        messages = [self._make_message() for _ in range(5)]
+        semaphore = asyncio.Semaphore(2)
+        await asyncio.gather(*[
+            self.client._dispatch(m, "llm_requests", callback, semaphore, ACK_AFTER)
+            for m in messages
+        ])
+
+        assert max_active == 2
+        assert all(m.ack.await_count == 1 for m in messages)
+
+    @pytest.mark.asyncio
+    async def test_ack_before_acknowledges_on_receipt(self):
+        """Test ack-before strategy acks the message before the callback runs"""
+        message = self._make_message()
+        acked_before_callback = []
+
+        async def callback(data):
+            acked_before_callback.append(message.ack.await_count == 1)
+
+        await self.client._dispatch(message, "llm_requests", callback, asyncio.Semaphore(1), ACK_BEFORE)
+
+        assert acked_before_callback == [True]
+
+    @pytest.mark.asyncio
+    async def test_ack_before_waits_for_free_slot(self):
+        """Test ack-before strategy does not ack messages that are still waiting for the semaphore"""
+        release = asyncio.Event()
+
+        async def callback(data):
+            await release.wait()
+
+        first, second = self._make_message(), self._make_message()
+        semaphore = asyncio.Semaphore(1)
+        tasks = [
+            asyncio.create_task(self.client._dispatch(m, "llm_requests", callback, semaphore, ACK_BEFORE))
+            for m in (first, second)
+        ]
+        await asyncio.sleep(0.01)
+
+        assert first.ack.await_count == 1
+        assert second.ack.await_count == 0
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert second.ack.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_message_goes_to_next_retry_queue(self):
+        """Test failure republishes to the delay queue and acks the original"""
+        message = self._make_message(headers={RETRY_COUNT_HEADER: 1})
+
+        async def callback(data):
+            raise RuntimeError("model crashed")
+
+        await self.client._dispatch(message, "llm_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+
+        republished, = self.channel.default_exchange.publish.await_args_list
+        assert republished.kwargs["routing_key"] == "llm_requests.retry.2"
+        assert republished.args[0].headers[RETRY_COUNT_HEADER] == 2
+        assert message.ack.await_count == 1
+        message.reject.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_republish_requeues_original(self):
+        """Test the original is returned to its queue when moving it to the delay queue fails"""
+        message = self._make_message(headers={RETRY_COUNT_HEADER: 1})
+        self.channel.default_exchange.publish.side_effect = ConnectionError("broker gone")
+
+        async def callback(data):
+            raise RuntimeError("model crashed")
+
+        await self.client._dispatch(message, "llm_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+
+        message.nack.assert_awaited_once_with(requeue=True)
+        message.ack.assert_not_awaited()
+        message.reject.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_exhausted_retries_go_to_dead_letter_queue(self):
+        """Test message lands in DLQ once MAX_RETRIES is reached"""
+        message = self._make_message(headers={RETRY_COUNT_HEADER: rabbitmq_settings.MAX_RETRIES})
+
+        async def callback(data):
+            raise RuntimeError("model crashed")
+
+        await self.client._dispatch(message, "llm_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+
+        republished, = self.channel.default_exchange.publish.await_args_list
+        assert republished.kwargs["routing_key"] == "llm_requests.dlq"
+        assert republished.args[0].headers["x-error"] == "model crashed"
+        assert republished.args[0].headers["x-original-queue"] == "llm_requests"
+
+    @pytest.mark.asyncio
+    async def test_rpc_failure_is_retried_with_reply_to(self):
+        """Test a failed RPC request is retried and keeps its reply queue instead of replying with the error"""
+        message = self._make_message(headers={DEADLINE_HEADER: encode_deadline(time.time() + 30)})
+        message.reply_to = "amq.gen-reply"
+        message.correlation_id = "corr-1"
+
+        async def callback(data):
+            raise RuntimeError("model crashed")
+
+        await self.client._dispatch(message, "llm_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+
+        republished, = self.channel.default_exchange.publish.await_args_list
+        assert republished.kwargs["routing_key"] == "llm_requests.retry.1"
+        assert republished.args[0].reply_to == "amq.gen-reply"
+        assert republished.args[0].correlation_id == "corr-1"
+
+    @pytest.mark.asyncio
+    async def test_rpc_failure_replies_when_retry_misses_deadline(self):
+        """Test a retry that would return after the deadline is skipped and the caller gets the error"""
+        message = self._make_message(headers={DEADLINE_HEADER: encode_deadline(time.time() + 0.5)})
+        message.reply_to = "amq.gen-reply"
+
+        async def callback(data):
+            raise RuntimeError("model crashed")
+
+        await self.client._dispatch(message, "llm_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+
+        routing_keys = [call.kwargs["routing_key"] for call in self.channel.default_exchange.publish.await_args_list]
+        assert routing_keys == ["llm_requests.dlq", "amq.gen-reply"]
+
+    @pytest.mark.asyncio
+    async def test_dead_letter_queue_is_bounded(self):
+        """Test the DLQ is declared with the configured length and age limits"""
+        await self.client._ensure_retry_topology("llm_requests")
+
+        dlq = next(
+            call for call in self.channel.declare_queue.await_args_list
+            if call.args[0] == "llm_requests.dlq"
+        )
+        assert dlq.kwargs["arguments"] == {
+            "x-max-length": rabbitmq_settings.DLQ_MAX_LENGTH,
+            "x-message-ttl": rabbitmq_settings.DLQ_MESSAGE_TTL_MS
+        }
+
+    @pytest.mark.asyncio
+    async def test_undecodable_message_skips_retries(self):
+        """Test poison messages go to DLQ without retrying"""
+        message = self._make_message()
+        message.body = b"not json"
+
+        await self.client._dispatch(message, "llm_requests", AsyncMock(), asyncio.Semaphore(1), ACK_AFTER)
+
+        republished, = self.channel.default_exchange.publish.await_args_list
+        assert republished.kwargs["routing_key"] == "llm_requests.dlq"
+
+    def test_retry_delay_is_exponential_and_bounded(self):
+        """Test backoff doubles per attempt and stops at the configured maximum"""
+        base = rabbitmq_settings.RETRY_BASE_DELAY_MS
+
+        assert retry_delay_ms(1) == base
+        assert retry_delay_ms(3) == base * 4
+        assert retry_delay_ms(50) == rabbitmq_settings.RETRY_MAX_DELAY_MS
+
+    @pytest.mark.asyncio
+    async def test_published_message_carries_deadline(self):
+        """Test deadline is sent both as header and as AMQP expiration"""
+        deadline = time.time() + 10
+
+        await self.client.publish_message("llm_requests", {"type": "llm_request"}, deadline=deadline)
+
+        published = self.exchange.publish.await_args.args[0]
+        assert published.headers[DEADLINE_HEADER] == encode_deadline(deadline)
+        assert 9 <= published.expiration <= 10
+
+    @pytest.mark.asyncio
+    async def test_expired_message_dropped_before_callback(self):
+        """Test worker skips inference for messages past their deadline"""
+        message = self._make_message(headers={DEADLINE_HEADER: encode_deadline(time.time() - 1)})
+        callback = AsyncMock()
+        dropped = deadline_counters.snapshot().get("stt_requests", {}).get("dropped", 0)
+
+        await self.client._dispatch(message, "stt_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+
+        callback.assert_not_awaited()
+        assert message.ack.await_count == 1
+        assert deadline_counters.snapshot()["stt_requests"]["dropped"] == dropped + 1
+
+    @pytest.mark.asyncio
+    async def test_failure_after_deadline_is_not_retried(self):
+        """Test work aborted by the deadline is acked without retry or reply"""
+        message = self._make_message(headers={DEADLINE_HEADER: encode_deadline(time.time() + 0.01)})
+        message.reply_to = "amq.gen-reply"
+
+        async def callback(data):
+            await asyncio.sleep(0.02)
+            raise RuntimeError("Generation aborted: request deadline exceeded")
+
+        await self.client._dispatch(message, "tts_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+
+        self.channel.default_exchange.publish.assert_not_awaited()
+        assert message.ack.await_count == 1
+        assert deadline_counters.snapshot()["tts_requests"]["aborted"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_large_body_travels_as_claim_check(self, tmp_path, monkeypatch):
+        """Test payload above threshold goes to the blob store and only a reference is published"""
+        store = FileBlobStore(directory=str(tmp_path), ttl=60)
+        monkeypatch.setattr(rabbitmq_client, "get_blob_store", lambda: store)
+        audio = b"\x00" * (rabbitmq_settings.CLAIM_CHECK_THRESHOLD + 1)
+
+        await self.client.publish_message(
+            "stt_requests",
+            {"type": "stt_request", "data": {"audio_data": audio}}
+        )
+
+        published = self.exchange.publish.await_args.args[0]
+        assert published.body == b""
+        assert bytes(await store.get(published.headers[CLAIM_CHECK_HEADER])) != b""
+
+    @pytest.mark.asyncio
+    async def test_claim_check_payload_deleted_after_ack(self, tmp_path, monkeypatch):
+        """Test worker reads payload by reference and deletes it once processed"""
+        store = FileBlobStore(directory=str(tmp_path), ttl=60)
+        monkeypatch.setattr(rabbitmq_client, "get_blob_store", lambda: store)
+        key = await store.put(b'{"type": "stt_request"}')
+        message = self._make_message(headers={CLAIM_CHECK_HEADER: key})
+        message.body = b""
+        received = []
+
+        async def callback(data):
+            received.append(data)
+
+        await self.client._dispatch(message, "stt_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+
+        assert received == [{"type": "stt_request"}]
+        assert message.ack.await_count == 1
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_result_stored_under_request_key(self, monkeypatch):
+        """Test worker publishes the reply to the result store when x-result-key is set"""
+        publish = AsyncMock()
+        monkeypatch.setattr(rabbitmq_client.result_broker, "publish", publish)
+        message = self._make_message(headers={RESULT_KEY_HEADER: "req-1"})
+
+        async def callback(data):
+            return {"text": "ok"}
+
+        await self.client._dispatch(message, "llm_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+
+        publish.assert_awaited_once_with("req-1", {"status": "ok", "result": {"text": "ok"}}, deadline=None)
+
+    @pytest.mark.asyncio
+    async def test_result_error_stored_only_after_last_retry(self, monkeypatch):
+        """Test retried jobs don't publish an error that a later attempt may replace"""
+        publish = AsyncMock()
+        monkeypatch.setattr(rabbitmq_client.result_broker, "publish", publish)
+
+        async def callback(data):
+            raise RuntimeError("model crashed")
+
+        first = self._make_message(headers={RESULT_KEY_HEADER: "req-2"})
+        await self.client._dispatch(first, "llm_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+        publish.assert_not_awaited()
+
+        last = self._make_message(headers={
+            RESULT_KEY_HEADER: "req-2",
+            RETRY_COUNT_HEADER: rabbitmq_settings.MAX_RETRIES
+        })
+        await self.client._dispatch(last, "llm_requests", callback, asyncio.Semaphore(1), ACK_AFTER)
+        publish.assert_awaited_once_with("req-2", {"status": "error", "error": "model crashed"}, deadline=None)
+
+    def _make_message(self, headers=None):
+        """Create an incoming message stub with a JSON body"""
+        message = MagicMock()
+        message.body = b'{"type": "llm_request"}'
+        message.content_type = None
+        message.headers = headers or {}
+        message.reply_to = None
+        message.correlation_id = None
+        message.processed = False
+
+        async def ack():
+            message.processed = True
+
+        async def nack(requeue=True):
+            message.processed = True
+
+        message.ack = AsyncMock(side_effect=ack)
+        message.nack = AsyncMock(side_effect=nack)
+        message.reject = AsyncMock()
+
+        class _Process:
+            async def __aenter__(self):
+                return message
+
+            async def __aexit__(self, *exc):
+                if not message.processed:
+                    await message.ack()
+
+        message.process = MagicMock(return_value=_Process())
+        return message
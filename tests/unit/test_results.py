@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from infrastructure.messaging.results import ResultBroker
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.subscribers.append(self.queue)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        self.redis.subscribers.remove(self.queue)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def set(self, *args, **kwargs):
+        self.commands.append(self.redis.set(*args, **kwargs))
+
+    def publish(self, *args):
+        self.commands.append(self.redis.publish(*args))
+
+    async def execute(self):
+        return [await command for command in self.commands]
+
+class FakeRedis:
+    """In-memory Redis with GET/SET and pub/sub"""
+
+    def __init__(self):
+        self.store = {}
+        self.subscribers = []
+        self.published = []
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def publish(self, channel, data):
+        self.published.append(data)
+        for queue in self.subscribers:
+            queue.put_nowait({"type": "message", "data": data})
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+class TestResultBroker:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create two brokers (API replicas) sharing one Redis"""
+        self.redis = FakeRedis()
+        self.api = ResultBroker(client=self.redis, ttl=60)
+        self.worker = ResultBroker(client=self.redis, ttl=60)
+
+    @pytest.mark.asyncio
+    async def test_waiter_receives_result_published_elsewhere(self):
+        """Test a result published by a worker reaches the waiting replica"""
+        waiter = asyncio.create_task(self.api.wait("req-1", timeout=1))
+        await asyncio.sleep(0.01)
+
+        await self.worker.publish("req-1", {"status": "ok", "result": {"audio_data": b"RIFF"}})
+
+        assert await waiter == {"status": "ok", "result": {"audio_data": b"RIFF"}}
+        assert self.api._waiters == {}
+        await self.api.close()
+
+    @pytest.mark.asyncio
+    async def test_channel_carries_only_request_id(self):
+        """Test the reply body stays in storage and only the request id is broadcast"""
+        await self.worker.publish("req-4", {"status": "ok", "result": {"audio_data": b"RIFF" * 1000}})
+
+        assert self.redis.published == ["req-4"]
+
+    @pytest.mark.asyncio
+    async def test_late_poller_reads_stored_result(self):
+        """Test a result published before anyone waited is served from storage"""
+        await self.worker.publish("req-2", {"status": "ok", "result": {"text": "готово"}})
+
+        assert await self.api.get("req-2") == {"status": "ok", "result": {"text": "готово"}}
+        assert (await self.api.wait("req-2", timeout=1))["result"] == {"text": "готово"}
+        await self.api.close()
+
+    @pytest.mark.asyncio
+    async def test_wait_times_out(self):
+        """Test waiting for a missing result raises TimeoutError"""
+        with pytest.raises(asyncio.TimeoutError):
+            await self.api.wait("req-3", timeout=0.05)
+        await self.api.close()
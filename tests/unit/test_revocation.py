@@ -0,0 +1,85 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock
+from infrastructure.web.revocation import RevocationList
+from tests.unit.test_results import FakeRedis
+
+class RevocationRedis(FakeRedis):
+    """FakeRedis with key expiry, EXISTS and SCAN"""
+
+    async def set(self, key, value, ex=None, exat=None):
+        self.store[key] = value if isinstance(value, bytes) else str(value).encode()
+
+    async def get(self, key):
+        return self.store.get(key.decode() if isinstance(key, bytes) else key)
+
+    async def exists(self, key):
+        return int(key in self.store)
+
+    async def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip("*")
+        for key in list(self.store):
+            if key.startswith(prefix):
+                yield key.encode()
+
+class TestRevocationList:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create two API processes' revocation lists sharing one Redis"""
+        self.redis = RevocationRedis()
+        self.api = RevocationList(client=self.redis)
+        self.other = RevocationList(client=self.redis)
+
+    async def _start(self, *lists):
+        for revocations in lists:
+            revocations.start()
+        await asyncio.sleep(0.01)
+
+    async def _close(self, *lists):
+        for revocations in lists:
+            await revocations.close()
+
+    @pytest.mark.asyncio
+    async def test_revocation_reaches_other_process(self):
+        """Test a jti revoked in one process is rejected in memory by another"""
+        await self._start(self.api, self.other)
+        self.redis.exists = AsyncMock()
+
+        await self.api.revoke("jti-1", time.time() + 60)
+        await asyncio.sleep(0.01)
+
+        assert await self.other.is_revoked("jti-1")
+        assert not await self.other.is_revoked("jti-2")
+        self.redis.exists.assert_not_awaited()
+        await self._close(self.api, self.other)
+
+    @pytest.mark.asyncio
+    async def test_existing_revocations_loaded_on_start(self):
+        """Test a process started after a revocation still rejects the token"""
+        await self.api.revoke("jti-1", time.time() + 60)
+
+        await self._start(self.other)
+
+        assert self.other.synced
+        assert await self.other.is_revoked("jti-1")
+        await self._close(self.other)
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_redis_until_synced(self):
+        """Test revocations are checked in Redis while the subscription is down"""
+        await self.api.revoke("jti-1", time.time() + 60)
+
+        assert not self.other.synced
+        assert await self.other.is_revoked("jti-1")
+        assert not await self.other.is_revoked("jti-2")
+
+    @pytest.mark.asyncio
+    async def test_expired_tokens_not_stored(self):
+        """Test only unexpired revocations are kept"""
+        await self.api.revoke("old", time.time() - 1)
+        self.api._add("soon", time.time() - 0.001)
+        self.api._add("live", time.time() + 60)
+
+        assert self.redis.store == {}
+        assert list(self.api._revoked) == ["live"]
@@ -0,0 +1,60 @@
+import pytest
+import torch
+from infrastructure.ml_models.thread_budget import ThreadBudget
+
+class TestThreadBudget:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create budget with a fixed allocation"""
+        self.budget = ThreadBudget(
+            allocations={
+                "whisper": {"intra_op": 2, "inter_op": 1, "workers": 1},
+                "qwen": {"intra_op": 3, "inter_op": 1, "workers": 2},
+                "silero": {"intra_op": 1, "inter_op": 1, "workers": 1},
+            },
+            cpu_count=8
+        )
+        yield
+        self.budget.shutdown()
+
+    def test_allocation_totals(self):
+        """Test reserved cores are summed over models and workers"""
+        allocation = self.budget.allocation()
+
+        assert allocation["cpu_count"] == 8
+        assert allocation["reserved_cores"] == 2 + 3 * 2 + 1
+        assert allocation["oversubscribed"] is True
+        assert allocation["models"]["qwen"]["reserved_cores"] == 6
+        assert allocation["busy_cores"] == 0
+
+    @pytest.mark.asyncio
+    async def test_pools_keep_their_own_threads(self):
+        """Test interleaved calls of different models each see their own limit and leave the caller untouched"""
+        previous = torch.get_num_threads()
+
+        for _ in range(3):
+            assert await self.budget.run("whisper", torch.get_num_threads) == 2
+            assert await self.budget.run("qwen", torch.get_num_threads) == 3
+
+        assert torch.get_num_threads() == previous
+
+    @pytest.mark.asyncio
+    async def test_active_calls_counted(self):
+        """Test a running call is reported as active and released afterwards"""
+        seen = await self.budget.run("whisper", lambda: self.budget.allocation()["models"]["whisper"]["active_calls"])
+
+        assert seen == 1
+        assert self.budget.allocation()["models"]["whisper"]["active_calls"] == 0
+
+    @pytest.mark.asyncio
+    async def test_run_uses_model_threads(self):
+        """Test inference call runs with the model's thread limit"""
+        threads = await self.budget.run("qwen", torch.get_num_threads)
+
+        assert threads == 3
+
+    @pytest.mark.asyncio
+    async def test_run_unknown_model(self):
+        """Test unknown model is rejected"""
+        with pytest.raises(ValueError):
+            await self.budget.run("unknown", lambda: None)
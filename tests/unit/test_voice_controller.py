@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from infrastructure.web.controllers import voice_controller
+
+class TestVoiceController:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        """Mock workers, history and balance lookups"""
+        self.message_service = MagicMock()
+        self.message_service.request_stt = AsyncMock(return_value="привет")
+        self.message_service.request_llm = AsyncMock(return_value="Привет! Как дела?")
+        self.message_service.request_tts = AsyncMock(return_value=(b"RIFF", 48000))
+        self.save_turn = AsyncMock()
+        self.credit_repo = MagicMock()
+        self.credit_repo.get_user_balance = AsyncMock(return_value=90)
+
+        monkeypatch.setattr(voice_controller, "message_service", self.message_service)
+        monkeypatch.setattr(voice_controller, "save_turn", self.save_turn)
+        monkeypatch.setattr(voice_controller, "credit_repo", self.credit_repo)
+        self.user = MagicMock(id=1)
+
+    async def _collect(self):
+        return [event async for event in voice_controller.voice_turn(b"webm", self.user, "baya")]
+
+    @pytest.mark.asyncio
+    async def test_turn_chains_stages_in_order(self):
+        """Test transcript, reply, audio and done events are streamed in one turn"""
+        events = await self._collect()
+
+        assert [e["type"] for e in events] == ["transcript", "reply", "audio", "done"]
+        self.message_service.request_llm.assert_awaited_once_with(prompt="привет", max_tokens=256, temperature=0.7)
+        self.message_service.request_tts.assert_awaited_once_with("Привет! Как дела?", "baya")
+        assert events[-1]["balance"] == 90
+        assert self.save_turn.call_args.args[3] == "success"
+
+    @pytest.mark.asyncio
+    async def test_stage_failure_reported_in_stream(self):
+        """Test a failing stage ends the turn with an error event and is recorded"""
+        self.message_service.request_llm.side_effect = asyncio.TimeoutError()
+
+        events = await self._collect()
+
+        assert [e["type"] for e in events] == ["transcript", "error", "done"]
+        assert events[1]["stage"] == "llm"
+        self.message_service.request_tts.assert_not_awaited()
+        assert self.save_turn.call_args.args[3] == "error"
+
+    @pytest.mark.asyncio
+    async def test_browser_command_skips_model(self):
+        """Test a browser command is classified on the server and never reaches the LLM or TTS"""
+        self.message_service.request_stt.return_value = "прокрути вниз"
+
+        events = await self._collect()
+
+        assert [e["type"] for e in events] == ["transcript", "command", "done"]
+        assert events[1]["scenario"] == "Прокрутка страницы"
+        self.message_service.request_llm.assert_not_awaited()
+        self.message_service.request_tts.assert_not_awaited()
+        self.save_turn.assert_not_awaited()
+
+    @pytest.mark.parametrize("text, scenario", [
+        ("найди котиков", "Поиск на странице"),
+        ("Открой новую вкладку", "Новая вкладка"),
+        ("закрой вкладку", None),
+        ("расскажи анекдот", voice_controller.CHAT_REQUEST_TYPE),
+    ])
+    def test_classify_command(self, text, scenario):
+        """Test classification matches the extension's scenario order"""
+        assert voice_controller.classify_command(text) == scenario
+
+    @pytest.mark.asyncio
+    async def test_unexpected_failure_reported_in_stream(self):
+        """Test an unexpected exception still ends the stream with an error and a done event"""
+        self.message_service.request_tts.side_effect = KeyError("sample_rate")
+
+        events = await self._collect()
+
+        assert [e["type"] for e in events] == ["transcript", "reply", "error", "done"]
+        assert events[2] == {"type": "error", "stage": "tts", "detail": "Internal server error"}
+        assert self.save_turn.call_args.args[3] == "error"